@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, Query
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+import asyncio
 import json
 import random
 from datetime import datetime
@@ -20,7 +21,11 @@ from logic.exponential_calculations import (
     calculate_complex_system_failure, calculate_nano_replication,
     calculate_social_network_growth
 )
-from logic.compound_interest import calculate_compound_interest
+from logic.compound_interest import (
+    calculate_compound_interest, calculate_compound_with_contributions,
+    calculate_real_return_with_inflation, calculate_tax_affected_compound,
+    calculate_compound_with_variable_rates, calculate_double_compound
+)
 from logic.cognitive_bias_analysis import (
     analyze_linear_thinking_bias,
     analyze_exponential_misconception,
@@ -29,175 +34,57 @@ from logic.cognitive_bias_analysis import (
     generate_bias_feedback,
     generate_improved_feedback
 )
+from logic.batch_bias_detection import analyze_bias_batch
+from logic.results_store import get_results_store, results_writer, make_result_row, score_from_error_ratio
+from logic.big_number import EXACT_LOG10_LIMIT, power_log10, log10_abs, approximate_value, format_scientific, relative_error
 from utils.response_format import APIResponse, CalculationResult, BiasAnalysisResult
 from utils.error_handlers import CustomException
+from utils.data_repository import data_repository
+from utils.compute_executor import compute_executor, estimate_power_cost
 
 # 创建路由器
 router = APIRouter(prefix="/api", tags=["cognitive_tests"])
 
 # 加载测试问题数据
-def load_questions_from_json(file_path: str) -> List[Dict]:
-    """从JSON文件加载问题数据"""
-    import os
-    full_path = os.path.join(os.path.dirname(__file__), '..', '..', file_path)
-    full_path = os.path.normpath(full_path)  # 规范化路径
+# 所有数据文件经 data_repository 在线程池中读取一次并常驻内存，处理函数中不做阻塞 I/O
+QUESTION_KEYS = ('exponential_questions', 'compound_questions', 'historical_cases', 'game_scenarios', 'questions')
+ADVANCED_QUESTION_KEYS = ('exponential_questions', 'compound_questions', 'historical_cases', 'game_scenarios')
+HISTORICAL_KEYS = ('historical_cases', 'scenarios')
+GAME_KEYS = ('game_scenarios', 'scenarios', 'games')
 
-    try:
-        with open(full_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            questions_list = []
-
-            # 获取不同类型的题目
-            if 'exponential_questions' in data:
-                questions_list.extend(data['exponential_questions'])
-            if 'compound_questions' in data:
-                questions_list.extend(data['compound_questions'])
-            if 'historical_cases' in data:
-                questions_list.extend(data['historical_cases'])
-            if 'game_scenarios' in data:
-                questions_list.extend(data['game_scenarios'])
-
-            # 也可能数据结构是直接的列表
-            if 'questions' in data:
-                questions_list.extend(data['questions'])
-
-            return questions_list
-    except FileNotFoundError:
-        print(f"Warning: {full_path} not found, using default data")
-        return []
-    except json.JSONDecodeError:
-        print(f"Warning: {full_path} is not valid JSON, using default data")
-        return []
-    except Exception as e:
-        print(f"Warning: Error loading {full_path}: {e}, using default data")
-        return []
 
+async def load_questions_from_json(file_name: str) -> List[Dict]:
+    """从JSON文件加载问题数据（文件名相对于 api-server/data）"""
+    return await data_repository.get_list(file_name, QUESTION_KEYS)
 
-def load_advanced_questions_from_json(file_path: str) -> List[Dict]:
+
+async def load_advanced_questions_from_json(file_name: str) -> List[Dict]:
     """从JSON文件加载高级问题数据"""
-    import os
+    return await data_repository.get_list(file_name, ADVANCED_QUESTION_KEYS)
 
-    # Resolve relative paths from repo root.
-    # endpoints/ -> api-server/ -> repo root
-    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 
-    full_path = file_path
-    if not os.path.isabs(full_path):
-        full_path = os.path.join(repo_root, file_path)
-    full_path = os.path.normpath(full_path)
+async def load_historical_scenarios() -> List[Dict]:
+    """从JSON文件加载历史场景数据"""
+    return await data_repository.get_list('historical_cases.json', HISTORICAL_KEYS, first_match=True)
 
-    try:
-        with open(full_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            questions_list = []
-
-            # 获取不同类型的高级题目
-            if 'exponential_questions' in data:
-                questions_list.extend(data['exponential_questions'])
-            if 'compound_questions' in data:
-                questions_list.extend(data['compound_questions'])
-            if 'historical_cases' in data:
-                questions_list.extend(data['historical_cases'])
-            if 'game_scenarios' in data:
-                questions_list.extend(data['game_scenarios'])
-
-            return questions_list
-    except FileNotFoundError:
-        print(f"Warning: Advanced questions file {full_path} not found")
-        print(f"Current working directory: {os.getcwd()}")
-        return []
-    except json.JSONDecodeError:
-        print(f"Warning: {full_path} is not valid JSON")
-        return []
-    except Exception as e:
-        print(f"Warning: Error loading {full_path}: {e}")
-        import traceback
-        traceback.print_exc()
-        return []
 
-def load_historical_scenarios() -> List[Dict]:
-    """从JSON文件加载历史场景数据"""
-    import os
-    file_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'historical_cases.json')
-    file_path = os.path.normpath(file_path)  # 规范化路径
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            # 检查数据结构并提取正确的数组
-            if 'historical_cases' in data and isinstance(data['historical_cases'], list):
-                return data['historical_cases']
-            elif 'scenarios' in data and isinstance(data['scenarios'], list):
-                return data['scenarios']
-            else:
-                print(f"Warning: Unexpected data structure in {file_path}")
-                return []
-    except FileNotFoundError:
-        print(f"Warning: {file_path} not found, using default data")
-        return []
-    except json.JSONDecodeError:
-        print(f"Warning: {file_path} is not valid JSON, using default data")
-        return []
-
-
-def load_advanced_historical_scenarios() -> List[Dict]:
+async def load_advanced_historical_scenarios() -> List[Dict]:
     """从JSON文件加载高级历史场景数据"""
-    import os
-    file_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'advanced_historical_cases.json')
-    file_path = os.path.normpath(file_path)  # 规范化路径
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            # 检查数据结构并提取正确的数组
-            if 'historical_cases' in data and isinstance(data['historical_cases'], list):
-                return data['historical_cases']
-            elif 'scenarios' in data and isinstance(data['scenarios'], list):
-                return data['scenarios']
-            else:
-                print(f"Warning: Unexpected data structure in {file_path}")
-                return []
-    except FileNotFoundError:
-        print(f"Warning: {file_path} not found, using advanced default data")
-        return []
-    except json.JSONDecodeError:
-        print(f"Warning: {file_path} is not valid JSON, using advanced default data")
-        return []
-
-def load_game_scenarios() -> List[Dict]:
+    return await data_repository.get_list('advanced_historical_cases.json', HISTORICAL_KEYS, first_match=True)
+
+
+async def load_game_scenarios() -> List[Dict]:
     """从JSON文件加载游戏场景数据"""
-    import os
-    file_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'game_scenarios.json')
-    file_path = os.path.normpath(file_path)  # 规范化路径
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            # 检查数据结构并提取正确的数组
-            if 'game_scenarios' in data and isinstance(data['game_scenarios'], list):
-                return data['game_scenarios']
-            elif 'scenarios' in data and isinstance(data['scenarios'], list):
-                return data['scenarios']
-            elif 'games' in data and isinstance(data['games'], list):
-                return data['games']
-            else:
-                print(f"Warning: Unexpected data structure in {file_path}")
-                return []
-    except FileNotFoundError:
-        print(f"Warning: {file_path} not found, using default data")
-        return []
-    except json.JSONDecodeError:
-        print(f"Warning: {file_path} is not valid JSON, using default data")
-        return []
+    return await data_repository.get_list('game_scenarios.json', GAME_KEYS, first_match=True)
 
 # 指数增长相关端点
 @router.get("/exponential/questions")
 async def get_exponential_questions(include_advanced: bool = Query(default=False, description="是否包含高级难度问题")):
     """获取指数增长相关的测试问题"""
-    questions_data = load_questions_from_json('api-server/data/exponential_questions.json')
+    questions_data = await load_questions_from_json('exponential_questions.json')
 
     if include_advanced:
-        advanced_questions = load_advanced_questions_from_json('api-server/data/advanced_exponential_questions.json')
+        advanced_questions = await load_advanced_questions_from_json('advanced_exponential_questions.json')
         questions_data.extend(advanced_questions)
 
     questions = [CognitiveTestQuestion(**q) for q in questions_data]
@@ -213,13 +100,7 @@ async def get_exponential_questions(include_advanced: bool = Query(default=False
 @router.get("/exponential/advanced-questions")
 async def get_advanced_exponential_questions():
     """获取高级指数增长相关的测试问题"""
-    import os
-    # 使用相对于api-server目录的路径
-    current_dir = os.path.dirname(__file__)  # endpoints目录
-    data_path = os.path.join(current_dir, '..', 'data', 'advanced_exponential_questions.json')
-    data_path = os.path.normpath(data_path)
-
-    questions_data = load_advanced_questions_from_json(data_path)
+    questions_data = await load_advanced_questions_from_json('advanced_exponential_questions.json')
     questions = [CognitiveTestQuestion(**q) for q in questions_data]
 
     return {
@@ -242,11 +123,23 @@ class CompoundRequest(BaseModel):
     time_years: int
     compounding_frequency: int = 1
 
+class BatchBiasRequest(BaseModel):
+    """列式批量偏差检测请求：同一对中的两列必须等长"""
+    estimations: Optional[List[float]] = None
+    actuals: Optional[List[float]] = None
+    confidencePercentages: Optional[List[float]] = None
+    accuracyPercentages: Optional[List[float]] = None
+    onlyDetected: bool = True
+    limit: int = 100
+
 @router.post("/exponential/calculate/exponential")
 async def calculate_exponential_endpoint(request: ExponentialRequest):
     """计算指数增长结果"""
     try:
-        result = calculate_exponential(request.base, request.exponent)
+        result = await compute_executor.run(
+            calculate_exponential, request.base, request.exponent,
+            cost=estimate_power_cost(request.base, request.exponent)
+        )
         response_data = CalculationResult(
             result=result,
             scientific_notation=f"{result:.2e}" if result > 1e10 else str(result),
@@ -279,10 +172,12 @@ async def calculate_granary_problem(
     """计算米粒问题（2^200粒米的重量和体积）"""
     try:
         # 使用2^200作为默认单位数
-        result = calculate_exponential_granary_problem(
+        result = await compute_executor.run(
+            calculate_exponential_granary_problem,
             grains_per_unit=grains_per_unit,
             units=2**200,  # 2的200次方
-            rice_weight_per_grain_g=rice_weight_per_grain_g
+            rice_weight_per_grain_g=rice_weight_per_grain_g,
+            cost=estimate_power_cost(2, 200)
         )
         return APIResponse.success_response(
             data=result,
@@ -450,10 +345,10 @@ async def compare_linear_exponential(
 @router.get("/compound/questions")
 async def get_compound_questions(include_advanced: bool = Query(default=False, description="是否包含高级难度问题")):
     """获取复利相关的测试问题"""
-    questions_data = load_questions_from_json('api-server/data/compound_questions.json')
+    questions_data = await load_questions_from_json('compound_questions.json')
 
     if include_advanced:
-        advanced_questions = load_advanced_questions_from_json('api-server/data/advanced_compound_questions.json')
+        advanced_questions = await load_advanced_questions_from_json('advanced_compound_questions.json')
         questions_data.extend(advanced_questions)
 
     questions = [CognitiveTestQuestion(**q) for q in questions_data]
@@ -469,7 +364,7 @@ async def get_compound_questions(include_advanced: bool = Query(default=False, d
 @router.get("/compound/advanced-questions")
 async def get_advanced_compound_questions():
     """获取高级复利相关的测试问题"""
-    questions_data = load_advanced_questions_from_json('api-server/data/advanced_compound_questions.json')
+    questions_data = await load_advanced_questions_from_json('advanced_compound_questions.json')
     questions = [CognitiveTestQuestion(**q) for q in questions_data]
 
     return {
@@ -603,10 +498,10 @@ async def calculate_double_compound_endpoint(
 @router.get("/historical/scenarios")
 async def get_historical_scenarios(include_advanced: bool = Query(default=False, description="是否包含高级难度案例")):
     """获取历史决策案例"""
-    scenarios_data = load_historical_scenarios()
+    scenarios_data = await load_historical_scenarios()
 
     if include_advanced:
-        advanced_scenarios = load_advanced_historical_scenarios()
+        advanced_scenarios = await load_advanced_historical_scenarios()
         scenarios_data.extend(advanced_scenarios)
 
     scenarios = [HistoricalScenario(**s) for s in scenarios_data]
@@ -622,7 +517,7 @@ async def get_historical_scenarios(include_advanced: bool = Query(default=False,
 @router.get("/historical/advanced-scenarios")
 async def get_advanced_historical_scenarios():
     """获取高级历史决策案例"""
-    scenarios_data = load_advanced_historical_scenarios()
+    scenarios_data = await load_advanced_historical_scenarios()
     scenarios = [HistoricalScenario(**s) for s in scenarios_data]
 
     return {
@@ -636,10 +531,10 @@ async def get_advanced_historical_scenarios():
 @router.get("/game/scenarios")
 async def get_game_scenarios(include_advanced: bool = Query(default=False, description="是否包含高级难度场景")):
     """获取推理游戏场景"""
-    scenarios_data = load_game_scenarios()
+    scenarios_data = await load_game_scenarios()
 
     if include_advanced:
-        advanced_scenarios = load_advanced_questions_from_json('api-server/data/advanced_game_scenarios.json')
+        advanced_scenarios = await load_advanced_questions_from_json('advanced_game_scenarios.json')
         scenarios_data.extend(advanced_scenarios)
 
     scenarios = [GameScenario(**s) for s in scenarios_data]
@@ -655,7 +550,7 @@ async def get_game_scenarios(include_advanced: bool = Query(default=False, descr
 @router.get("/game/advanced-scenarios")
 async def get_advanced_game_scenarios():
     """获取高级推理游戏场景"""
-    scenarios_data = load_advanced_questions_from_json('api-server/data/advanced_game_scenarios.json')
+    scenarios_data = await load_advanced_questions_from_json('advanced_game_scenarios.json')
     scenarios = [GameScenario(**s) for s in scenarios_data]
 
     return {
@@ -665,6 +560,23 @@ async def get_advanced_game_scenarios():
         "difficulty_level": "advanced"
     }
 
+# 批量检测的成本：每 20 行约等于 1 位大数运算（10 万行以内直接执行）
+BATCH_ROWS_PER_COST_UNIT = 20
+
+# 内置指数问题的实际值（log10）
+KNOWN_ANSWERS_LOG10 = {
+    "exp-001": power_log10(2, 200),  # 2^200问题
+    "exp-002": 1 + power_log10(5, 11),  # 兔子繁殖问题：从10只兔子开始，11年后翻5倍
+    "exp-003": -1 + power_log10(2, 200),  # 纸张折叠问题：0.1毫米纸张对折200次后的厚度(mm)
+}
+# 精确值：结果较小或 exact=true 时使用
+KNOWN_ANSWERS_EXACT = {
+    "exp-001": lambda: 2**200,
+    "exp-002": lambda: 10 * (5**11),
+    "exp-003": lambda: 0.1 * (2**200),
+}
+
+
 # 用户响应和结果相关端点
 @router.post("/results/submit")
 async def submit_user_response(response_data: Dict[str, Any]):
@@ -684,10 +596,15 @@ async def submit_user_response(response_data: Dict[str, Any]):
             # 进行指数增长误区分析
             exponential_base = response_data.get('exponentialBase', 2)
             exponential_power = response_data.get('exponentialPower', 200)
-            analysis_result = analyze_exponential_misconception(
+            # 默认只在 log10 空间比较，精确值需显式请求（此时才有大数计算成本）
+            exact = bool(response_data.get('exact', False))
+            analysis_result = await compute_executor.run(
+                analyze_exponential_misconception,
                 user_estimation=user_estimation,
                 exponential_base=exponential_base,
-                exponential_power=exponential_power
+                exponential_power=exponential_power,
+                exact=exact,
+                cost=estimate_power_cost(exponential_base, exponential_power) if exact else 0
             )
         elif question_type == 'compound' and user_estimation:
             # 进行复利误区分析
@@ -728,14 +645,32 @@ async def submit_user_response(response_data: Dict[str, Any]):
             analysis_result['explanation'] = f"在高级认知挑战中，您的估算值为{user_estimation}，实际值为{actual_value}。这可能反映了对复杂现象的线性思维偏差。"
 
         # 生成结果汇总
+        bias_type = analysis_result.get('bias_type') if analysis_result else None
         result_summary = ChallengeResultSummary(
             userId=response_data.get('userId', 'anonymous'),
             sessionId=response_data.get('sessionId', 'session'),
             testType=question_type,
+            score=score_from_error_ratio(analysis_result.get('error_ratio')) if analysis_result else 0.0,
             estimationErrors=[abs(user_estimation - response_data.get('actualValue', user_estimation))],
+            improvementAreas=[bias_type] if bias_type else [],
             pyramidExplanations=[analysis_result.get('explanation', '') if analysis_result else '']
         )
 
+        # 放入写后队列，由后台任务批量持久化
+        await results_writer.submit(make_result_row(
+            user_id=result_summary.userId,
+            session_id=result_summary.sessionId,
+            test_type=question_type,
+            question_id=question_id,
+            score=result_summary.score,
+            bias_type=bias_type,
+            user_estimation=user_estimation,
+            actual_value=response_data.get('actualValue'),
+            estimation_error=result_summary.estimationErrors[0],
+            improvement_areas=result_summary.improvementAreas,
+            explanation=result_summary.pyramidExplanations[0]
+        ))
+
         response_data = {
             "sessionId": response_data.get('sessionId', 'session'),
             "analysis": analysis_result,
@@ -761,34 +696,35 @@ async def submit_user_response(response_data: Dict[str, Any]):
 async def check_exponential_answer(question_id: str, answer_data: Dict[str, Any]):
     """检查指数增长问题答案"""
     try:
-        from logic.cognitive_bias_analysis import analyze_linear_thinking_bias, analyze_exponential_misconception
-
         user_choice = answer_data.get("userChoice")
         user_estimation = answer_data.get("userEstimation", 0)
+        exact = bool(answer_data.get("exact", False))
 
-        # 根据问题ID确定实际值
-        actual_value = 0
-        if question_id == "exp-001":  # 2^200问题
-            actual_value = 2**200
-        elif question_id == "exp-002":  # 兔子繁殖问题
-            actual_value = 10 * (5**11)  # 从10只兔子开始，11年后翻5倍
-        elif question_id == "exp-003":  # 纸张折叠问题
-            actual_value = 0.1 * (2**200)  # 0.1毫米纸张对折200次后的厚度(mm)
+        # 根据问题ID确定实际值（log10 形式，不构造大整数）
+        if question_id in KNOWN_ANSWERS_LOG10:
+            actual_log10 = KNOWN_ANSWERS_LOG10[question_id]
+            actual_value = approximate_value(actual_log10)
         else:
             # 如果是其他ID，尝试从参数中获取actualValue
             actual_value = answer_data.get("actualValue", 0)
+            actual_log10 = log10_abs(actual_value)
+        if question_id in KNOWN_ANSWERS_EXACT and (exact or actual_log10 <= EXACT_LOG10_LIMIT):
+            actual_value = KNOWN_ANSWERS_EXACT[question_id]()
 
         # 进行认知偏差分析
-        bias_analysis = analyze_exponential_misconception(user_estimation, 2, 200)  # 对于2^200问题
+        bias_analysis = analyze_exponential_misconception(user_estimation, 2, 200, exact=exact)  # 对于2^200问题
 
+        is_correct = actual_value != 0 and actual_value is not None and relative_error(user_estimation, actual_log10) * 100 < 5  # 5%以内算正确
+        actual_display = format_scientific(actual_log10) if actual_log10 > 10 else f"{actual_value:,.2f}"
         response_data = {
             "question_id": question_id,
             "user_choice": user_choice,
             "user_estimation": user_estimation,
             "actual_value": actual_value,
-            "is_correct": abs(user_estimation - actual_value) / actual_value * 100 < 5 if actual_value != 0 else False,  # 5%以内算正确
+            "actual_value_scientific": format_scientific(actual_log10),
+            "is_correct": is_correct,
             "analysis": bias_analysis,
-            "explanation": f"您的估算值为{user_estimation:,.2f}，实际值为{'%.2e' % actual_value if actual_value > 1e10 else f'{actual_value:,.2f}'}，展现了指数增长思维的局限性。"
+            "explanation": f"您的估算值为{user_estimation:,.2f}，实际值为{actual_display}，展现了指数增长思维的局限性。"
         }
 
         return APIResponse.success_response(
@@ -807,21 +743,78 @@ async def check_exponential_answer(question_id: str, answer_data: Dict[str, Any]
         )
 
 
+@router.post("/analysis/bias/batch")
+async def analyze_bias_batch_endpoint(request: BatchBiasRequest):
+    """批量认知偏差检测（向量化计算，只为返回的行生成解释）"""
+    try:
+        rows = max(len(request.estimations or []), len(request.confidencePercentages or []))
+        result = await compute_executor.run(
+            analyze_bias_batch,
+            estimations=request.estimations,
+            actuals=request.actuals,
+            confidence_percentages=request.confidencePercentages,
+            accuracy_percentages=request.accuracyPercentages,
+            only_detected=request.onlyDetected,
+            limit=request.limit,
+            cost=rows / BATCH_ROWS_PER_COST_UNIT
+        )
+        return APIResponse.success_response(
+            data=result,
+            message="批量偏差检测成功"
+        )
+    except CustomException as e:
+        return APIResponse.error_response(
+            message=e.message,
+            error_code=e.error_code
+        )
+    except ValueError as e:
+        return APIResponse.error_response(
+            message=str(e),
+            error_code="INVALID_BATCH_INPUT"
+        )
+    except Exception as e:
+        return APIResponse.error_response(
+            message=f"批量偏差检测失败: {str(e)}",
+            error_code="BATCH_BIAS_ANALYSIS_ERROR"
+        )
+
+
 @router.get("/results/{user_id}/{session_id}")
 async def get_session_results(user_id: str, session_id: str):
     """获取特定用户的会话结果"""
     try:
-        # 在实际实现中，这里会从数据库或内存中获取用户结果
-        # 现在返回一个模拟结果
+        rows = await asyncio.to_thread(get_results_store().session_results, user_id, session_id)
+        if not rows:
+            return APIResponse.error_response(
+                message=f"找不到用户 {user_id} 的会话 {session_id}",
+                error_code="SESSION_RESULT_NOT_FOUND"
+            )
+
+        scores = [row["score"] for row in rows]
+        biases = []
+        for row in rows:
+            if row["bias_type"] and row["bias_type"] not in biases:
+                biases.append(row["bias_type"])
         response_data = {
             "userId": user_id,
             "sessionId": session_id,
-            "testType": "sample",
-            "responses": [],
+            "testType": rows[-1]["test_type"],
+            "responses": [
+                {
+                    "questionId": row["question_id"],
+                    "testType": row["test_type"],
+                    "userEstimation": row["user_estimation"],
+                    "actualValue": row["actual_value"],
+                    "score": row["score"],
+                    "biasType": row["bias_type"],
+                    "timestamp": datetime.fromtimestamp(row["timestamp"]).isoformat()
+                }
+                for row in rows
+            ],
             "summary": {
-                "score": 75.0,
-                "estimationAccuracy": 0.6,
-                "biasIdentification": ["linear_thinking"]
+                "score": round(sum(scores) / len(scores), 2),
+                "estimationAccuracy": round(sum(scores) / len(scores) / 100, 4),
+                "biasIdentification": biases
             }
         }
 
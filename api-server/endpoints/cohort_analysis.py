@@ -0,0 +1,95 @@
+"""
+群体决策分析端点
+面向讲师的跨会话视图：选项分布、决策模式流行度与结局分布，数据来自常驻内存的列式决策表
+"""
+from fastapi import APIRouter, Query
+from typing import Any, Dict, Optional
+import asyncio
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logic.cohort_analytics import cohort_analytics, refresh_cohort_analytics
+from logic.job_queue import job_manager
+from utils.response_format import APIResponse
+
+router = APIRouter(prefix="/analysis/cohort", tags=["cohort_analysis"])
+
+# 后台任务可用的查询及其参数默认值（参数顺序即方法参数顺序）
+_JOB_QUERIES = {
+    "summary": ("summary", {}),
+    "choices": ("choice_distribution", {"scenario_id": None, "difficulty": None, "turn": None, "group_by": "turn"}),
+    "patterns": ("pattern_prevalence", {"scenario_id": None, "difficulty": None}),
+    "outcomes": ("outcome_distribution", {"metric": "resources", "scenario_id": None, "difficulty": None, "bins": 10}),
+}
+
+
+@router.get("/summary")
+async def cohort_summary():
+    """决策总量与各场景的决策数、会话数"""
+    return APIResponse.success_response(data=await asyncio.to_thread(cohort_analytics.summary), message="获取群体概况成功")
+
+
+@router.get("/choices")
+async def cohort_choice_distribution(scenario_id: Optional[str] = None,
+                                     difficulty: Optional[str] = None,
+                                     turn: Optional[int] = None,
+                                     group_by: str = Query(default="turn", description="turn / scenario / difficulty")):
+    """按回合、场景或难度分组的选项分布"""
+    try:
+        data = await asyncio.to_thread(cohort_analytics.choice_distribution, scenario_id, difficulty, turn, group_by)
+    except ValueError as e:
+        return APIResponse.error_response(message=str(e), error_code="INVALID_COHORT_QUERY")
+    return APIResponse.success_response(data=data, message="获取选项分布成功")
+
+
+@router.get("/patterns")
+async def cohort_pattern_prevalence(scenario_id: Optional[str] = None, difficulty: Optional[str] = None):
+    """各决策模式（如激进/立即决策模式）在会话中的流行度"""
+    data = await asyncio.to_thread(cohort_analytics.pattern_prevalence, scenario_id, difficulty)
+    return APIResponse.success_response(data=data, message="获取决策模式流行度成功")
+
+
+@router.get("/outcomes")
+async def cohort_outcome_distribution(metric: str = "resources",
+                                      scenario_id: Optional[str] = None,
+                                      difficulty: Optional[str] = None,
+                                      bins: int = Query(default=10, ge=1, le=100)):
+    """各会话最终状态指标的分布"""
+    try:
+        data = await asyncio.to_thread(cohort_analytics.outcome_distribution, metric, scenario_id, difficulty, bins)
+    except ValueError as e:
+        return APIResponse.error_response(message=str(e), error_code="INVALID_COHORT_QUERY")
+    return APIResponse.success_response(data=data, message="获取结局分布成功")
+
+
+@router.post("/refresh")
+async def cohort_refresh():
+    """立即增量刷新（默认由后台任务每 COHORT_REFRESH_INTERVAL 秒刷新一次）"""
+    added = await asyncio.to_thread(refresh_cohort_analytics)
+    return APIResponse.success_response(
+        data={"added": added, "as_of_decision_id": cohort_analytics.last_decision_id},
+        message="群体决策分析已刷新"
+    )
+
+
+def _validate_cohort_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    query = params.pop("query", None)
+    if query not in _JOB_QUERIES:
+        raise ValueError(f"query 只支持 {', '.join(_JOB_QUERIES)}")
+    defaults = _JOB_QUERIES[query][1]
+    unknown = set(params) - set(defaults)
+    if unknown:
+        raise ValueError(f"未知参数: {', '.join(sorted(unknown))}")
+    if query == "outcomes" and not (isinstance(params.get("bins", 10), int) and 1 <= params.get("bins", 10) <= 100):
+        raise ValueError("bins 必须是 1 到 100 之间的整数")
+    return {"query": query, **defaults, **params}
+
+
+@job_manager.register("cohort_analysis", validate=_validate_cohort_job, cache_ttl=60,
+                      description="群体决策分析（query: summary / choices / patterns / outcomes）")
+async def run_cohort_job(ctx, params: Dict[str, Any]):
+    """在线程中查询常驻内存的决策表（数据在主进程内，不交给进程池）"""
+    method, defaults = _JOB_QUERIES[params["query"]]
+    return await ctx.run_in_thread(getattr(cohort_analytics, method), *(params[name] for name in defaults))
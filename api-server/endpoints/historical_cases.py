@@ -0,0 +1,121 @@
+"""
+历史案例决策端点
+案例在启动时编译，每次决策只做查表与追加
+"""
+from fastapi import APIRouter
+from pydantic import BaseModel
+from typing import Dict, Any, Optional
+import asyncio
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logic.historical_decision_engine import historical_decision_engine
+from logic.historical_case_progress_tracker import get_progress_tracker
+from utils.data_repository import data_repository
+from utils.response_format import APIResponse
+
+router = APIRouter(prefix="/api/historical", tags=["historical_cases"])
+
+
+class StartSessionRequest(BaseModel):
+    userId: str
+
+
+class DecisionRequest(BaseModel):
+    optionIndex: int
+
+
+class CaseFeedbackRequest(BaseModel):
+    userId: str
+    rating: Optional[int] = None
+    reflectionNotes: Optional[str] = None
+
+
+def _respond(result: Dict[str, Any], message: str):
+    if not result.get("success", False):
+        return APIResponse.error_response(message=result["error"], error_code=result["error_code"])
+    return APIResponse.success_response(data=result, message=message)
+
+
+@router.get("/cases")
+async def list_historical_cases(difficulty: Optional[str] = None):
+    """可用的历史案例列表"""
+    return APIResponse.success_response(
+        data=historical_decision_engine.list_cases(difficulty),
+        message="获取历史案例列表成功"
+    )
+
+
+@router.post("/cases/{scenario_id}/sessions")
+async def start_historical_session(scenario_id: str, request: StartSessionRequest):
+    """开始一个历史案例会话，返回第一个决策点"""
+    result = historical_decision_engine.start_session(request.userId, scenario_id)
+    return _respond(result, "历史案例会话已创建")
+
+
+@router.post("/sessions/{session_id}/decisions")
+async def submit_historical_decision(session_id: str, request: DecisionRequest):
+    """提交当前决策点的选择"""
+    result = historical_decision_engine.process_decision(session_id, request.optionIndex)
+    if result.get("success", False):
+        tracker = get_progress_tracker()
+        await asyncio.to_thread(tracker.record_user_decision, result["userId"], result["scenarioId"],
+                                result["currentStep"], request.optionIndex)
+        if result["completed"]:
+            await asyncio.to_thread(tracker.complete_case_interaction, result["userId"], result["scenarioId"])
+    return _respond(result, "决策已处理")
+
+
+@router.get("/sessions/{session_id}")
+async def get_historical_session(session_id: str):
+    """会话当前状态"""
+    return _respond(historical_decision_engine.get_session_state(session_id), "获取会话状态成功")
+
+
+@router.get("/progress/{user_id}/{scenario_id}")
+async def get_historical_progress(user_id: str, scenario_id: str):
+    """用户在某个历史案例中的进度"""
+    return APIResponse.success_response(
+        data=historical_decision_engine.get_user_progress(user_id, scenario_id),
+        message="获取进度成功"
+    )
+
+
+@router.post("/cases/{case_id}/feedback")
+async def submit_case_feedback(case_id: str, request: CaseFeedbackRequest):
+    """提交案例评分与反思笔记"""
+    tracker = get_progress_tracker()
+    await asyncio.to_thread(tracker.complete_case_interaction, request.userId, case_id,
+                            request.rating, request.reflectionNotes)
+    return APIResponse.success_response(data={"caseId": case_id}, message="反馈已记录")
+
+
+@router.get("/users/{user_id}/summary")
+async def get_historical_user_summary(user_id: str):
+    """用户的历史案例学习汇总"""
+    summary = await asyncio.to_thread(get_progress_tracker().get_user_summary, user_id)
+    return APIResponse.success_response(data=summary.dict(), message="获取用户汇总成功")
+
+
+@router.get("/cases/{case_id}/analytics")
+async def get_historical_case_analytics(case_id: str):
+    """案例分析：尝试次数、完成率与最常见的选择（按真实选择记录聚合）"""
+    analytics = await asyncio.to_thread(get_progress_tracker().get_case_analytics, case_id)
+    return APIResponse.success_response(data=analytics.dict(), message="获取案例分析成功")
+
+
+@router.get("/cache/stats")
+async def get_historical_cache_stats():
+    """数据文件缓存、历史案例进度缓存与决策会话的命中率、容量和淘汰统计"""
+    tracker = get_progress_tracker()
+    return APIResponse.success_response(
+        data={
+            "data_repository": data_repository.stats(),
+            "user_progress_cache": tracker.progress_cache.stats(),
+            "interaction_cache": tracker.interaction_cache.stats(),
+            "decision_sessions": historical_decision_engine.sessions.stats(),
+        },
+        message="获取缓存统计成功"
+    )
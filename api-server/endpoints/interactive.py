@@ -14,8 +14,7 @@ from pydantic import BaseModel
 # 创建路由器
 router = APIRouter(prefix="/api", tags=["interactive"])
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
+# 日志输出由 utils.logging_config.setup_logging 统一配置
 logger = logging.getLogger(__name__)
 
 class InteractiveRequest(BaseModel):
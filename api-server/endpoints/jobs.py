@@ -0,0 +1,82 @@
+"""
+后台任务端点
+重量级分析与导出提交为后台任务：提交后立即返回任务ID，通过状态接口查询进度，完成后下载结果
+"""
+from fastapi import APIRouter
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+from typing import Any, Dict
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logic.job_queue import job_manager, Job, QUEUED, RUNNING, SUCCEEDED, CANCELLED, MIN_PRIORITY, MAX_PRIORITY, DEFAULT_PRIORITY
+from utils.error_handlers import CustomException
+from utils.response_format import APIResponse
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+class JobRequest(BaseModel):
+    kind: str
+    params: Dict[str, Any] = Field(default_factory=dict)
+    # 0-9，数值越小越先执行
+    priority: int = Field(default=DEFAULT_PRIORITY, ge=MIN_PRIORITY, le=MAX_PRIORITY)
+    # 为假时忽略缓存，强制重新执行
+    use_cache: bool = True
+
+
+async def _require_job(job_id: str) -> Job:
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise CustomException("任务不存在或已过期", "JOB_NOT_FOUND", 404)
+    return job
+
+
+@router.get("")
+async def list_job_kinds():
+    """可提交的任务种类"""
+    return APIResponse.success_response(data=job_manager.describe_kinds(), message="获取任务种类成功")
+
+
+@router.post("")
+async def submit_job(request: JobRequest):
+    """提交后台任务；相同输入在缓存有效期内直接返回已有任务"""
+    try:
+        job = await job_manager.submit(request.kind, request.params, request.priority, request.use_cache)
+    except ValueError as e:
+        raise CustomException(str(e), "INVALID_JOB", 400)
+    return APIResponse.success_response(data=job.view(), message="任务已提交" if not job.cached else "命中缓存结果")
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """任务状态与进度"""
+    job = await _require_job(job_id)
+    return APIResponse.success_response(data=job.view(), message="获取任务状态成功")
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str):
+    """任务结果：结果为文件时直接下载，否则返回 JSON"""
+    job = await _require_job(job_id)
+    if job.status in (QUEUED, RUNNING):
+        raise CustomException("任务尚未完成", "JOB_NOT_FINISHED", 409)
+    if job.status != SUCCEEDED:
+        raise CustomException(job.error or f"任务已{job.status}，没有结果", "JOB_NO_RESULT", 409)
+    if job.result_file:
+        if not os.path.exists(job.result_file):
+            raise CustomException("结果文件已过期", "JOB_NOT_FOUND", 404)
+        result = job.result or {}
+        return FileResponse(job.result_file, media_type=result.get("media_type"), filename=result.get("filename"))
+    return APIResponse.success_response(data=job.result, message="获取任务结果成功")
+
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str):
+    """取消排队或运行中的任务"""
+    job = await job_manager.cancel(job_id)
+    if job is None:
+        raise CustomException("任务不存在或已过期", "JOB_NOT_FOUND", 404)
+    return APIResponse.success_response(data=job.view(), message="任务已取消" if job.status == CANCELLED else "任务已结束")
@@ -1,112 +1,261 @@
-from fastapi import APIRouter
-from typing import Dict, Any, List
-import json
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Optional
+import asyncio
 from datetime import datetime
+import time
 
-from ..models.test_results import ChallengeResultSummary
-from ..models.user_responses import UserResponseRecord
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logic.results_store import get_results_store, results_writer, delete_session_after_flush, SECONDS_PER_DAY
+from logic.results_export import iter_export, supported_formats, MEDIA_TYPES
+from logic.job_queue import job_manager
 
 # 创建路由器
 router = APIRouter(prefix="/api", tags=["test_results"])
 
+# 单次群体导出的最大用户数
+MAX_COHORT_EXPORT_USERS = 1000
+
+# 偏差类型与测试类型对应的改进领域名称
+AREA_LABELS = {
+    "exponential_misconception": "指数增长理解",
+    "exponential": "指数增长理解",
+    "compound_interest_misunderstanding": "复利效应认识",
+    "compound": "复利效应认识",
+    "linear_thinking_bias": "线性思维",
+    "complex_system_misunderstanding": "复杂系统认识",
+    "complex_system": "复杂系统认识",
+    "advanced_cognitive_bias": "高级认知挑战",
+    "advanced": "高级认知挑战",
+    "historical": "历史决策分析",
+    "game": "推理游戏",
+}
+
+# 按测试类型的下一步建议
+NEXT_STEPS = {
+    "exponential": "继续练习指数增长相关测试",
+    "compound": "关注复利思维陷阱测试",
+    "historical": "尝试历史决策重现挑战",
+    "game": "完成更多推理游戏挑战",
+    "complex_system": "练习复杂系统故障分析",
+    "advanced": "挑战高级认知测试",
+}
+DEFAULT_NEXT_STEPS = ["继续练习指数增长相关测试", "关注复利思维陷阱测试", "尝试历史决策重现挑战"]
+
+# 各测试类型首次完成后获得的徽章
+BADGES = {
+    "exponential": "指数增长新手",
+    "compound": "复利探索者",
+    "historical": "历史决策观察者",
+    "game": "推理游戏玩家",
+    "complex_system": "系统思维学徒",
+}
+
+
+def _area_label(key: str) -> str:
+    return AREA_LABELS.get(key, key)
+
+
+def _level(score: float) -> str:
+    if score >= 75:
+        return "Proficient"
+    if score >= 50:
+        return "Developing"
+    return "Beginning"
+
+
+def _recommendations(progress: List[Dict[str, Any]]) -> List[str]:
+    """优先推荐最近平均分最低的测试类型"""
+    weakest = sorted(progress, key=lambda p: p["recent_average"])
+    steps = [NEXT_STEPS[p["test_type"]] for p in weakest if p["test_type"] in NEXT_STEPS]
+    for step in DEFAULT_NEXT_STEPS:
+        if step not in steps:
+            steps.append(step)
+    return steps[:3]
+
+
+def _current_streak(active_days: List[int], today: int) -> int:
+    """从今天（或昨天）起连续有提交的天数"""
+    if not active_days or active_days[0] < today - 1:
+        return 0
+    streak, expected = 0, active_days[0]
+    for day in active_days:
+        if day != expected:
+            break
+        streak += 1
+        expected -= 1
+    return streak
+
+
 @router.get("/test-results/aggregate/{user_id}")
 async def get_user_aggregate_results(user_id: str):
     """获取用户的聚合测试结果"""
-    # 这拟返回用户聚合结果
+    store = get_results_store()
+    summary = await asyncio.to_thread(store.user_summary, user_id)
+    recent = await asyncio.to_thread(store.user_history, user_id, 5)
+    progress = await asyncio.to_thread(store.type_progress, user_id)
+
+    recent_scores = [row["score"] for row in reversed(recent)]
+    improvement_rate = 0.0
+    if len(recent_scores) > 1:
+        improvement_rate = round((recent_scores[-1] - recent_scores[0]) / (len(recent_scores) - 1), 2)
+
     return {
         "userId": user_id,
-        "total_tests_completed": 5,
-        "average_score": 76.5,
-        "improvement_areas": ["指数增长理解", "复利效应认识"],
+        "total_tests_completed": summary["total_tests"],
+        "average_score": summary["average_score"],
+        "improvement_areas": [_area_label(bias) for bias in list(summary["bias_counts"])[:3]],
         "trend_analysis": {
-            "recent_scores": [70, 72, 75, 78, 80],
-            "improvement_rate": 2.5
+            "recent_scores": recent_scores,
+            "improvement_rate": improvement_rate
         },
-        "next_recommendations": [
-            "继续练习指数增长相关测试",
-            "关注复利思维陷阱测试",
-            "尝试历史决策重现挑战"
-        ]
+        "next_recommendations": _recommendations(progress)
+    }
+
+def _export_response(fmt: str, rows, filename: str, header: Dict[str, Any],
+                     trailer: Dict[str, Any]) -> StreamingResponse:
+    headers = {}
+    if fmt != "json":
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return StreamingResponse(
+        iter_export(fmt, rows, header, trailer),
+        media_type=MEDIA_TYPES[fmt],
+        headers=headers
+    )
+
+
+@router.get("/test-results/cohort/export")
+async def export_cohort_results(user_ids: str = Query(..., description="逗号分隔的用户ID"),
+                                test_type: Optional[str] = Query(default=None, description="只导出指定测试类型"),
+                                format: str = "csv"):
+    """流式导出一组用户的测试结果"""
+    fmt = format.lower()
+    if fmt not in supported_formats():
+        return {"error": f"不支持的格式: {format}", "supported_formats": supported_formats()}
+    ids = [uid.strip() for uid in user_ids.split(",") if uid.strip()][:MAX_COHORT_EXPORT_USERS]
+
+    store = get_results_store()
+
+    def rows():
+        for uid in ids:
+            yield from store.iter_user_results(uid, test_type=test_type)
+
+    header = {
+        "userIds": ids,
+        "export_date": datetime.now().isoformat(),
+        "results_format": fmt,
+    }
+    return _export_response(fmt, rows(), "cohort_results", header, {})
+
+
+def _validate_export_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    user_ids = params.get("user_ids")
+    if isinstance(user_ids, str):
+        user_ids = user_ids.split(",")
+    if not isinstance(user_ids, list) or not all(isinstance(uid, str) for uid in user_ids):
+        raise ValueError("user_ids 必须是用户ID列表或逗号分隔的字符串")
+    ids = list(dict.fromkeys(uid.strip() for uid in user_ids if uid.strip()))
+    if not ids or len(ids) > MAX_COHORT_EXPORT_USERS:
+        raise ValueError(f"user_ids 需要 1 到 {MAX_COHORT_EXPORT_USERS} 个用户")
+    fmt = str(params.get("format", "csv")).lower()
+    if fmt not in supported_formats():
+        raise ValueError(f"不支持的格式: {fmt}（可用: {', '.join(supported_formats())}）")
+    return {"user_ids": ids, "test_type": params.get("test_type"), "format": fmt}
+
+
+@job_manager.register("results_export", validate=_validate_export_job, cache_ttl=300,
+                      description="批量导出一组用户的测试结果为文件（user_ids, test_type, format）")
+async def run_export_job(ctx, params: Dict[str, Any]):
+    """在线程中把导出内容写入结果文件，按已处理的用户数报告进度"""
+    ids, fmt = params["user_ids"], params["format"]
+    store = get_results_store()
+    counts = {"rows": 0, "bytes": 0}
+
+    def rows():
+        for index, uid in enumerate(ids):
+            for row in store.iter_user_results(uid, test_type=params["test_type"]):
+                counts["rows"] += 1
+                yield row
+            ctx.progress(index + 1, len(ids))
+
+    def write(path: str):
+        header = {"userIds": ids, "export_date": datetime.now().isoformat(), "results_format": fmt}
+        with open(path, "wb") as f:
+            for chunk in iter_export(fmt, rows(), header, {}):
+                f.write(chunk)
+                counts["bytes"] += len(chunk)
+
+    await ctx.run_in_thread(write, ctx.result_path(fmt))
+    return {
+        "format": fmt,
+        "media_type": MEDIA_TYPES[fmt],
+        "filename": f"cohort_results.{fmt}",
+        **counts,
     }
 
+
 @router.get("/test-results/export/{user_id}")
 async def export_user_results(user_id: str, format: str = "json"):
-    """导出用户测试结果"""
-    # 基于format参数返回不同格式的结果
-    if format.lower() == "json":
-        return {
-            "userId": user_id,
-            "export_date": datetime.now().isoformat(),
-            "results_format": "json",
-            "data": {
-                "test_history": [
-                    {
-                        "sessionId": "session_001",
-                        "testType": "exponential",
-                        "score": 85,
-                        "completed_at": "2025-11-09T10:30:00Z",
-                        "improvement_areas": ["exponential_misconception"]
-                    },
-                    {
-                        "sessionId": "session_002", 
-                        "testType": "compound",
-                        "score": 68,
-                        "completed_at": "2025-11-09T11:15:00Z",
-                        "improvement_areas": ["compound_interest_misunderstanding"]
-                    }
-                ],
-                "aggregate_stats": {
-                    "total_tests": 2,
-                    "average_score": 76.5,
-                    "most_common_biases": ["linear_thinking", "compound_interest_misunderstanding"]
-                }
+    """流式导出用户测试结果（json / csv / ndjson，安装 pyarrow 后支持 parquet）"""
+    fmt = format.lower()
+    if fmt not in supported_formats():
+        return {"error": f"不支持的格式: {format}", "supported_formats": supported_formats()}
+
+    store = get_results_store()
+    trailer = {}
+    if fmt == "json":
+        summary = await asyncio.to_thread(store.user_summary, user_id)
+        trailer = {
+            "aggregate_stats": {
+                "total_tests": summary["total_tests"],
+                "average_score": summary["average_score"],
+                "most_common_biases": list(summary["bias_counts"])[:3]
             }
         }
-    elif format.lower() == "csv":
-        # 返回CSV格式的模拟数据
-        return {
-            "userId": user_id,
-            "export_date": datetime.now().isoformat(),
-            "results_format": "csv",
-            "download_url": f"/api/test-results/download/{user_id}?format=csv"
-        }
-    else:
-        return {"error": f"不支持的格式: {format}", "supported_formats": ["json", "csv"]}
+    header = {
+        "userId": user_id,
+        "export_date": datetime.now().isoformat(),
+        "results_format": fmt,
+    }
+    return _export_response(fmt, store.iter_user_results(user_id), f"{user_id}_results", header, trailer)
 
 @router.get("/test-results/dashboard/{user_id}")
 async def get_user_dashboard(user_id: str):
     """获取用户测试仪表板"""
+    store = get_results_store()
+    now = time.time()
+    week = 7 * SECONDS_PER_DAY
+    active_days = await asyncio.to_thread(store.active_days, user_id)
+    this_week = await asyncio.to_thread(store.average_score_between, user_id, now - week, now + 1)
+    last_week = await asyncio.to_thread(store.average_score_between, user_id, now - 2 * week, now - week)
+    progress = await asyncio.to_thread(store.type_progress, user_id)
+
+    trend = "flat"
+    if this_week is not None and last_week is not None:
+        trend = "up" if this_week > last_week else "down" if this_week < last_week else "flat"
+
     return {
         "userId": user_id,
         "dashboard_data": {
-            "current_streak": 3,
-            "badges_earned": [
-                "指数增长新手", 
-                "复利探索者",
-                "线性思维挑战者"
-            ],
+            "current_streak": _current_streak(active_days, int(now // SECONDS_PER_DAY)),
+            "badges_earned": [BADGES[p["test_type"]] for p in progress if p["test_type"] in BADGES],
             "weekly_progress": {
-                "this_week": 85,
-                "last_week": 72,
-                "trend": "up"
+                "this_week": this_week,
+                "last_week": last_week,
+                "trend": trend
             },
             "top_improvement_areas": [
                 {
-                    "area": "指数增长误区",
-                    "improvement": 15,
-                    "current_level": "Developing"
-                },
-                {
-                    "area": "复利思维陷阱", 
-                    "improvement": 5,
-                    "current_level": "Beginning"
+                    "area": _area_label(p["test_type"]),
+                    "improvement": p["improvement"],
+                    "current_level": _level(p["recent_average"])
                 }
+                for p in progress[:3]
             ],
-            "recommended_next_steps": [
-                "完成兔子繁殖挑战",
-                "尝试历史决策重现",
-                "练习更多复利计算"
-            ]
+            "recommended_next_steps": _recommendations(progress)
         }
     }
 
@@ -124,29 +273,29 @@ async def update_user_settings(user_id: str, settings: Dict[str, Any]):
 
 @router.get("/test-results/statistics/global")
 async def get_global_statistics():
-    """获取全局统计数据"""
-    return {
-        "total_users": 1250,
-        "total_tests_taken": 5420,
-        "average_score": 68.2,
-        "most_common_biases": [
-            {"bias": "linear_thinking", "frequency": 0.42},
-            {"bias": "exponential_misconception", "frequency": 0.38},
-            {"bias": "compound_interest_misunderstanding", "frequency": 0.35}
-        ],
-        "top_improved_areas": [
-            {"area": "指数增长理解", "improvement_rate": 0.65},
-            {"area": "复利效应认识", "improvement_rate": 0.58}
-        ]
-    }
+    """获取全局统计数据（读取增量维护的聚合值，O(1)）"""
+    # snapshot 会等待结果库的锁（写入事务期间被占用），放到线程中执行以免阻塞事件循环
+    stats = await asyncio.to_thread(get_results_store().aggregates.snapshot)
+    stats["top_improved_areas"] = [
+        {"area": _area_label(area["test_type"]), "improvement_rate": area["improvement_rate"]}
+        for area in stats["top_improved_areas"]
+    ]
+    return stats
 
 @router.delete("/test-results/session/{session_id}")
 async def delete_session(session_id: str):
     """删除特定会话的测试结果"""
-    # 在实际应用中，这里会从数据库删除会话数据
-    # 现在返回成功消息
+    deleted_rows = await delete_session_after_flush(get_results_store(), results_writer, session_id)
+    if not deleted_rows:
+        return {
+            "session_id": session_id,
+            "deleted": False,
+            "deleted_count": 0,
+            "message": f"会话 {session_id} 没有可删除的测试结果"
+        }
     return {
         "session_id": session_id,
         "deleted": True,
+        "deleted_count": len(deleted_rows),
         "message": f"会话 {session_id} 的测试结果已删除"
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,219 @@
+"""
+批量认知偏差检测模块
+以列式数组（估算值/实际值/主观置信度/实际准确率）一次性计算误差率、强度等级和检测标记，
+只为最终返回的行生成解释文本，适用于数万条响应的群体报告
+"""
+
+from typing import Dict, Any, List, Optional, Sequence
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+
+try:
+    from .enhanced_cognitive_bias_detection import EnhancedCognitiveBiasAnalyzer, BiasType
+except ImportError:
+    from enhanced_cognitive_bias_detection import EnhancedCognitiveBiasAnalyzer, BiasType
+
+
+STRENGTH_LEVELS = np.array(["weak", "moderate", "strong", "severe"])
+
+# 与 EnhancedCognitiveBiasAnalyzer 中逐条检测的分档一致（大于阈值即升一档）
+LINEAR_STRENGTH_BINS = np.array([0.5, 2.0, 5.0])
+OVERCONFIDENCE_STRENGTH_BINS = np.array([0.1, 0.3, 0.5])
+
+LINEAR_RECOMMENDATIONS = [
+    "在分析复杂问题时考虑非线性关系",
+    "使用数学模型验证直觉判断",
+    "注意系统中的反馈循环和放大效应"
+]
+OVERCONFIDENCE_RECOMMENDATIONS = [
+    "接受训练以校准置信度",
+    "考虑可能的错误情况",
+    "寻求外部验证和反馈"
+]
+
+_THRESHOLDS = EnhancedCognitiveBiasAnalyzer().bias_thresholds
+
+
+@dataclass
+class BiasColumns:
+    """单一偏差类型的列式检测结果"""
+    bias_type: BiasType
+    metric: np.ndarray            # 误差率 / 过度自信程度
+    confidence_score: np.ndarray
+    strength_code: np.ndarray     # STRENGTH_LEVELS 下标
+    detected: np.ndarray
+
+
+def _as_array(values: Sequence[float]) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+def score_linear_thinking(estimations: Sequence[float], actuals: Sequence[float]) -> BiasColumns:
+    """向量化的线性思维偏差检测"""
+    est = _as_array(estimations)
+    act = _as_array(actuals)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        error_ratio = np.abs(est - act) / np.abs(act)
+    zero_actual = act == 0
+    error_ratio[zero_actual] = np.where(est[zero_actual] != 0, np.inf, 0.0)
+
+    confidence = np.where(np.isinf(error_ratio), 1.0, np.minimum(error_ratio, 1.0))
+    return BiasColumns(
+        bias_type=BiasType.LINEAR_THINKING_BIAS,
+        metric=error_ratio,
+        confidence_score=confidence,
+        strength_code=np.searchsorted(LINEAR_STRENGTH_BINS, error_ratio, side="left"),
+        detected=confidence >= _THRESHOLDS[BiasType.LINEAR_THINKING_BIAS],
+    )
+
+
+def score_overconfidence(confidence_percentages: Sequence[float],
+                         accuracy_percentages: Sequence[float]) -> BiasColumns:
+    """向量化的过度自信偏差检测"""
+    conf = _as_array(confidence_percentages)
+    acc = _as_array(accuracy_percentages)
+
+    score = np.where(conf > acc, (conf - acc) / 100.0, 0.0)
+    return BiasColumns(
+        bias_type=BiasType.OVERCONFIDENCE_BIAS,
+        metric=score,
+        confidence_score=score,
+        strength_code=np.searchsorted(OVERCONFIDENCE_STRENGTH_BINS, score, side="left"),
+        detected=score >= _THRESHOLDS[BiasType.OVERCONFIDENCE_BIAS],
+    )
+
+
+def _render_linear(row: int, est: np.ndarray, act: np.ndarray, columns: BiasColumns) -> Dict[str, Any]:
+    error_ratio = float(columns.metric[row])
+    return {
+        "explanation": f"您的估算值为{est[row]}，实际值为{act[row]}，偏差率为{abs(error_ratio):.2%}。这反映了人类倾向于使用线性思维来理解非线性现象的认知偏差。",
+        "supporting_evidence": [
+            f"估算与实际值偏离{abs(error_ratio):.2%}",
+            "在复杂系统中使用了简化线性模型",
+            "低估了非线性效应的影响"
+        ],
+        "recommendations": LINEAR_RECOMMENDATIONS,
+    }
+
+
+def _render_overconfidence(row: int, conf: np.ndarray, acc: np.ndarray, columns: BiasColumns) -> Dict[str, Any]:
+    gap = conf[row] - acc[row]
+    return {
+        "explanation": f"主观置信度为{conf[row]}%，实际准确率为{acc[row]}%，差距{gap:.1f}%，存在过度自信偏差。",
+        "supporting_evidence": [
+            f"置信度与准确率差距: {gap:.1f}%",
+            f"过度自信程度: {float(columns.metric[row]):.2%}",
+            "高估了自己的判断能力"
+        ],
+        "recommendations": OVERCONFIDENCE_RECOMMENDATIONS,
+    }
+
+
+def _profile(all_columns: List[BiasColumns]) -> Dict[str, Any]:
+    """与 calculate_overall_bias_profile 相同结构的汇总，全部由数组归约得到"""
+    total = sum(len(c.detected) for c in all_columns)
+    total_detected = int(sum(int(c.detected.sum()) for c in all_columns))
+    confidence_sum = float(sum(c.confidence_score.sum() for c in all_columns))
+    avg_confidence = confidence_sum / total if total else 0
+
+    strongest_bias = None
+    best = -1.0
+    for c in all_columns:
+        if len(c.confidence_score) and c.confidence_score.max() > best:
+            best = float(c.confidence_score.max())
+            strongest_bias = c.bias_type.value
+
+    strength_counts = {level: 0 for level in STRENGTH_LEVELS}
+    recommendations = set()
+    for c in all_columns:
+        counts = np.bincount(c.strength_code[c.detected], minlength=len(STRENGTH_LEVELS))
+        for level, count in zip(STRENGTH_LEVELS, counts):
+            strength_counts[level] += int(count)
+        if len(c.detected):
+            recommendations.update(
+                LINEAR_RECOMMENDATIONS if c.bias_type == BiasType.LINEAR_THINKING_BIAS else OVERCONFIDENCE_RECOMMENDATIONS
+            )
+
+    return {
+        'total_biases_detected': total_detected,
+        'total_biases_analyzed': total,
+        'average_confidence_score': avg_confidence,
+        'strongest_bias': strongest_bias,
+        'bias_strength_distribution': {str(k): v for k, v in strength_counts.items()},
+        'overall_accuracy_rate': max(0, 1 - avg_confidence),
+        'recommendation_summary': sorted(recommendations)
+    }
+
+
+def analyze_bias_batch(estimations: Optional[Sequence[float]] = None,
+                       actuals: Optional[Sequence[float]] = None,
+                       confidence_percentages: Optional[Sequence[float]] = None,
+                       accuracy_percentages: Optional[Sequence[float]] = None,
+                       only_detected: bool = True,
+                       limit: int = 100) -> Dict[str, Any]:
+    """
+    批量分析认知偏差
+    - estimations/actuals：线性思维偏差列（等长）
+    - confidence_percentages/accuracy_percentages：过度自信偏差列（等长）
+    - only_detected：只返回检测到偏差的行；limit：最多渲染的结果条数（按置信度降序）
+    """
+    all_columns: List[BiasColumns] = []
+    renderers = []
+
+    if estimations is not None and actuals is not None:
+        est, act = _as_array(estimations), _as_array(actuals)
+        if est.shape != act.shape:
+            raise ValueError("estimations 与 actuals 长度不一致")
+        columns = score_linear_thinking(est, act)
+        all_columns.append(columns)
+        renderers.append(lambda row, c=columns: _render_linear(row, est, act, c))
+
+    if confidence_percentages is not None and accuracy_percentages is not None:
+        conf, acc = _as_array(confidence_percentages), _as_array(accuracy_percentages)
+        if conf.shape != acc.shape:
+            raise ValueError("confidence_percentages 与 accuracy_percentages 长度不一致")
+        columns = score_overconfidence(conf, acc)
+        all_columns.append(columns)
+        renderers.append(lambda row, c=columns: _render_overconfidence(row, conf, acc, c))
+
+    timestamp = datetime.now().isoformat()
+
+    # 选出需要返回的行：各偏差类型合并后按置信度取前 limit 条
+    candidates = []
+    for index, columns in enumerate(all_columns):
+        rows = np.flatnonzero(columns.detected) if only_detected else np.arange(len(columns.detected))
+        if limit <= 0:
+            rows = rows[:0]
+        elif len(rows) > limit:
+            order = np.lexsort((-columns.metric[rows], -columns.confidence_score[rows]))
+            rows = rows[order[:limit]]
+        candidates.extend(
+            (float(columns.confidence_score[row]), float(columns.metric[row]), index, int(row)) for row in rows
+        )
+    # 置信度封顶为 1.0，相同时按原始指标（误差率等）排序
+    candidates.sort(key=lambda item: (item[0], item[1]), reverse=True)
+
+    results = []
+    for confidence, _, index, row in candidates[:limit]:
+        columns = all_columns[index]
+        result = {
+            'row': row,
+            'bias_type': columns.bias_type.value,
+            'detected': bool(columns.detected[row]),
+            'confidence_score': confidence,
+            'strength_level': str(STRENGTH_LEVELS[columns.strength_code[row]]),
+            'timestamp': timestamp,
+        }
+        result.update(renderers[index](row))
+        results.append(result)
+
+    profile = _profile(all_columns)
+    return {
+        'individual_results': results,
+        'profile_summary': profile,
+        'analysis_timestamp': timestamp,
+        'accuracy_assessment': f"{profile['overall_accuracy_rate']:.1%}"
+    }
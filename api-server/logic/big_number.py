@@ -0,0 +1,73 @@
+"""
+大数数值核心
+在 log10 空间中比较数量级、格式化科学计数法，避免为 1000^1000 这类表达式构造数千位的整数；
+只有显式要求时才计算精确值
+"""
+import math
+from typing import Optional, Union
+
+Number = Union[int, float]
+
+# 结果不超过 10^15 时精确计算（整数运算开销可忽略）
+EXACT_LOG10_LIMIT = 15
+# 超过该数量级后无法安全转换为 float
+FLOAT_LOG10_LIMIT = 300
+
+
+def power_log10(base: Number, exponent: Number) -> float:
+    """log10(|base| ** exponent)；结果为 0 时返回 -inf"""
+    if base == 0:
+        return 0.0 if exponent == 0 else float("-inf")
+    return exponent * math.log10(abs(base))
+
+
+def log10_abs(value: Number) -> float:
+    """log10(|value|)，支持任意大小的整数；value 为 0 时返回 -inf"""
+    if value == 0:
+        return float("-inf")
+    return math.log10(abs(value))
+
+
+def approximate_value(log10_value: float) -> Optional[float]:
+    """由 log10 还原近似 float 值，超出 float 范围时返回 None"""
+    if log10_value > FLOAT_LOG10_LIMIT:
+        return None
+    if log10_value == float("-inf"):
+        return 0.0
+    return 10 ** log10_value
+
+
+def format_scientific(log10_value: float, precision: int = 2, negative: bool = False) -> str:
+    """按 '%.2e' 的格式输出科学计数法，如 1.61e+60"""
+    if log10_value == float("-inf"):
+        return f"{0.0:.{precision}e}"
+
+    exponent = math.floor(log10_value)
+    mantissa = round(10 ** (log10_value - exponent), precision)
+    if mantissa >= 10:
+        mantissa /= 10
+        exponent += 1
+    sign = "-" if negative else ""
+    return f"{sign}{mantissa:.{precision}f}e{'+' if exponent >= 0 else '-'}{abs(exponent):02d}"
+
+
+def magnitude_gap(estimate: Number, actual_log10: float) -> float:
+    """估算值与实际值的数量级差 log10(estimate) - log10(actual)；估算值非正时为 -inf"""
+    if estimate <= 0:
+        return float("-inf")
+    return log10_abs(estimate) - actual_log10
+
+
+def relative_error(estimate: Number, actual_log10: float) -> float:
+    """
+    |estimate - actual| / actual，actual 以 log10 形式给出（actual > 0）
+    结果超出 float 范围时返回 inf
+    """
+    if estimate == 0:
+        return 1.0
+
+    diff = log10_abs(estimate) - actual_log10
+    if diff > FLOAT_LOG10_LIMIT:
+        return float("inf")
+    ratio = 10 ** diff
+    return abs(ratio - 1) if estimate > 0 else ratio + 1
@@ -40,9 +40,19 @@ except ImportError:
             BiasDetectionResult
         )
 
-from typing import Dict, Any, List
-import math
-from utils.error_handlers import handle_calculation_errors, validate_input_range, safe_numeric_operation
+try:
+    from .big_number import (
+        EXACT_LOG10_LIMIT, FLOAT_LOG10_LIMIT, power_log10, approximate_value,
+        format_scientific, magnitude_gap, relative_error
+    )
+except ImportError:
+    from big_number import (
+        EXACT_LOG10_LIMIT, FLOAT_LOG10_LIMIT, power_log10, approximate_value,
+        format_scientific, magnitude_gap, relative_error
+    )
+
+# 低估判断阈值：估算值不足实际值的一半
+LOG10_HALF = math.log10(0.5)
 
 
 @handle_calculation_errors
@@ -100,10 +110,12 @@ def analyze_linear_thinking_bias(
 
 @handle_calculation_errors
 def analyze_exponential_misconception(
-    user_estimation: float, exponential_base: int, exponential_power: int
+    user_estimation: float, exponential_base: int, exponential_power: int, exact: bool = False
 ) -> Dict[str, Any]:
     """
     分析指数增长误解
+    数量级比较在 log10 空间完成；结果超过 10^15 时 actual_value 为近似 float（超出 float 范围为 None），
+    exact=True 时才计算精确整数
     """
     # 输入验证
     validate_input_range(user_estimation, min_val=-1e15, max_val=1e15, param_name="user_estimation")
@@ -111,23 +123,34 @@ def analyze_exponential_misconception(
     validate_input_range(float(exponential_power), min_val=0, max_val=1000, param_name="exponential_power")
 
     def operation():
-        actual_value = exponential_base**exponential_power
+        actual_log10 = power_log10(exponential_base, exponential_power)
+        if exact or actual_log10 <= EXACT_LOG10_LIMIT:
+            actual_value = exponential_base**exponential_power
+        else:
+            actual_value = approximate_value(actual_log10)
+        actual_scientific = format_scientific(actual_log10)
 
-        if actual_value == 0:
+        if actual_log10 == float("-inf"):
             error_ratio = float("inf") if user_estimation != 0 else 0
-        else:
+        elif actual_log10 <= FLOAT_LOG10_LIMIT and actual_value is not None:
             error_ratio = abs(user_estimation - actual_value) / actual_value
+        else:
+            error_ratio = relative_error(user_estimation, actual_log10)
 
-        # 确定偏差方向
-        if user_estimation < actual_value * 1e-10:  # 显著低估
+        # 确定偏差方向（按数量级差判断）
+        if actual_log10 == float("-inf"):
+            gap = math.copysign(float("inf"), user_estimation) if user_estimation != 0 else 0.0
+        else:
+            gap = magnitude_gap(user_estimation, actual_log10)
+        if gap < -10:  # 显著低估
             bias_direction = "极度低估"
-        elif user_estimation < actual_value * 0.01:
+        elif gap < -2:
             bias_direction = "严重低估"
-        elif user_estimation < actual_value * 0.5:
+        elif gap < LOG10_HALF:
             bias_direction = "低估"
-        elif user_estimation > actual_value * 1e10:  # 显著高估
+        elif gap > 10:  # 显著高估
             bias_direction = "极度高估"
-        elif user_estimation > actual_value * 100:
+        elif gap > 2:
             bias_direction = "严重高估"
         else:
             bias_direction = "相对准确"
@@ -135,6 +158,9 @@ def analyze_exponential_misconception(
         return {
             "user_estimation": user_estimation,
             "actual_value": actual_value,
+            "actual_value_scientific": actual_scientific,
+            "actual_log10": actual_log10,
+            "exact": isinstance(actual_value, int),
             "exponential_expression": f"{exponential_base}^{exponential_power}",
             "error_ratio": error_ratio,
             "bias_direction": bias_direction,
@@ -143,9 +169,9 @@ def analyze_exponential_misconception(
                 "base": exponential_base,
                 "power": exponential_power,
                 "actual_result": actual_value,
-                "expression": f"{exponential_base}^{exponential_power} = {actual_value}",
+                "expression": f"{exponential_base}^{exponential_power} = {actual_value if isinstance(actual_value, int) else actual_scientific}",
             },
-            "explanation": f"对于{exponential_base}^{exponential_power}的问题，您的估算值为{user_estimation}，实际值为{'%.2e' % actual_value}，属于{bias_direction}。这体现了人类大脑难以直观理解指数增长威力的认知局限。",
+            "explanation": f"对于{exponential_base}^{exponential_power}的问题，您的估算值为{user_estimation}，实际值为{actual_scientific}，属于{bias_direction}。这体现了人类大脑难以直观理解指数增长威力的认知局限。",
             "pyramid_explanation": {
                 "core_conclusion": "人类对指数增长的直觉严重不足",
                 "supporting_arguments": [
@@ -154,7 +180,7 @@ def analyze_exponential_misconception(
                     "对天文数字缺乏直观感受",
                 ],
                 "examples": [
-                    f"2^200的结果{'%.2e' % (2**200)}远超可观测宇宙的原子总数",
+                    f"2^200的结果{format_scientific(power_log10(2, 200))}远超可观测宇宙的原子总数",
                     "纸张连续对折的厚度增长",
                     "病毒传播的指数模型",
                 ],
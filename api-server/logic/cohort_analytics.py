@@ -0,0 +1,337 @@
+"""
+群体决策分析模块
+把所有已存储的游戏回合决策以列式数组（字典编码的场景/难度/选项 + 数值列）常驻内存，
+按 id 增量追加新决策；选项分布、决策模式流行度和结局分布都用 bincount 等向量运算一次算出，
+百万级决策下查询仍在亚秒级
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import Dict, Any, List, Optional, Callable, Sequence
+
+import numpy as np
+
+try:
+    from .results_store import get_results_store, REPLAY_CHUNK
+except ImportError:
+    from results_store import get_results_store, REPLAY_CHUNK
+
+logger = logging.getLogger(__name__)
+
+# 与 detect_decision_pattern 中的约定一致：option 1 为激进/立即，2/4 为稳健/合作
+AGGRESSIVE_CHOICES = ("1",)
+CONSERVATIVE_CHOICES = ("2", "4")
+HIGH_INVESTMENT_AMOUNT = 6
+
+PATTERN_AGGRESSIVE = "激进/立即决策模式"
+PATTERN_CONSERVATIVE = "保守/稳健决策模式"
+PATTERN_HIGH_INVESTMENT = "高投入决策模式"
+PATTERN_NONE = "无明显模式"
+
+OUTCOME_METRICS = ("resources", "satisfaction", "reputation")
+GROUP_BY_FIELDS = ("turn", "scenario", "difficulty")
+OUTCOME_PERCENTILES = (10, 25, 50, 75, 90)
+
+_INITIAL_CAPACITY = 1024
+
+_INT_COLUMNS = ("session", "scenario", "difficulty", "turn", "choice")
+_FLOAT_COLUMNS = ("amount",) + OUTCOME_METRICS
+
+
+class _Dictionary:
+    """字符串 -> 连续整数编码"""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def encode(self, value: Optional[str]) -> int:
+        value = value or ""
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def _float(value) -> float:
+    return np.nan if value is None else float(value)
+
+
+class CohortAnalytics:
+    """常驻内存的列式决策表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last_decision_id = 0
+        self._size = 0
+        self._columns: Dict[str, np.ndarray] = {
+            **{name: np.zeros(_INITIAL_CAPACITY, dtype=np.int32) for name in _INT_COLUMNS},
+            **{name: np.zeros(_INITIAL_CAPACITY, dtype=np.float64) for name in _FLOAT_COLUMNS},
+        }
+        self._sessions = _Dictionary()
+        self._scenarios = _Dictionary()
+        self._difficulties = _Dictionary()
+        self._choices = _Dictionary()
+        # 会话编码 -> 场景编码
+        self._session_scenario = np.zeros(_INITIAL_CAPACITY, dtype=np.int32)
+
+    # ----- 增量追加 -----
+
+    @staticmethod
+    def _grow(array: np.ndarray, needed: int) -> np.ndarray:
+        if needed <= len(array):
+            return array
+        grown = np.zeros(max(needed, len(array) * 2), dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def append(self, rows: Sequence[tuple]) -> int:
+        """
+        追加 decisions_after 返回的行（id, session_id, scenario_id, difficulty, turn, choice,
+        amount, resources, satisfaction, reputation, timestamp）
+        """
+        if not rows:
+            return 0
+        count = len(rows)
+        batch = {name: np.empty(count, dtype=np.int32) for name in _INT_COLUMNS}
+        batch.update({name: np.empty(count, dtype=np.float64) for name in _FLOAT_COLUMNS})
+
+        with self._lock:
+            new_sessions = []
+            for i, row in enumerate(rows):
+                _, session_id, scenario_id, difficulty, turn, choice, amount, resources, satisfaction, reputation, _ = row
+                known = len(self._sessions.values)
+                session = self._sessions.encode(session_id)
+                scenario = self._scenarios.encode(scenario_id)
+                if session == known:
+                    new_sessions.append(scenario)
+                batch["session"][i] = session
+                batch["scenario"][i] = scenario
+                batch["difficulty"][i] = self._difficulties.encode(difficulty)
+                batch["turn"][i] = turn
+                batch["choice"][i] = self._choices.encode(choice)
+                batch["amount"][i] = _float(amount)
+                batch["resources"][i] = _float(resources)
+                batch["satisfaction"][i] = _float(satisfaction)
+                batch["reputation"][i] = _float(reputation)
+
+            start, end = self._size, self._size + count
+            for name, values in batch.items():
+                column = self._grow(self._columns[name], end)
+                column[start:end] = values
+                self._columns[name] = column
+            session_count = len(self._sessions.values)
+            self._session_scenario = self._grow(self._session_scenario, session_count)
+            self._session_scenario[session_count - len(new_sessions):session_count] = new_sessions
+            self._size = end
+            self.last_decision_id = max(self.last_decision_id, rows[-1][0])
+        return count
+
+    def refresh(self, fetch: Callable[[int, int], List[tuple]], chunk: int = REPLAY_CHUNK) -> int:
+        """从 fetch(after_id, limit) 读取并追加 last_decision_id 之后的新决策，返回新增行数"""
+        added = 0
+        while True:
+            rows = fetch(self.last_decision_id, chunk)
+            added += self.append(rows)
+            if len(rows) < chunk:
+                return added
+
+    # ----- 查询 -----
+
+    def _snapshot(self) -> Dict[str, Any]:
+        """取当前已追加部分的只读视图；之后的追加只写入 size 之后的位置或新数组，不影响视图"""
+        with self._lock:
+            size = self._size
+            sessions = len(self._sessions.values)
+            return {
+                "size": size,
+                "columns": {name: column[:size] for name, column in self._columns.items()},
+                "session_scenario": self._session_scenario[:sessions],
+                "sessions": sessions,
+                "scenarios": list(self._scenarios.values),
+                "difficulties": list(self._difficulties.values),
+                "choices": list(self._choices.values),
+                "as_of_decision_id": self.last_decision_id,
+            }
+
+    @staticmethod
+    def _mask(snap: Dict[str, Any], scenario_id: Optional[str], difficulty: Optional[str],
+              turn: Optional[int] = None) -> np.ndarray:
+        columns = snap["columns"]
+        mask = np.ones(snap["size"], dtype=bool)
+        for value, name, labels in ((scenario_id, "scenario", snap["scenarios"]),
+                                    (difficulty, "difficulty", snap["difficulties"])):
+            if value is None:
+                continue
+            if value not in labels:
+                return np.zeros(snap["size"], dtype=bool)
+            mask &= columns[name] == labels.index(value)
+        if turn is not None:
+            mask &= columns["turn"] == turn
+        return mask
+
+    def summary(self) -> Dict[str, Any]:
+        """决策总量与各场景的决策数、会话数"""
+        snap = self._snapshot()
+        columns = snap["columns"]
+        n_scenarios = len(snap["scenarios"])
+        decisions = np.bincount(columns["scenario"], minlength=n_scenarios)
+        sessions = np.bincount(snap["session_scenario"], minlength=n_scenarios)
+        return {
+            "total_decisions": snap["size"],
+            "total_sessions": snap["sessions"],
+            "scenarios": [
+                {"scenario_id": label, "decisions": int(decisions[code]), "sessions": int(sessions[code])}
+                for code, label in enumerate(snap["scenarios"])
+            ],
+            "difficulties": snap["difficulties"],
+            "as_of_decision_id": snap["as_of_decision_id"],
+        }
+
+    def choice_distribution(self, scenario_id: Optional[str] = None, difficulty: Optional[str] = None,
+                            turn: Optional[int] = None, group_by: str = "turn") -> Dict[str, Any]:
+        """按 回合/场景/难度 分组的选项分布"""
+        if group_by not in GROUP_BY_FIELDS:
+            raise ValueError(f"group_by 只支持 {', '.join(GROUP_BY_FIELDS)}")
+        snap = self._snapshot()
+        columns = snap["columns"]
+        mask = self._mask(snap, scenario_id, difficulty, turn)
+        keys = columns[group_by][mask]
+        choices = columns["choice"][mask]
+        n_choices = len(snap["choices"])
+
+        groups = []
+        if keys.size:
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+            counts = np.bincount(inverse * n_choices + choices,
+                                 minlength=len(unique_keys) * n_choices).reshape(len(unique_keys), n_choices)
+            labels = {"scenario": snap["scenarios"], "difficulty": snap["difficulties"]}.get(group_by)
+            for key, row in zip(unique_keys, counts):
+                total = int(row.sum())
+                order = np.argsort(-row, kind="stable")
+                groups.append({
+                    group_by: labels[key] if labels else int(key),
+                    "total": total,
+                    "choices": [
+                        {"choice": snap["choices"][c] or "未知", "count": int(row[c]), "share": round(float(row[c]) / total, 4)}
+                        for c in order if row[c]
+                    ],
+                })
+        return {
+            "group_by": group_by,
+            "total_decisions": int(keys.size),
+            "groups": groups,
+            "as_of_decision_id": snap["as_of_decision_id"],
+        }
+
+    def pattern_prevalence(self, scenario_id: Optional[str] = None,
+                           difficulty: Optional[str] = None) -> Dict[str, Any]:
+        """
+        各决策模式在会话中的流行度；每个会话按 detect_decision_pattern 的优先级归入一种模式，
+        只统计至少有 2 次决策的会话
+        """
+        snap = self._snapshot()
+        columns = snap["columns"]
+        mask = self._mask(snap, scenario_id, difficulty)
+        n_sessions = snap["sessions"]
+        sessions = columns["session"][mask]
+        choices = columns["choice"][mask]
+        labels = snap["choices"]
+
+        def count_choices(targets):
+            codes = [labels.index(c) for c in targets if c in labels]
+            hits = np.isin(choices, codes)
+            return np.bincount(sessions, weights=hits, minlength=n_sessions)
+
+        decisions = np.bincount(sessions, minlength=n_sessions)
+        aggressive = count_choices(AGGRESSIVE_CHOICES)
+        conservative = count_choices(CONSERVATIVE_CHOICES)
+        max_amount = np.full(n_sessions, -np.inf)
+        amounts = columns["amount"][mask]
+        valid = ~np.isnan(amounts)
+        np.maximum.at(max_amount, sessions[valid], amounts[valid])
+
+        coffee_codes = [code for code, label in enumerate(snap["scenarios"]) if "coffee-shop" in label]
+        is_coffee = np.isin(snap["session_scenario"], coffee_codes)
+
+        eligible = decisions >= 2
+        is_aggressive = eligible & (aggressive >= 2)
+        is_conservative = eligible & ~is_aggressive & (conservative >= 2)
+        is_high_investment = eligible & ~is_aggressive & ~is_conservative & is_coffee & (max_amount > HIGH_INVESTMENT_AMOUNT)
+        total = int(eligible.sum())
+        counts = {
+            PATTERN_AGGRESSIVE: int(is_aggressive.sum()),
+            PATTERN_CONSERVATIVE: int(is_conservative.sum()),
+            PATTERN_HIGH_INVESTMENT: int(is_high_investment.sum()),
+        }
+        counts[PATTERN_NONE] = total - sum(counts.values())
+        return {
+            "sessions_analyzed": total,
+            "patterns": [
+                {"pattern_type": pattern, "sessions": count, "prevalence": round(count / total, 4) if total else 0.0}
+                for pattern, count in counts.items()
+            ],
+            "as_of_decision_id": snap["as_of_decision_id"],
+        }
+
+    def outcome_distribution(self, metric: str = "resources", scenario_id: Optional[str] = None,
+                             difficulty: Optional[str] = None, bins: int = 10) -> Dict[str, Any]:
+        """各会话最后一回合结束时指标值的分布（直方图 + 分位数）"""
+        if metric not in OUTCOME_METRICS:
+            raise ValueError(f"metric 只支持 {', '.join(OUTCOME_METRICS)}")
+        bins = max(1, min(int(bins), 100))
+        snap = self._snapshot()
+        columns = snap["columns"]
+        rows = np.flatnonzero(self._mask(snap, scenario_id, difficulty))
+
+        # 每个会话取回合数最大的一行（同回合取最后写入的一行）
+        sessions = columns["session"][rows]
+        order = np.lexsort((rows, columns["turn"][rows], sessions))
+        ordered_sessions = sessions[order]
+        is_last = np.ones(len(order), dtype=bool)
+        is_last[:-1] = ordered_sessions[1:] != ordered_sessions[:-1]
+        values = columns[metric][rows[order[is_last]]]
+        values = values[~np.isnan(values)]
+
+        if not values.size:
+            return {"metric": metric, "sessions": 0, "histogram": [], "percentiles": {},
+                    "mean": None, "as_of_decision_id": snap["as_of_decision_id"]}
+        counts, edges = np.histogram(values, bins=bins)
+        return {
+            "metric": metric,
+            "sessions": int(values.size),
+            "mean": round(float(values.mean()), 2),
+            "percentiles": {
+                f"p{p}": round(float(v), 2)
+                for p, v in zip(OUTCOME_PERCENTILES, np.percentile(values, OUTCOME_PERCENTILES))
+            },
+            "histogram": [
+                {"from": round(float(edges[i]), 2), "to": round(float(edges[i + 1]), 2), "count": int(c)}
+                for i, c in enumerate(counts)
+            ],
+            "as_of_decision_id": snap["as_of_decision_id"],
+        }
+
+
+cohort_analytics = CohortAnalytics()
+
+COHORT_REFRESH_INTERVAL = float(os.getenv("COHORT_REFRESH_INTERVAL", "5"))
+
+
+def refresh_cohort_analytics() -> int:
+    return cohort_analytics.refresh(get_results_store().decisions_after)
+
+
+async def run_cohort_refresh(interval: float = COHORT_REFRESH_INTERVAL):
+    """后台任务：启动时全量加载，之后定期增量追加新决策"""
+    while True:
+        try:
+            added = await asyncio.to_thread(refresh_cohort_analytics)
+            if added:
+                logger.info("群体决策分析已刷新", extra={"added": added,
+                                                        "last_decision_id": cohort_analytics.last_decision_id})
+        except Exception as e:
+            logger.error(f"刷新群体决策分析失败: {e}")
+        await asyncio.sleep(interval)
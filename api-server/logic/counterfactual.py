@@ -0,0 +1,123 @@
+"""
+反事实推演（what-if）
+从已保存会话的第 k 回合分叉并换用其他决策。每条决策记录就是该回合结束时的状态检查点
+（含当时尚未兑现的延迟效果快照），分叉点直接取第 k-1 回合的记录，不必从第 1 回合重放；
+之后逐回合推进，随机数由会话种子和回合数生成（turn_rng），与原对局一致：换用相同决策时轨迹完全相同
+"""
+from typing import Any, Dict, List, Optional
+
+try:
+    from .game_session_service import (
+        GameSessionService, GameSessionRecord, SessionState, TurnTransition, turn_rng
+    )
+    from .delayed_effects import DelayedEffectQueue
+except ImportError:
+    from game_session_service import (
+        GameSessionService, GameSessionRecord, SessionState, TurnTransition, turn_rng
+    )
+    from delayed_effects import DelayedEffectQueue
+
+# 单次推演的最大回合数
+MAX_WHAT_IF_TURNS = 50
+_COMPARED_FIELDS = ("satisfaction", "resources", "reputation", "knowledge")
+
+
+def fork_session(session: GameSessionRecord, turn: int) -> GameSessionRecord:
+    """
+    返回位于第 turn 回合开始时的会话副本（不保存到服务中）；该回合之前的状态不可用时抛出 ValueError
+    副本使用独立的 game_id，推进时不会把原会话标记为待写检查点；随机数只取决于种子，与 game_id 无关
+    """
+    current_turn = session.state.turn_number
+    if not 1 <= turn <= current_turn:
+        raise ValueError(f"回合必须在 1 到 {current_turn} 之间")
+
+    if turn == 1:
+        base, effects = SessionState(), None
+    else:
+        # 历史按回合递增，可能只保留了最近几回合（由无状态令牌转来的会话）
+        index = (turn - 1) - session.history[0].turn if session.history else -1
+        base = session.history[index] if 0 <= index < len(session.history) else None
+        if base is None or base.turn_number != turn or base.satisfaction is None:
+            raise ValueError(f"第 {turn} 回合开始时的状态不可用")
+        effects = base.effects
+
+    return GameSessionRecord(
+        game_id=f"{session.game_id}:what-if",
+        scenario_id=session.scenario_id,
+        difficulty=session.difficulty,
+        challenge_type=session.challenge_type,
+        scenario=session.scenario,
+        state=base,
+        created_at=session.created_at,
+        effects=DelayedEffectQueue(effects) if effects else None,
+        seed=session.seed,
+    )
+
+
+def _trajectory_entry(turn: int, decisions: Dict[str, Any], state: SessionState) -> Dict[str, Any]:
+    return {"turn": turn, "decisions": decisions, "state": state.as_dict()}
+
+
+def _delta(original: Dict[str, Any], counterfactual: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        name: round(counterfactual[name] - original[name], 2)
+        for name in _COMPARED_FIELDS
+        if isinstance(original.get(name), (int, float)) and isinstance(counterfactual.get(name), (int, float))
+    }
+
+
+def what_if(service: GameSessionService, session: GameSessionRecord, turn: int,
+            alternatives: List[Dict[str, Any]], transition: TurnTransition,
+            follow_original: bool = True) -> Dict[str, Any]:
+    """
+    从第 turn 回合起依次使用 alternatives 中的决策推进；follow_original 为真时，替代决策用完后沿用原对局的决策直到当前回合。
+    transition 与正式回合相同，需接受 rng 和 effects 参数。返回原轨迹、反事实轨迹和逐回合差值
+    """
+    if not alternatives:
+        raise ValueError("至少需要一组替代决策")
+    fork = fork_session(session, turn)
+
+    original_records = [record for record in session.history if record.turn >= turn]
+    horizon = len(alternatives)
+    if follow_original:
+        horizon = max(horizon, len(original_records))
+    if horizon > MAX_WHAT_IF_TURNS:
+        raise ValueError(f"单次推演最多 {MAX_WHAT_IF_TURNS} 回合")
+
+    counterfactual = []
+    for offset in range(horizon):
+        if offset < len(alternatives):
+            decisions = alternatives[offset]
+        else:
+            decisions = original_records[offset].decisions
+        turn_number = fork.state.turn_number
+        service.advance(fork, decisions, transition,
+                        rng=turn_rng(fork.seed, turn_number),
+                        effects=service.effects_for(fork))
+        entry = _trajectory_entry(turn_number, fork.history[-1].decisions, fork.state)
+        if fork.effects is not None and fork.effects.last_applied:
+            entry["delayed_effects"] = fork.effects.last_applied
+        counterfactual.append(entry)
+
+    original = [_trajectory_entry(record.turn, record.decisions, record) for record in original_records]
+    divergence = [
+        {"turn": cf["turn"], "delta": _delta(orig["state"], cf["state"])}
+        for orig, cf in zip(original, counterfactual)
+    ]
+    # 与反事实最后一回合对应的原状态（推演超出原对局时取原对局的最后状态）
+    final_original: Optional[Dict[str, Any]] = (
+        original[min(len(counterfactual), len(original)) - 1]["state"] if original else None
+    )
+    final_counterfactual = counterfactual[-1]["state"]
+    return {
+        "game_id": session.game_id,
+        "fork_turn": turn,
+        "original": original,
+        "counterfactual": counterfactual,
+        "divergence": divergence,
+        "final": {
+            "original": final_original,
+            "counterfactual": final_counterfactual,
+            "delta": _delta(final_original, final_counterfactual) if final_original else {},
+        },
+    }
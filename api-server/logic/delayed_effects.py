@@ -0,0 +1,88 @@
+"""
+延迟效果调度
+场景逻辑把"若干回合后才显现"的效果登记为带到期回合的条目，放进每个会话的最小堆；
+回合推进时只弹出已到期的条目并应用（每条 O(log n)），不必每回合扫描状态。
+多次生效的条目按核函数更新数值后以新的到期回合重新入堆：
+constant 每次数值不变，decay 每次乘以 rate（衰减），compound 每次乘以 1 + rate（复利）
+"""
+import heapq
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+CONSTANT = "constant"
+DECAY = "decay"
+COMPOUND = "compound"
+KERNELS = (CONSTANT, DECAY, COMPOUND)
+
+# 取值范围为 0-100 的状态字段
+BOUNDED_FIELDS = frozenset(("satisfaction", "reputation", "knowledge"))
+
+# 堆条目：(到期回合, 序号, 目标字段, 数值, 核函数, rate, 剩余次数, 间隔回合, 来源说明)
+_DUE, _SEQ = 0, 1
+
+
+def _next_amount(kernel: str, amount: float, rate: float) -> float:
+    if kernel == DECAY:
+        return amount * rate
+    if kernel == COMPOUND:
+        return amount * (1 + rate)
+    return amount
+
+
+class DelayedEffectQueue:
+    """单个会话的延迟效果最小堆，按 (到期回合, 登记顺序) 出堆"""
+
+    __slots__ = ("_heap", "_seq", "last_applied")
+
+    def __init__(self, rows: Optional[Iterable[Sequence[Any]]] = None):
+        self._heap: List[tuple] = [tuple(row) for row in rows] if rows else []
+        heapq.heapify(self._heap)
+        self._seq = max((row[_SEQ] for row in self._heap), default=-1) + 1
+        # 最近一次 apply_due 兑现的效果，供回合反馈使用
+        self.last_applied: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, target: str, amount: float, due_turn: int, kernel: str = CONSTANT,
+                 rate: float = 0.0, repeats: int = 1, period: int = 1, source: Optional[str] = None) -> None:
+        """登记一个在 due_turn 回合首次生效、共生效 repeats 次、每 period 回合一次的效果"""
+        if kernel not in KERNELS:
+            raise ValueError(f"未知的延迟效果核函数: {kernel}")
+        if repeats < 1 or period < 1:
+            raise ValueError("repeats 和 period 必须为正整数")
+        heapq.heappush(self._heap, (due_turn, self._seq, target, amount, kernel, rate, repeats, period, source))
+        self._seq += 1
+
+    def apply_due(self, state: Dict[str, Any], turn_number: int) -> List[Dict[str, Any]]:
+        """把到期回合 <= turn_number 的效果加到 state 上，返回兑现的效果"""
+        heap = self._heap
+        applied = []
+        while heap and heap[0][_DUE] <= turn_number:
+            due, _, target, amount, kernel, rate, remaining, period, source = heap[0]
+            value = state.get(target, 0) + amount
+            state[target] = min(100, max(0, value)) if target in BOUNDED_FIELDS else value
+            applied.append({"turn": due, "target": target, "amount": round(amount, 2), "source": source})
+            if remaining > 1:
+                heapq.heapreplace(heap, (due + period, self._seq, target, _next_amount(kernel, amount, rate),
+                                         kernel, rate, remaining - 1, period, source))
+                self._seq += 1
+            else:
+                heapq.heappop(heap)
+        self.last_applied = applied
+        return applied
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """尚未兑现的效果（按到期回合排序），用于状态视图"""
+        return [
+            {"due_turn": due, "target": target, "amount": round(amount, 2), "kernel": kernel,
+             "remaining": remaining, "source": source}
+            for due, _, target, amount, kernel, _rate, remaining, _period, source in sorted(self._heap)
+        ]
+
+    def snapshot(self) -> tuple:
+        """当前条目的不可变快照；条目本身是元组，快照只复制引用"""
+        return tuple(self._heap)
+
+    def to_rows(self) -> List[tuple]:
+        """只含基础类型的条目列表，用于检查点和无状态令牌"""
+        return list(self._heap)
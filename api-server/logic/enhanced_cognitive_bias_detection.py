@@ -32,7 +32,7 @@ class BiasType(Enum):
     SOCIAL_PROOF_BIAS = "social_proof_bias"                 # 社会认同偏差
 
 
-@dataclass
+@dataclass(slots=True)
 class BiasDetectionResult:
     """认知偏差检测结果数据类"""
     bias_type: BiasType
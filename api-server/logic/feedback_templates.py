@@ -0,0 +1,238 @@
+"""
+回合反馈模板
+反馈文案放在 data/feedback_templates.json，按 (场景, 难度, 决策, 投入档位, 回合阶段) 编目。
+加载时把通配（"*"）和列表展开成完整的查找表，模板预先拆成字面量与槽位片段；
+回合时只做键归一化、一次字典查找和槽位填充。文案修改不涉及回合逻辑代码
+"""
+import json
+import logging
+import operator
+import os
+from string import Formatter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_TEMPLATES_PATH = os.getenv(
+    "FEEDBACK_TEMPLATES_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "feedback_templates.json"),
+)
+
+ANY = "*"
+DIFFICULTIES = ("beginner", "intermediate", "advanced")
+# turn-1/turn-2 为前两回合的困惑反馈，result 为决策结果反馈
+PHASES = ("turn-1", "turn-2", "result")
+
+# 回合模板可用的槽位（见 feedback_slots）
+TEMPLATE_SLOTS = frozenset((
+    "amount", "half_amount", "per_unit",
+    "old_satisfaction", "new_satisfaction", "satisfaction_change",
+    "old_resources", "new_resources", "resources_change",
+    "old_reputation", "new_reputation", "reputation_change",
+    "knowledge_change",
+))
+# 固定段落及其槽位
+SECTION_SLOTS = {
+    "pattern_analysis": frozenset(("turns", "pattern_type", "evidence", "significance")),
+    "next_steps": frozenset(),
+    "regret": frozenset(("score", "horizon", "best_score", "worst_score", "regret")),
+    "delayed_effects": frozenset(("items",)),
+    "delayed_effect_item": frozenset(("source", "target", "amount")),
+}
+
+_COMPARATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+# 查找键：(场景, 难度, 决策, 档位, 阶段)
+TemplateKey = Tuple[str, str, str, str, str]
+
+
+class _Template:
+    """预编译模板：不含槽位时直接返回原文，否则按 (字面量, 槽位, 格式) 片段拼接"""
+
+    __slots__ = ("static", "parts")
+
+    def __init__(self, text: str, allowed_slots: Iterable[str]):
+        parts = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            if field is not None:
+                if conversion or field not in allowed_slots:
+                    raise ValueError(f"反馈模板包含未知槽位: {{{field}}}")
+            parts.append((literal, field, spec or ""))
+        self.parts = tuple(parts)
+        self.static = text if all(field is None for _, field, _ in parts) else None
+
+    def render(self, slots: Dict[str, Any]) -> str:
+        if self.static is not None:
+            return self.static
+        return "".join(
+            literal if field is None else literal + format(slots[field], spec)
+            for literal, field, spec in self.parts
+        )
+
+
+class _BucketRule:
+    """按顺序比较的档位规则：[[档位, 比较符, 阈值], ..., [兜底档位]]，取第一条满足的"""
+
+    __slots__ = ("field", "rules", "labels")
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.field = spec["field"]
+        rules = []
+        for rule in spec["rules"]:
+            if len(rule) == 1:
+                rules.append((rule[0], None, None))
+            else:
+                label, op, threshold = rule
+                if op not in _COMPARATORS:
+                    raise ValueError(f"未知的档位比较符: {op}")
+                rules.append((label, _COMPARATORS[op], threshold))
+        if not rules or rules[-1][1] is not None:
+            raise ValueError(f"档位规则需要以兜底档位结尾: {self.field}")
+        self.rules = tuple(rules)
+        self.labels = tuple(label for label, _, _ in rules)
+
+    def bucket(self, slots: Dict[str, Any]) -> str:
+        value = slots.get(self.field)
+        if isinstance(value, (int, float)):
+            for label, compare, threshold in self.rules:
+                if compare is None or compare(value, threshold):
+                    return label
+        return self.labels[-1]
+
+
+class _ScenarioMeta:
+    __slots__ = ("action_field", "default_action", "actions")
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.action_field = spec.get("action_field", "action")
+        self.default_action = spec.get("default_action", "default")
+        self.actions = frozenset()
+
+
+def _as_tuple(value: Any) -> Tuple[str, ...]:
+    return tuple(value) if isinstance(value, list) else (value,)
+
+
+class FeedbackCatalog:
+    """编译后的反馈模板目录"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.version = data.get("version", 1)
+        self._scenarios = {scenario_id: _ScenarioMeta(spec) for scenario_id, spec in data.get("scenarios", {}).items()}
+        self._default_rule = _BucketRule(data["default_bucket"])
+        self._rules: Dict[Tuple[str, str], _BucketRule] = {(ANY, ANY): self._default_rule}
+        for scenario_id, spec in data.get("scenarios", {}).items():
+            for action, rule in spec.get("buckets", {}).items():
+                self._rules[(scenario_id, action)] = _BucketRule(rule)
+
+        self._table: Dict[TemplateKey, _Template] = {}
+        self._compile_templates(data.get("templates", []), data.get("fragments", {}))
+
+        self._sections: Dict[str, _Template] = {}
+        sections = data.get("sections", {})
+        for name, allowed in SECTION_SLOTS.items():
+            if name not in sections:
+                raise ValueError(f"反馈模板缺少段落: {name}")
+            self._sections[name] = _Template(sections[name], allowed)
+
+    def _compile_templates(self, templates: List[Dict[str, Any]], fragments: Dict[str, Dict[str, str]]) -> None:
+        # 同一键按指定字段数（特异度）取最具体的模板，特异度相同视为冲突
+        specificity: Dict[TemplateKey, int] = {}
+        actions: Dict[str, set] = {scenario_id: set() for scenario_id in self._scenarios}
+        for entry in templates:
+            scenario = entry.get("scenario", ANY)
+            difficulty = entry.get("difficulty", ANY)
+            action = entry.get("action", ANY)
+            bucket = entry.get("bucket", ANY)
+            phase = entry.get("phase", "result")
+            rank = sum(field != ANY for field in (scenario, difficulty, action, bucket))
+            for scenario_id in _as_tuple(scenario):
+                if scenario_id != ANY and scenario_id not in self._scenarios:
+                    raise ValueError(f"反馈模板引用了未登记的场景: {scenario_id}")
+                if scenario_id == ANY and action != ANY:
+                    raise ValueError("通用反馈模板不能指定决策")
+                for action_name in _as_tuple(action):
+                    if action_name != ANY:
+                        actions[scenario_id].add(action_name)
+                    rule = self._rules.get((scenario_id, action_name))
+                    labels = rule.labels if rule else (ANY,)
+                    for bucket_name in (labels if bucket == ANY else _as_tuple(bucket)):
+                        if bucket_name not in labels:
+                            raise ValueError(f"未知的投入档位: {scenario_id}/{action_name}/{bucket_name}")
+                        for level in (DIFFICULTIES if difficulty == ANY else _as_tuple(difficulty)):
+                            if level not in DIFFICULTIES:
+                                raise ValueError(f"未知的难度: {level}")
+                            text = entry["text"]
+                            for name, by_difficulty in fragments.items():
+                                text = text.replace("{@" + name + "}", by_difficulty.get(level, ""))
+                            template = _Template(text, TEMPLATE_SLOTS)
+                            for phase_name in (PHASES if phase == ANY else _as_tuple(phase)):
+                                if phase_name not in PHASES:
+                                    raise ValueError(f"未知的回合阶段: {phase_name}")
+                                key = (scenario_id, level, action_name, bucket_name, phase_name)
+                                existing = specificity.get(key, -1)
+                                if existing == rank:
+                                    raise ValueError(f"反馈模板冲突: {key}")
+                                if rank > existing:
+                                    specificity[key] = rank
+                                    self._table[key] = template
+        for scenario_id, names in actions.items():
+            self._scenarios[scenario_id].actions = frozenset(names)
+
+    @classmethod
+    def load(cls, path: str = FEEDBACK_TEMPLATES_PATH) -> "FeedbackCatalog":
+        with open(path, "r", encoding="utf-8") as f:
+            catalog = cls(json.load(f))
+        logger.info("反馈模板已编译", extra={"path": path, "entries": len(catalog._table)})
+        return catalog
+
+    def lookup(self, scenario_id: str, difficulty: str, decisions: Dict[str, Any],
+               phase: str, slots: Dict[str, Any]) -> Optional[_Template]:
+        """归一化查找键后查表；场景没有对应模板时退回通用模板（按满意度变化分档）"""
+        if difficulty not in DIFFICULTIES:
+            difficulty = DIFFICULTIES[0]
+        meta = self._scenarios.get(scenario_id)
+        if meta is not None:
+            action = decisions.get(meta.action_field, meta.default_action)
+            if not isinstance(action, str) or action not in meta.actions:
+                action = ANY
+            rule = self._rules.get((scenario_id, action))
+            template = self._table.get(
+                (scenario_id, difficulty, action, rule.bucket(slots) if rule else ANY, phase))
+            if template is not None:
+                return template
+        return self._table.get((ANY, difficulty, ANY, self._default_rule.bucket(slots), phase))
+
+    def render(self, scenario_id: str, difficulty: str, decisions: Dict[str, Any],
+               phase: str, slots: Dict[str, Any]) -> str:
+        template = self.lookup(scenario_id, difficulty, decisions, phase, slots)
+        return template.render(slots) if template is not None else ""
+
+    def section(self, name: str, **slots: Any) -> str:
+        return self._sections[name].render(slots)
+
+
+def feedback_slots(decisions: Dict[str, Any], old_state: Dict[str, Any], new_state: Dict[str, Any]) -> Dict[str, Any]:
+    """回合模板的槽位值，每回合计算一次"""
+    amount = decisions.get("amount", 0)
+    satisfaction_change = new_state["satisfaction"] - old_state["satisfaction"]
+    numeric = isinstance(amount, (int, float)) and not isinstance(amount, bool)
+    return {
+        "amount": amount,
+        "half_amount": amount // 2 if numeric else amount,
+        "per_unit": satisfaction_change // amount if numeric and amount else 0,
+        "old_satisfaction": old_state["satisfaction"],
+        "new_satisfaction": new_state["satisfaction"],
+        "satisfaction_change": satisfaction_change,
+        "old_resources": old_state["resources"],
+        "new_resources": new_state["resources"],
+        "resources_change": new_state["resources"] - old_state["resources"],
+        "old_reputation": old_state["reputation"],
+        "new_reputation": new_state["reputation"],
+        "reputation_change": new_state["reputation"] - old_state["reputation"],
+        "knowledge_change": new_state["knowledge"] - old_state["knowledge"],
+    }
+
+
+# 全局实例：导入时编译，模板有误时启动即失败
+feedback_catalog = FeedbackCatalog.load()
@@ -0,0 +1,157 @@
+"""
+游戏回合 WebSocket 通道
+连接时解析一次会话并在整个连接期间持有，客户端发送决策，服务端推送回合结果与反馈，
+省去每回合的 HTTP 请求头、CORS 预检和会话查找。服务端定期发送心跳，客户端长时间无消息则断开；
+同一会话的新连接接替旧连接，并可通过 resume_from 取回断线前已计算但未送达的回合结果
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+
+from utils.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+WS_HEARTBEAT_INTERVAL = float(os.getenv("WS_HEARTBEAT_INTERVAL", "20"))
+# 超过该时长未收到客户端任何消息（包括 pong）即断开
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", str(WS_HEARTBEAT_INTERVAL * 3)))
+
+CLOSE_SESSION_NOT_FOUND = 4404
+CLOSE_IDLE = 4408
+CLOSE_SUPERSEDED = 4409
+
+
+class ChannelRegistry:
+    """每个会话当前的连接，以及最近一次回合结果（供断线重连补发）"""
+
+    def __init__(self, max_results: int = 10_000, result_ttl: float = 1800):
+        self.connections: Dict[str, WebSocket] = {}
+        self.last_results = LRUCache(max_entries=max_results, ttl=result_ttl)
+
+    async def attach(self, game_id: str, websocket: WebSocket) -> None:
+        previous = self.connections.get(game_id)
+        self.connections[game_id] = websocket
+        if previous is not None and previous is not websocket:
+            try:
+                await previous.close(code=CLOSE_SUPERSEDED)
+            except RuntimeError:
+                pass
+
+    def detach(self, game_id: str, websocket: WebSocket) -> None:
+        if self.connections.get(game_id) is websocket:
+            del self.connections[game_id]
+
+    def remember(self, game_id: str, message: Dict[str, Any]) -> None:
+        self.last_results.set(game_id, message, size=0)
+
+    def missed(self, game_id: str, resume_from: int) -> Optional[Dict[str, Any]]:
+        """客户端已收到 resume_from 回合的结果时，返回其后未送达的最近一次结果"""
+        message = self.last_results.get(game_id)
+        if message is not None and message["turnNumber"] > resume_from:
+            return message
+        return None
+
+
+# 全局实例
+channel_registry = ChannelRegistry()
+
+
+def _error(error_code: str, message: str, seq: Any = None) -> Dict[str, Any]:
+    return {"type": "error", "seq": seq, "error": {"error_code": error_code, "message": message}}
+
+
+async def _heartbeat(websocket: WebSocket, last_seen: Dict[str, float],
+                     interval: float, idle_timeout: float) -> None:
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            if time.monotonic() - last_seen["at"] > idle_timeout:
+                await websocket.close(code=CLOSE_IDLE)
+                return
+            await websocket.send_json({"type": "heartbeat", "ts": time.time()})
+    except (WebSocketDisconnect, RuntimeError):
+        # 连接已关闭，由接收循环收尾
+        pass
+
+
+async def serve_game_channel(
+    websocket: WebSocket,
+    game_id: str,
+    get_session: Callable[[str], Any],
+    play_turn: Callable[..., Awaitable[Dict[str, Any]]],
+    state_view: Callable[[Any], Dict[str, Any]],
+    resume_from: Optional[int] = None,
+    heartbeat_interval: float = WS_HEARTBEAT_INTERVAL,
+    idle_timeout: float = WS_IDLE_TIMEOUT,
+    registry: ChannelRegistry = channel_registry,
+) -> None:
+    """
+    处理一个游戏连接
+    客户端消息：{"type": "turn", "decisions": {...}, "seq": 任意} / {"type": "ping"} / {"type": "pong"}
+    服务端消息：session（连接时的会话状态）、turn_result、heartbeat、pong、error
+    """
+    await websocket.accept()
+    session = get_session(game_id)
+    if session is None:
+        await websocket.send_json(_error("SESSION_NOT_FOUND", "游戏会话未找到"))
+        await websocket.close(code=CLOSE_SESSION_NOT_FOUND)
+        return
+
+    await registry.attach(game_id, websocket)
+    last_seen = {"at": time.monotonic()}
+    heartbeat = asyncio.create_task(_heartbeat(websocket, last_seen, heartbeat_interval, idle_timeout))
+    try:
+        await websocket.send_json(jsonable_encoder({
+            "type": "session",
+            "game_id": game_id,
+            "turnNumber": session.state.turn_number,
+            "difficulty": session.difficulty,
+            "game_state": state_view(session),
+            "heartbeat_interval": heartbeat_interval,
+        }))
+        if resume_from is not None:
+            missed = registry.missed(game_id, resume_from)
+            if missed is not None:
+                await websocket.send_json({**missed, "resumed": True})
+
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except ValueError:
+                await websocket.send_json(_error("BAD_MESSAGE", "消息不是有效的 JSON"))
+                continue
+            last_seen["at"] = time.monotonic()
+            kind = message.get("type") if isinstance(message, dict) else None
+            seq = message.get("seq") if isinstance(message, dict) else None
+
+            if kind == "turn":
+                decisions = message.get("decisions")
+                if not isinstance(decisions, dict):
+                    await websocket.send_json(_error("BAD_MESSAGE", "decisions 必须是对象", seq))
+                    continue
+                try:
+                    result = await play_turn(session, decisions)
+                except Exception as e:
+                    logger.error(f"WebSocket 回合执行失败: {e}", extra={"game_id": game_id})
+                    await websocket.send_json(_error("TURN_FAILED", "回合执行失败", seq))
+                    continue
+                reply = jsonable_encoder({"type": "turn_result", "seq": seq, **result})
+                registry.remember(game_id, reply)
+                await websocket.send_json(reply)
+            elif kind == "ping":
+                await websocket.send_json({"type": "pong", "seq": seq, "ts": time.time()})
+            elif kind == "pong":
+                continue
+            else:
+                await websocket.send_json(_error("UNKNOWN_MESSAGE", f"未知的消息类型: {kind}", seq))
+    except (WebSocketDisconnect, RuntimeError):
+        # 客户端断开，或连接已被心跳/新连接关闭
+        pass
+    finally:
+        heartbeat.cancel()
+        registry.detach(game_id, websocket)
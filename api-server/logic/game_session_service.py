@@ -0,0 +1,378 @@
+"""
+游戏会话服务
+创建会话与执行回合的唯一入口。会话、状态和决策记录都是 slots 数据类：
+场景按引用共享（难度变体每种只构建一次），相同的决策字典跨会话共享，时间戳存相对秒数，难度等短字符串驻留；
+响应所需的字典视图只在序列化时生成（state_view / history_view）
+"""
+import os
+import random
+import secrets
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional, Set, Tuple, Union
+
+from models.scenario import DifficultyLevel
+
+try:
+    from .delayed_effects import DelayedEffectQueue
+    from .thinking_traps import TrapCounters
+except ImportError:
+    from delayed_effects import DelayedEffectQueue
+    from thinking_traps import TrapCounters
+
+Number = Union[int, float]
+
+# (场景ID, 当前状态, 决策, 难度) -> 新状态
+TurnTransition = Callable[..., Dict[str, Any]]
+
+VALID_DIFFICULTIES = {level.value for level in DifficultyLevel}
+
+# 共享决策字典的上限，超过后新出现的决策按原样保存
+MAX_SHARED_DECISIONS = 4096
+
+# 会话最后一回合之后超过该秒数未活动即过期，从内存和检查点中移除
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", str(24 * 3600)))
+
+# SessionState 的固定字段；场景逻辑写入的其他字段放在 extra 中
+_CORE_FIELDS = ("satisfaction", "resources", "reputation", "knowledge", "turn_number")
+# 视图中的派生字段，回写状态时忽略
+_VIEW_FIELDS = frozenset(("difficulty", "challenge_type", "detected_biases", "detected_patterns",
+                          "user_patterns", "decision_history", "pending_effects"))
+
+
+@dataclass(slots=True)
+class SessionState:
+    satisfaction: Number = 50
+    resources: Number = 1000
+    reputation: Number = 50
+    knowledge: Number = 0
+    turn_number: int = 1
+    extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any], **kwargs) -> "SessionState":
+        extra = {k: v for k, v in values.items() if k not in _CORE_FIELDS and k not in _VIEW_FIELDS}
+        return cls(*(values[name] for name in _CORE_FIELDS), extra or None, **kwargs)
+
+    def as_dict(self) -> Dict[str, Any]:
+        values = {name: getattr(self, name) for name in _CORE_FIELDS}
+        if self.extra:
+            values.update(self.extra)
+        return values
+
+
+@dataclass(slots=True)
+class DecisionRecord(SessionState):
+    """一回合的决策及其结果状态；结果状态就是该回合后的会话状态，不另存副本"""
+    # 与其他会话相同的决策共享同一个字典
+    decisions: Optional[Dict[str, Any]] = None
+    # 相对会话创建时间的秒数
+    elapsed: int = 0
+    # 该回合结束时尚未兑现的延迟效果（堆条目共享，不复制），用于从任意回合分叉
+    effects: Optional[tuple] = None
+
+    @property
+    def turn(self) -> int:
+        return self.turn_number - 1
+
+
+@dataclass(slots=True)
+class GameSessionRecord:
+    game_id: str
+    scenario_id: str
+    difficulty: str
+    challenge_type: str
+    # 共享的场景对象（不复制）
+    scenario: Dict[str, Any]
+    state: SessionState = field(default_factory=SessionState)
+    history: List[DecisionRecord] = field(default_factory=list)
+    pattern_tracker: Optional[Any] = None
+    detected_patterns: Optional[List[Dict[str, Any]]] = None
+    created_at: int = field(default_factory=lambda: int(time.time()))
+    # 延迟效果队列，场景第一次登记延迟效果时才创建
+    effects: Optional[DelayedEffectQueue] = None
+    # 回合随机数种子，见 turn_rng
+    seed: int = field(default_factory=lambda: secrets.randbits(48))
+    # 思维陷阱分析的决策计数；从检查点恢复的会话在首次使用时由历史重建
+    trap_counters: Optional[TrapCounters] = None
+
+    @property
+    def last_active(self) -> int:
+        """最后一回合的时间（没有回合时为创建时间）"""
+        return self.created_at + (self.history[-1].elapsed if self.history else 0)
+
+    def add_pattern(self, pattern: Dict[str, Any]) -> None:
+        if self.detected_patterns is None:
+            self.detected_patterns = []
+        self.detected_patterns.append(pattern)
+
+
+def turn_rng(seed: int, turn_number: int) -> random.Random:
+    """会话某一回合的确定性随机数发生器：同一会话同一回合的随机结果总是相同，便于重放和反事实推演"""
+    return random.Random(f"{seed}:{turn_number}")
+
+
+# 选项 "1"-"4" 对应的风险偏好与节奏偏好标签，追踪器只保存下标
+RISK_LABELS = ("激进", "稳健", "中等", "保守")
+PACE_LABELS = ("立即", "谨慎", "平衡", "合作")
+CONSISTENCY_LABELS = ("高度一致", "中度一致", "多样化")
+AGGRESSIVE, CONSERVATIVE = 0, 3
+HIGHLY_CONSISTENT = 0
+
+
+class DecisionPatternTracker:
+    """追踪用户的决策模式，识别决策倾向（每次决策占 1 字节）"""
+
+    __slots__ = ("choices", "consistency")
+
+    def __init__(self):
+        self.choices = bytearray()      # 风险/节奏偏好下标，见 RISK_LABELS / PACE_LABELS
+        self.consistency = bytearray()  # 最近三次选择的一致性下标，见 CONSISTENCY_LABELS
+
+    @property
+    def patterns(self) -> Dict[str, List[str]]:
+        """解码后的模式标签"""
+        return {
+            "risk_preference": [RISK_LABELS[c] for c in self.choices],
+            "pace_preference": [PACE_LABELS[c] for c in self.choices],
+            "decision_consistency": [CONSISTENCY_LABELS[c] for c in self.consistency],
+        }
+
+    def track_decision(self, scenario_id: str, decision: Dict, context: Dict):
+        """记录单次决策并更新模式"""
+        option = decision.get("option", "")
+
+        # game-001, game-002等: 1=激进/立即, 2=稳健/完善, 3=中等/收购, 4=保守/合作
+        if option in ("1", "2", "3", "4"):
+            self.choices.append(int(option) - 1)
+
+        # 追踪决策一致性：连续3次相同 / 两种 / 各不相同
+        if len(self.choices) >= 3:
+            self.consistency.append(len(set(self.choices[-3:])) - 1)
+
+    def generate_personalized_insight(self) -> str:
+        """生成个性化洞察反馈"""
+        if not self.choices:
+            return ""
+
+        insights = []
+
+        # 分析风险偏好
+        if len(self.choices) >= 3:
+            recent = self.choices[-3:]
+            if recent.count(AGGRESSIVE) >= 2:
+                insights.append("📊 你的决策模式分析：\n你最近倾向于选择高风险选项。这显示了你的风险偏好。")
+            elif recent.count(CONSERVATIVE) >= 2:
+                insights.append("📊 你的决策模式分析：\n你最近倾向于选择保守选项。这显示了你的风险偏好。")
+
+        # 分析决策一致性
+        if len(self.consistency) >= 2 and self.consistency[-1] == HIGHLY_CONSISTENT:
+            insights.append("⚠️ 你连续多次选择了相似的策略，可能陷入了思维定势。")
+
+        return "\n\n".join(insights) if insights else ""
+
+
+def select_scenario_variant(scenario: Dict[str, Any], difficulty: str) -> Tuple[Dict[str, Any], str, str]:
+    """
+    按请求难度选择场景变体，返回 (场景, 实际难度, 挑战类型)
+    难度为 auto 或与场景默认难度相同时使用基础场景，否则套用匹配的高级挑战
+    """
+    if difficulty == "auto" or difficulty == scenario["difficulty"]:
+        return scenario, scenario["difficulty"], "base"
+
+    challenge = next((c for c in scenario.get("advancedChallenges", []) if c["difficulty"] == difficulty), None)
+    if challenge is None:
+        return scenario, difficulty, "advanced"
+
+    selected = dict(scenario)
+    selected["name"] = f"{scenario['name']} - {challenge['title']}"
+    selected["description"] = challenge["description"]
+    selected["targetPatterns"] = challenge["decisionPatterns"]
+    selected["decisionPattern"] = ", ".join(challenge["decisionPatterns"])
+    return selected, difficulty, "advanced"
+
+
+class GameSessionService:
+    """进程内游戏会话存储与回合流水线"""
+
+    def __init__(self, idle_ttl: float = SESSION_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self.sessions: Dict[str, GameSessionRecord] = {}
+        # (场景ID, 请求难度) -> 场景变体，所有会话共享
+        self._variants: Dict[Tuple[str, str], Tuple[Dict[str, Any], str, str]] = {}
+        # 排序后的决策项 -> 共享的决策字典；决策取值种类很少，绝大多数回合可复用已有字典
+        self._shared_decisions: Dict[Tuple, Dict[str, Any]] = {}
+        # 上次检查点之后有变更的会话ID
+        self.dirty: Set[str] = set()
+        # 上次检查点之后过期移除的会话ID（检查点中写入删除标记）
+        self.expired: Set[str] = set()
+
+    @staticmethod
+    def _new_session_id() -> str:
+        # 无状态会话不在服务端保存，无法查重，随机部分需足够长以避免同一秒内碰撞
+        return f"session_{int(datetime.now().timestamp())}_{secrets.token_hex(6)}"
+
+    def _variant(self, scenario: Dict[str, Any], difficulty: str) -> Tuple[Dict[str, Any], str, str]:
+        key = (scenario["id"], difficulty)
+        variant = self._variants.get(key)
+        if variant is None:
+            selected, resolved, challenge_type = select_scenario_variant(scenario, difficulty)
+            variant = (selected, sys.intern(resolved), sys.intern(challenge_type))
+            self._variants[key] = variant
+        return variant
+
+    def scenario_variant(self, scenario: Dict[str, Any], difficulty: str) -> Dict[str, Any]:
+        """按难度取共享的场景变体（恢复会话时使用）"""
+        return self._variant(scenario, difficulty)[0]
+
+    def _share_decisions(self, decisions: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            key = tuple(sorted(decisions.items()))
+            shared = self._shared_decisions.get(key)
+        except TypeError:
+            # 含列表等不可哈希取值时原样保存
+            return decisions
+        if shared is None:
+            if len(self._shared_decisions) >= MAX_SHARED_DECISIONS:
+                return decisions
+            self._shared_decisions[key] = shared = decisions
+        return shared
+
+    def build(self, scenario: Dict[str, Any], difficulty: str = "auto",
+              pattern_tracker: Optional[Any] = None) -> GameSessionRecord:
+        """构建会话但不保存（无状态令牌模式）；请求的难度无效时抛出 ValueError（auto 沿用场景自身的难度）"""
+        if difficulty != "auto" and difficulty != scenario["difficulty"] and difficulty not in VALID_DIFFICULTIES:
+            raise ValueError(f"无效的难度级别: {difficulty}")
+        selected, resolved, challenge_type = self._variant(scenario, difficulty)
+
+        session = GameSessionRecord(
+            game_id=self._new_session_id(),
+            scenario_id=sys.intern(scenario["id"]),
+            difficulty=resolved,
+            challenge_type=challenge_type,
+            scenario=selected,
+            pattern_tracker=pattern_tracker,
+            trap_counters=TrapCounters(),
+        )
+        return session
+
+    def create(self, scenario: Dict[str, Any], difficulty: str = "auto",
+               pattern_tracker: Optional[Any] = None) -> GameSessionRecord:
+        """创建并保存会话"""
+        session = self.build(scenario, difficulty, pattern_tracker)
+        self.adopt(session)
+        return session
+
+    def adopt(self, session: GameSessionRecord) -> None:
+        """保存会话（包括从无状态令牌转为服务端存储的会话）"""
+        self.sessions[session.game_id] = session
+        self.dirty.add(session.game_id)
+
+    def restore(self, session: GameSessionRecord) -> None:
+        """放入从检查点恢复的会话（不标记为脏）"""
+        for record in session.history:
+            record.decisions = self._share_decisions(record.decisions)
+        self.sessions[session.game_id] = session
+
+    def get(self, game_id: str) -> Optional[GameSessionRecord]:
+        session = self.sessions.get(game_id)
+        if session is not None and session.last_active < time.time() - self.idle_ttl:
+            self._drop(game_id)
+            return None
+        return session
+
+    def _drop(self, game_id: str) -> None:
+        self.sessions.pop(game_id, None)
+        self.dirty.discard(game_id)
+        self.expired.add(game_id)
+
+    def expire_idle(self, now: Optional[float] = None) -> int:
+        """移除超过空闲时间的会话，返回移除数量"""
+        cutoff = (time.time() if now is None else now) - self.idle_ttl
+        idle = [game_id for game_id, session in self.sessions.items() if session.last_active < cutoff]
+        for game_id in idle:
+            self._drop(game_id)
+        return len(idle)
+
+    @staticmethod
+    def effects_for(session: GameSessionRecord) -> DelayedEffectQueue:
+        """会话的延迟效果队列（按需创建），交给 transition 登记延迟效果"""
+        if session.effects is None:
+            session.effects = DelayedEffectQueue()
+        return session.effects
+
+    def advance(self, session: GameSessionRecord, decisions: Dict[str, Any],
+                transition: TurnTransition, **logic_kwargs) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        执行一个回合：以当前状态调用 transition，回合数加一，应用到期的延迟效果并追加决策记录
+        返回 (回合前状态, 回合后状态)，两者都是普通字典，可直接交给反馈生成函数
+        """
+        current_state = self.state_dict(session, session.state)
+        new_state = transition(session.scenario_id, current_state, decisions,
+                               difficulty=session.difficulty, **logic_kwargs)
+        new_state["turn_number"] = current_state["turn_number"] + 1
+        if session.effects is not None:
+            session.effects.apply_due(new_state, new_state["turn_number"])
+
+        record = DecisionRecord.from_dict(new_state, decisions=self._share_decisions(decisions),
+                                          elapsed=int(time.time()) - session.created_at)
+        if session.effects:
+            record.effects = session.effects.snapshot()
+        session.state = record
+        session.history.append(record)
+        if session.trap_counters is not None:
+            session.trap_counters.record(decisions)
+        if session.game_id in self.sessions:
+            self.dirty.add(session.game_id)
+        return current_state, new_state
+
+    @staticmethod
+    def trap_counters_for(session: GameSessionRecord) -> TrapCounters:
+        """会话的决策计数；尚未建立时由决策历史重建一次"""
+        if session.trap_counters is None:
+            session.trap_counters = TrapCounters.from_decisions(record.decisions for record in session.history)
+        return session.trap_counters
+
+    def record_pattern(self, session: GameSessionRecord, pattern: Dict[str, Any]) -> None:
+        session.add_pattern(pattern)
+        if session.game_id in self.sessions:
+            self.dirty.add(session.game_id)
+
+    # ----- 字典视图（仅在响应序列化时生成） -----
+
+    @staticmethod
+    def state_dict(session: GameSessionRecord, state: SessionState) -> Dict[str, Any]:
+        values = state.as_dict()
+        values.update({
+            "difficulty": session.difficulty,
+            "challenge_type": session.challenge_type,
+            "detected_biases": [],
+            "user_patterns": {"risk_preference": None, "pace_preference": None, "decision_style": None},
+        })
+        if session.detected_patterns:
+            values["detected_patterns"] = list(session.detected_patterns)
+        return values
+
+    def history_view(self, session: GameSessionRecord) -> List[Dict[str, Any]]:
+        # 从无状态令牌还原的早期记录没有结果状态（satisfaction 为 None），视图中省略 result_state
+        return [{
+            "turn": record.turn,
+            "decisions": record.decisions,
+            **({"result_state": record.as_dict()} if record.satisfaction is not None else {}),
+            "difficulty": session.difficulty,
+            "timestamp": datetime.fromtimestamp(session.created_at + record.elapsed).isoformat(),
+        } for record in session.history]
+
+    def state_view(self, session: GameSessionRecord) -> Dict[str, Any]:
+        """响应中的 game_state：当前状态加上决策历史"""
+        values = self.state_dict(session, session.state)
+        values["decision_history"] = self.history_view(session)
+        if session.effects:
+            values["pending_effects"] = session.effects.pending()
+        return values
+
+
+# 全局实例
+game_session_service = GameSessionService()
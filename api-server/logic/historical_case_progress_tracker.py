@@ -0,0 +1,464 @@
+"""
+历史案例进度追踪
+用户进度、案例交互和每一次选项选择分别存入 SQLite 表；读取先查内存缓存，未命中再读库，
+修改只更新缓存并标记脏数据，由 flush 以批量 upsert 一次写入，单次点击不再触发文件读写。
+读穿缓存按条目数和 TTL 限制（LRUCache），未刷新的修改单独保存到 flush 为止，不会被淘汰
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from models.historical_case_models import (
+    HistoricalCaseInteraction,
+    HistoricalCaseProgress,
+    HistoricalCaseAnalytics,
+    UserHistoricalCaseSummary
+)
+
+from utils.lru_cache import LRUCache
+
+try:
+    from .results_store import DEFAULT_DB_PATH
+except ImportError:
+    from results_store import DEFAULT_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+# 读穿缓存容量与过期时间（秒）
+PROGRESS_CACHE_ENTRIES = int(os.getenv("PROGRESS_CACHE_ENTRIES", "10000"))
+INTERACTION_CACHE_ENTRIES = int(os.getenv("INTERACTION_CACHE_ENTRIES", "20000"))
+PROGRESS_CACHE_TTL = float(os.getenv("PROGRESS_CACHE_TTL", "1800"))
+
+_MISSING = object()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS historical_progress (
+    user_id TEXT PRIMARY KEY,
+    completed_cases TEXT NOT NULL,
+    in_progress_cases TEXT NOT NULL,
+    total_time_spent INTEGER NOT NULL DEFAULT 0,
+    last_accessed TEXT,
+    overall_rating REAL,
+    lessons_learned TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS historical_interactions (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    case_id TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    completed_at TEXT,
+    current_step INTEGER NOT NULL DEFAULT 0,
+    time_spent_seconds INTEGER NOT NULL DEFAULT 0,
+    reflection_notes TEXT,
+    rating INTEGER,
+    completed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_hist_interactions_user_case ON historical_interactions(user_id, case_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_hist_interactions_case ON historical_interactions(case_id);
+CREATE TABLE IF NOT EXISTS historical_selections (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    interaction_id TEXT NOT NULL,
+    case_id TEXT NOT NULL,
+    step INTEGER NOT NULL,
+    option_index INTEGER NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_hist_selections_case ON historical_selections(case_id, step, option_index);
+CREATE INDEX IF NOT EXISTS idx_hist_selections_interaction ON historical_selections(interaction_id);
+"""
+
+_PROGRESS_UPSERT = """
+INSERT INTO historical_progress (user_id, completed_cases, in_progress_cases, total_time_spent,
+                                 last_accessed, overall_rating, lessons_learned)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(user_id) DO UPDATE SET
+    completed_cases = excluded.completed_cases,
+    in_progress_cases = excluded.in_progress_cases,
+    total_time_spent = excluded.total_time_spent,
+    last_accessed = excluded.last_accessed,
+    overall_rating = excluded.overall_rating,
+    lessons_learned = excluded.lessons_learned
+"""
+
+_INTERACTION_UPSERT = """
+INSERT INTO historical_interactions (id, user_id, case_id, started_at, completed_at, current_step,
+                                     time_spent_seconds, reflection_notes, rating, completed)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    completed_at = excluded.completed_at,
+    current_step = excluded.current_step,
+    time_spent_seconds = excluded.time_spent_seconds,
+    reflection_notes = excluded.reflection_notes,
+    rating = excluded.rating,
+    completed = excluded.completed
+"""
+
+# 案例分析中返回的最常见选择条数
+TOP_SELECTIONS = 10
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _progress_params(progress: HistoricalCaseProgress) -> tuple:
+    return (
+        progress.user_id,
+        json.dumps(progress.completed_cases, ensure_ascii=False),
+        json.dumps(progress.in_progress_cases, ensure_ascii=False, default=str),
+        progress.total_time_spent,
+        _iso(progress.last_accessed),
+        progress.overall_rating,
+        json.dumps(progress.lessons_learned, ensure_ascii=False),
+    )
+
+
+def _interaction_params(interaction: HistoricalCaseInteraction) -> tuple:
+    return (
+        interaction.id, interaction.user_id, interaction.case_id,
+        _iso(interaction.started_at), _iso(interaction.completed_at),
+        interaction.current_step, interaction.time_spent_seconds,
+        interaction.reflection_notes, interaction.rating, int(interaction.completed),
+    )
+
+
+class HistoricalCaseProgressTracker:
+    """历史案例进度追踪（内存读穿缓存 + SQLite 批量 upsert）"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, max_progress: int = PROGRESS_CACHE_ENTRIES,
+                 max_interactions: int = INTERACTION_CACHE_ENTRIES, ttl: float = PROGRESS_CACHE_TTL):
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        # _lock 保护缓存与脏标记，_db_lock 保护连接；需要同时持有时先取 _lock
+        self._lock = threading.RLock()
+        self._db_lock = threading.Lock()
+        with self._db_lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+        # 只按条目数淘汰，不估算大小
+        self.progress_cache = LRUCache(max_entries=max_progress, ttl=ttl, sizer=lambda value: 0)
+        # user_id:case_id -> 最近一次交互（None 表示库中没有）
+        self.interaction_cache = LRUCache(max_entries=max_interactions, ttl=ttl, sizer=lambda value: 0)
+        # 未刷新的修改，flush 成功后清空
+        self._dirty_progress: Dict[str, HistoricalCaseProgress] = {}
+        self._dirty_interactions: Dict[str, HistoricalCaseInteraction] = {}
+        self._pending_selections: List[tuple] = []
+
+    # ----- 读穿缓存 -----
+
+    def _fetch(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._db_lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def get_user_progress(self, user_id: str) -> HistoricalCaseProgress:
+        with self._lock:
+            progress = self._dirty_progress.get(user_id) or self.progress_cache.get(user_id)
+            if progress is not None:
+                return progress
+            rows = self._fetch("SELECT * FROM historical_progress WHERE user_id = ?", (user_id,))
+            if rows:
+                row = rows[0]
+                progress = HistoricalCaseProgress(
+                    user_id=user_id,
+                    completed_cases=json.loads(row["completed_cases"]),
+                    in_progress_cases=json.loads(row["in_progress_cases"]),
+                    total_time_spent=row["total_time_spent"],
+                    last_accessed=row["last_accessed"],
+                    overall_rating=row["overall_rating"],
+                    lessons_learned=json.loads(row["lessons_learned"]),
+                )
+                self.progress_cache.set(user_id, progress)
+                return progress
+            progress = HistoricalCaseProgress(user_id=user_id)
+            self.save_user_progress(progress)
+            return progress
+
+    def save_user_progress(self, progress: HistoricalCaseProgress) -> bool:
+        with self._lock:
+            self.progress_cache.set(progress.user_id, progress)
+            self._dirty_progress[progress.user_id] = progress
+        return True
+
+    def get_case_interaction(self, user_id: str, case_id: str) -> Optional[HistoricalCaseInteraction]:
+        """用户在某案例上最近一次交互"""
+        key = f"{user_id}:{case_id}"
+        with self._lock:
+            if key in self._dirty_interactions:
+                return self._dirty_interactions[key]
+            cached = self.interaction_cache.get(key, _MISSING)
+            if cached is not _MISSING:
+                return cached
+            rows = self._fetch(
+                "SELECT * FROM historical_interactions WHERE user_id = ? AND case_id = ? "
+                "ORDER BY started_at DESC LIMIT 1", (user_id, case_id))
+            interaction = None
+            if rows:
+                row = rows[0]
+                selections = self._fetch(
+                    "SELECT step, option_index, timestamp FROM historical_selections "
+                    "WHERE interaction_id = ? ORDER BY id", (row["id"],))
+                interaction = HistoricalCaseInteraction(
+                    id=row["id"], user_id=user_id, case_id=case_id,
+                    started_at=row["started_at"], completed_at=row["completed_at"],
+                    current_step=row["current_step"],
+                    selected_options=[dict(s) for s in selections],
+                    time_spent_seconds=row["time_spent_seconds"],
+                    reflection_notes=row["reflection_notes"], rating=row["rating"],
+                    completed=bool(row["completed"]),
+                )
+            self.interaction_cache.set(key, interaction)
+            return interaction
+
+    def save_case_interaction(self, interaction: HistoricalCaseInteraction) -> bool:
+        with self._lock:
+            if not interaction.id:
+                interaction.id = f"{interaction.case_id}_{uuid.uuid4().hex[:12]}"
+            key = f"{interaction.user_id}:{interaction.case_id}"
+            self.interaction_cache.set(key, interaction)
+            self._dirty_interactions[key] = interaction
+            self._update_user_progress_for_interaction(interaction)
+        return True
+
+    # ----- 进度更新 -----
+
+    def _update_user_progress_for_interaction(self, interaction: HistoricalCaseInteraction):
+        progress = self.get_user_progress(interaction.user_id)
+
+        if interaction.completed and interaction.case_id not in progress.completed_cases:
+            progress.completed_cases.append(interaction.case_id)
+
+        existing_in_progress = None
+        for i, in_progress in enumerate(progress.in_progress_cases):
+            if in_progress.get('case_id') == interaction.case_id:
+                existing_in_progress = i
+                break
+
+        if interaction.completed:
+            if existing_in_progress is not None:
+                progress.in_progress_cases.pop(existing_in_progress)
+        else:
+            in_progress_entry = {
+                'case_id': interaction.case_id,
+                'current_step': interaction.current_step,
+                'interaction_id': interaction.id or interaction.case_id
+            }
+            if existing_in_progress is not None:
+                progress.in_progress_cases[existing_in_progress] = in_progress_entry
+            else:
+                progress.in_progress_cases.append(in_progress_entry)
+
+        progress.total_time_spent += interaction.time_spent_seconds
+        progress.last_accessed = datetime.now()
+
+        if interaction.rating:
+            if progress.overall_rating is None:
+                progress.overall_rating = float(interaction.rating)
+            else:
+                total_cases = len(progress.completed_cases)
+                if total_cases > 0:
+                    progress.overall_rating = (
+                        (progress.overall_rating * (total_cases - 1) + interaction.rating) / total_cases
+                    )
+
+        if interaction.reflection_notes:
+            for keyword in self._extract_keywords(interaction.reflection_notes):
+                if keyword not in progress.lessons_learned:
+                    progress.lessons_learned.append(keyword)
+
+        self.save_user_progress(progress)
+
+    def _extract_keywords(self, text: str) -> List[str]:
+        """从反思笔记中提取认知偏差关键词"""
+        text_lower = text.lower()
+        bias_terms = [
+            'confirmation bias', 'groupthink', 'overconfidence', 'availability heuristic',
+            'anchoring', 'framing', 'hindsight', 'sunk cost', 'loss aversion'
+        ]
+        return [term for term in bias_terms if term in text_lower]
+
+    def record_user_decision(self, user_id: str, case_id: str, step: int, option_index: int):
+        """记录一次选择；上一次交互已完成时开始新的交互"""
+        with self._lock:
+            interaction = self.get_case_interaction(user_id, case_id)
+            if interaction is None or interaction.completed:
+                interaction = HistoricalCaseInteraction(
+                    user_id=user_id,
+                    case_id=case_id,
+                    started_at=datetime.now(),
+                    current_step=step
+                )
+                # 先分配 id，选择记录需要引用
+                self.save_case_interaction(interaction)
+
+            decision_record = {
+                "step": step,
+                "option_index": option_index,
+                "timestamp": datetime.now().isoformat()
+            }
+            interaction.selected_options.append(decision_record)
+            interaction.current_step = step + 1
+            self._pending_selections.append(
+                (interaction.id, case_id, step, option_index, decision_record["timestamp"]))
+            self.save_case_interaction(interaction)
+
+    def complete_case_interaction(self, user_id: str, case_id: str, rating: Optional[int] = None,
+                                  reflection_notes: Optional[str] = None):
+        with self._lock:
+            interaction = self.get_case_interaction(user_id, case_id)
+            if interaction is None:
+                interaction = HistoricalCaseInteraction(
+                    user_id=user_id,
+                    case_id=case_id,
+                    started_at=datetime.now()
+                )
+            interaction.completed_at = datetime.now()
+            interaction.completed = True
+            if rating is not None:
+                interaction.rating = rating
+            if reflection_notes is not None:
+                interaction.reflection_notes = reflection_notes
+            self.save_case_interaction(interaction)
+
+    # ----- 批量写入 -----
+
+    def flush(self) -> int:
+        """把脏进度、脏交互和新增选择批量写入，返回写入行数"""
+        with self._lock:
+            progress_params = [_progress_params(p) for p in self._dirty_progress.values()]
+            interaction_params = [_interaction_params(i) for i in self._dirty_interactions.values()]
+            selections = self._pending_selections
+            dirty_progress, dirty_interactions = self._dirty_progress, self._dirty_interactions
+            self._dirty_progress, self._dirty_interactions, self._pending_selections = {}, {}, []
+
+        if not (progress_params or interaction_params or selections):
+            return 0
+        try:
+            with self._db_lock:
+                with self._conn:
+                    self._conn.executemany(_PROGRESS_UPSERT, progress_params)
+                    self._conn.executemany(_INTERACTION_UPSERT, interaction_params)
+                    self._conn.executemany(
+                        "INSERT INTO historical_selections (interaction_id, case_id, step, option_index, timestamp) "
+                        "VALUES (?, ?, ?, ?, ?)", selections)
+        except sqlite3.Error:
+            # 写入失败时恢复脏数据（期间的新修改优先），下次重试
+            with self._lock:
+                self._dirty_progress = {**dirty_progress, **self._dirty_progress}
+                self._dirty_interactions = {**dirty_interactions, **self._dirty_interactions}
+                self._pending_selections[:0] = selections
+            raise
+        return len(progress_params) + len(interaction_params) + len(selections)
+
+    # ----- 汇总与分析 -----
+
+    def get_user_summary(self, user_id: str) -> UserHistoricalCaseSummary:
+        progress = self.get_user_progress(user_id)
+        total_attempts = len(progress.completed_cases) + len(progress.in_progress_cases)
+        completion_percentage = (
+            len(progress.completed_cases) / total_attempts * 100 if total_attempts > 0 else 0
+        )
+        return UserHistoricalCaseSummary(
+            user_id=user_id,
+            total_cases_attempted=total_attempts,
+            total_cases_completed=len(progress.completed_cases),
+            completion_percentage=completion_percentage,
+            total_time_spent=progress.total_time_spent,
+            favorite_cases=progress.completed_cases[:3],
+            areas_of_improvement=["confirmation bias", "system thinking", "risk assessment"],
+            achievement_badges=self._calculate_achievements(progress),
+            last_active_date=progress.last_accessed,
+            streak_days=0
+        )
+
+    def _calculate_achievements(self, progress: HistoricalCaseProgress) -> List[str]:
+        achievements = []
+        if len(progress.completed_cases) >= 5:
+            achievements.append("Historical Detective (5+ cases completed)")
+        if len(progress.completed_cases) >= 10:
+            achievements.append("History Scholar (10+ cases completed)")
+        if progress.total_time_spent >= 3600:
+            achievements.append("Deep Thinker (1+ hours spent)")
+        if progress.overall_rating and progress.overall_rating >= 4.0:
+            achievements.append("Critical Analyst (4+ average rating)")
+        return achievements
+
+    def get_case_analytics(self, case_id: str, top_n: int = TOP_SELECTIONS) -> HistoricalCaseAnalytics:
+        """按已存储的交互与选择实时聚合案例分析（先写入待刷新的数据）"""
+        self.flush()
+        totals = self._fetch(
+            "SELECT COUNT(*) AS attempts, SUM(completed) AS completed, "
+            "AVG(CASE WHEN completed = 1 THEN time_spent_seconds END) AS avg_time, "
+            "AVG(rating) AS avg_rating, "
+            "SUM(CASE WHEN rating IS NOT NULL OR reflection_notes IS NOT NULL THEN 1 ELSE 0 END) AS feedback "
+            "FROM historical_interactions WHERE case_id = ?", (case_id,))[0]
+        selections = self._fetch(
+            "SELECT s.step, s.option_index, s.n, s.n * 1.0 / t.total AS share FROM ("
+            "  SELECT step, option_index, COUNT(*) AS n FROM historical_selections "
+            "  WHERE case_id = ? GROUP BY step, option_index) s "
+            "JOIN (SELECT step, COUNT(*) AS total FROM historical_selections WHERE case_id = ? GROUP BY step) t "
+            "ON s.step = t.step ORDER BY s.n DESC, s.step, s.option_index LIMIT ?",
+            (case_id, case_id, top_n))
+        attempts = totals["attempts"] or 0
+        return HistoricalCaseAnalytics(
+            case_id=case_id,
+            total_attempts=attempts,
+            completion_rate=round((totals["completed"] or 0) / attempts, 4) if attempts else 0.0,
+            average_time_spent=int(totals["avg_time"] or 0),
+            most_common_selections=[
+                {"step": r["step"], "option_index": r["option_index"], "count": r["n"],
+                 "percentage": round(r["share"] * 100, 2)}
+                for r in selections
+            ],
+            average_rating=round(totals["avg_rating"], 2) if totals["avg_rating"] is not None else None,
+            feedback_count=totals["feedback"] or 0,
+            last_updated=datetime.now(),
+        )
+
+    def close(self):
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+
+_tracker: Optional[HistoricalCaseProgressTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_progress_tracker() -> HistoricalCaseProgressTracker:
+    """全局进度追踪器（首次使用时创建）"""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = HistoricalCaseProgressTracker()
+        return _tracker
+
+
+def close_progress_tracker():
+    global _tracker
+    with _tracker_lock:
+        if _tracker is not None:
+            _tracker.close()
+            _tracker = None
+
+
+PROGRESS_FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "1"))
+
+
+async def run_progress_flush(interval: float = PROGRESS_FLUSH_INTERVAL):
+    """后台任务：定期批量写入进度变更"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(get_progress_tracker().flush)
+        except Exception as e:
+            logger.error(f"写入历史案例进度失败: {e}")
@@ -0,0 +1,331 @@
+"""
+历史案例决策引擎
+加载时把每个历史案例编译为紧凑的 步骤/选项 表：每个 (步骤, 选项) 的教育反馈、偏差标签、
+建议和总结片段都预先生成，处理一次决策只是一次下标查找加一次追加
+"""
+import logging
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from utils.lru_cache import LRUCache
+
+try:
+    from .historical_case_validator import validate_historical_case
+except ImportError:
+    from historical_case_validator import validate_historical_case
+
+logger = logging.getLogger(__name__)
+
+# 内存中的决策会话：条目上限与闲置过期时间（秒，从开始或最近一次决策起算）
+HISTORICAL_SESSION_ENTRIES = int(os.getenv("HISTORICAL_SESSION_ENTRIES", "10000"))
+HISTORICAL_SESSION_TTL = float(os.getenv("HISTORICAL_SESSION_TTL", "3600"))
+
+# 教训中出现关键词即标注对应偏差
+BIAS_KEYWORDS = (
+    ("确认偏误", "confirmation_bias"),
+    ("群体思维", "groupthink"),
+    ("过度自信", "overconfidence_bias"),
+    ("时间压力", "time_pressure_bias"),
+    ("商业压力", "business_pressure_bias"),
+)
+DEFAULT_BIASES = ("confirmation_bias", "availability_heuristic", "anchoring_bias")
+
+BASE_RECOMMENDATIONS = (
+    "在类似情况下，考虑多方意见和数据",
+    "建立制衡机制以减少单一决策者的偏见",
+    "预留充足时间进行风险评估",
+    "建立独立的审查和验证机制",
+)
+# 标题中出现关键词时追加的建议
+TITLE_RECOMMENDATIONS = (
+    ("安全", "将安全考虑置于商业利益之上"),
+    ("技术", "充分测试复杂技术系统的所有方面"),
+    ("金融", "建立更严格的风险管理和监管机制"),
+)
+
+FOLLOW_UP_RECOMMENDATIONS = [
+    "Study additional historical cases to recognize patterns",
+    "Practice decision-making frameworks that counter cognitive biases",
+    "Seek diverse perspectives before making critical decisions",
+]
+
+
+@dataclass(frozen=True)
+class CompiledStep:
+    situation: str
+    options: Tuple[str, ...]
+    actual_outcome: str
+    # 每个选项预先生成的教育反馈
+    feedback: Tuple[Dict[str, Any], ...]
+
+
+@dataclass(frozen=True)
+class CompiledCase:
+    scenario_id: str
+    title: str
+    description: str
+    steps: Tuple[CompiledStep, ...]
+    alternative_options: Tuple[str, ...]
+    lessons: Tuple[str, ...]
+    summary: Dict[str, Any]
+    listing: Dict[str, Any]
+
+
+@dataclass
+class HistoricalSession:
+    session_id: str
+    user_id: str
+    case: CompiledCase
+    started_at: str
+    current_step: int = 0
+    decisions: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def completed(self) -> bool:
+        return self.current_step >= len(self.case.steps)
+
+
+def _error(message: str, error_code: str) -> Dict[str, Any]:
+    return {"error": message, "error_code": error_code, "success": False}
+
+
+def _bias_tags(lessons: Iterable[str]) -> List[str]:
+    text = "\n".join(lessons)
+    tags = [tag for keyword, tag in BIAS_KEYWORDS if keyword in text]
+    return tags or list(DEFAULT_BIASES)
+
+
+def _recommendations(title: str) -> List[str]:
+    return list(BASE_RECOMMENDATIONS) + [rec for keyword, rec in TITLE_RECOMMENDATIONS if keyword in title]
+
+
+def _estimate_difficulty(step_count: int) -> str:
+    if step_count <= 2:
+        return "beginner"
+    if step_count <= 4:
+        return "intermediate"
+    return "advanced"
+
+
+def compile_case(case: Dict[str, Any]) -> CompiledCase:
+    """把原始案例字典编译为 CompiledCase（调用方负责先校验）"""
+    title = case.get("title", "Historical Scenario")
+    outcomes = case.get("actualOutcomes", [])
+    alternatives = list(case.get("alternativeOptions", []))
+    lessons = list(case.get("lessons", []))
+    pyramid = case.get("pyramidAnalysis", {})
+    biases = _bias_tags(lessons)
+    recommendations = _recommendations(title)
+
+    steps = []
+    points = case.get("decisionPoints", [])
+    for index, point in enumerate(points):
+        options = tuple(point.get("options", []))
+        outcome = outcomes[index] if index < len(outcomes) else "No specific outcome recorded"
+        feedback = tuple({
+            "title": f"关于 {title} 的反思",
+            "scenarioStep": index + 1,
+            "selectedOption": option,
+            "historicalOutcome": outcome,
+            "alternativeOptions": alternatives,
+            "keyLessons": lessons,
+            "pyramidAnalysis": pyramid,
+            "cognitiveBiasesIdentified": biases,
+            "recommendations": recommendations,
+        } for option in options)
+        steps.append(CompiledStep(
+            situation=point.get("situation", ""),
+            options=options,
+            actual_outcome=outcomes[index] if index < len(outcomes) else "Outcome not specified",
+            feedback=feedback,
+        ))
+
+    return CompiledCase(
+        scenario_id=case["scenarioId"],
+        title=title,
+        description=case.get("description", ""),
+        steps=tuple(steps),
+        alternative_options=tuple(alternatives),
+        lessons=tuple(lessons),
+        summary={
+            "scenarioTitle": title,
+            "scenarioDescription": case.get("description", "Scenario description not available"),
+            "keyLessons": lessons,
+            "pyramidAnalysis": pyramid,
+            "personalReflection": "Consider how these historical lessons apply to modern decision-making contexts.",
+            "followUpRecommendations": FOLLOW_UP_RECOMMENDATIONS,
+        },
+        listing={
+            "id": case["scenarioId"],
+            "title": title,
+            "description": case.get("description", ""),
+            "decisionPointsCount": len(points),
+            "estimatedTimeMinutes": len(points) * 3,
+            "difficulty": _estimate_difficulty(len(points)),
+        },
+    )
+
+
+class HistoricalCaseDecisionEngine:
+    """历史案例会话与决策处理"""
+
+    def __init__(self, max_sessions: int = HISTORICAL_SESSION_ENTRIES, ttl: float = HISTORICAL_SESSION_TTL):
+        self.cases: Dict[str, CompiledCase] = {}
+        # 会话有上限并在闲置 ttl 秒后过期（已完成的会话同样保留到过期，供查询状态）
+        self.sessions = LRUCache(max_entries=max_sessions, ttl=ttl, sizer=lambda value: 0)
+        # user_id:scenario_id -> 最近一次会话
+        self.user_sessions = LRUCache(max_entries=max_sessions, ttl=ttl, sizer=lambda value: 0)
+
+    # ----- 加载 -----
+
+    def load_case(self, case: Dict[str, Any]) -> bool:
+        errors = validate_historical_case(case)
+        if errors:
+            logger.warning("历史案例校验失败", extra={"scenario_id": case.get("scenarioId"), "errors": errors})
+            return False
+        compiled = compile_case(case)
+        self.cases[compiled.scenario_id] = compiled
+        return True
+
+    def load_cases(self, cases: Iterable[Dict[str, Any]]) -> int:
+        return sum(1 for case in cases if self.load_case(case))
+
+    def list_cases(self, difficulty: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [case.listing for case in self.cases.values()
+                if difficulty is None or case.listing["difficulty"] == difficulty]
+
+    # ----- 会话 -----
+
+    @staticmethod
+    def _step_view(case: CompiledCase, step: int) -> Dict[str, Any]:
+        compiled = case.steps[step]
+        return {"step": step, "situation": compiled.situation, "options": list(compiled.options)}
+
+    def start_session(self, user_id: str, scenario_id: str) -> Dict[str, Any]:
+        case = self.cases.get(scenario_id)
+        if case is None:
+            return _error(f"Scenario {scenario_id} not available", "HISTORICAL_CASE_NOT_FOUND")
+        if not case.steps:
+            return _error(f"No decision points found in scenario {scenario_id}", "HISTORICAL_CASE_EMPTY")
+
+        session = HistoricalSession(
+            session_id=str(uuid.uuid4()),
+            user_id=user_id,
+            case=case,
+            started_at=datetime.now().isoformat(),
+        )
+        previous = self.user_sessions.get(f"{user_id}:{scenario_id}")
+        if previous:
+            self.sessions.delete(previous)
+        self.sessions.set(session.session_id, session)
+        self.user_sessions.set(f"{user_id}:{scenario_id}", session.session_id)
+
+        return {
+            "sessionId": session.session_id,
+            "scenarioId": scenario_id,
+            **self._step_view(case, 0),
+            "scenarioTitle": case.title,
+            "scenarioDescription": case.description,
+            "totalSteps": len(case.steps),
+            "currentStep": 0,
+            "success": True,
+        }
+
+    def process_decision(self, session_id: str, option_index: int) -> Dict[str, Any]:
+        """处理当前步骤的选择：查表取反馈并追加决策记录"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            return _error(f"Session {session_id} not found", "HISTORICAL_SESSION_NOT_FOUND")
+        case, step = session.case, session.current_step
+        if session.completed:
+            return _error(f"Scenario {case.scenario_id} already completed", "HISTORICAL_SESSION_COMPLETED")
+        compiled = case.steps[step]
+        if not 0 <= option_index < len(compiled.options):
+            return _error(f"Option index {option_index} out of bounds for step {step}", "INVALID_HISTORICAL_OPTION")
+
+        session.decisions.append({
+            "step": step,
+            "optionIndex": option_index,
+            "optionText": compiled.options[option_index],
+            "timestamp": datetime.now().isoformat(),
+        })
+        session.current_step = step + 1
+        # 重新写入以从本次决策起重新计算闲置时间
+        self.sessions.set(session_id, session)
+        self.user_sessions.set(f"{session.user_id}:{case.scenario_id}", session_id)
+
+        response = {
+            "sessionId": session_id,
+            "userId": session.user_id,
+            "scenarioId": case.scenario_id,
+            "currentStep": step,
+            "selectedOption": option_index,
+            "historicalContext": {
+                "situation": compiled.situation,
+                "allOptions": list(compiled.options),
+                "actualOutcome": compiled.actual_outcome,
+                "alternativeOptions": list(case.alternative_options),
+                "lessons": list(case.lessons),
+            },
+            "feedback": compiled.feedback[option_index],
+            "completed": session.completed,
+            "totalSteps": len(case.steps),
+            "success": True,
+        }
+        if session.completed:
+            decisions_made = len(session.decisions)
+            response["comprehensiveSummary"] = {
+                **case.summary,
+                "decisionsMade": decisions_made,
+                "historicalAlignment": f"You made {decisions_made} decisions in this scenario.",
+            }
+        else:
+            next_view = self._step_view(case, step + 1)
+            response.update({
+                "nextStep": next_view["step"],
+                "nextSituation": next_view["situation"],
+                "nextOptions": next_view["options"],
+            })
+        return response
+
+    def get_session_state(self, session_id: str) -> Dict[str, Any]:
+        session = self.sessions.get(session_id)
+        if session is None:
+            return _error(f"Session {session_id} not found", "HISTORICAL_SESSION_NOT_FOUND")
+        return {
+            "sessionId": session_id,
+            "userId": session.user_id,
+            "scenarioId": session.case.scenario_id,
+            "currentStep": session.current_step,
+            "completed": session.completed,
+            "decisions": session.decisions,
+            "totalSteps": len(session.case.steps),
+            "scenarioTitle": session.case.title,
+            "success": True,
+        }
+
+    def get_user_progress(self, user_id: str, scenario_id: str) -> Dict[str, Any]:
+        session = self.sessions.get(self.user_sessions.get(f"{user_id}:{scenario_id}", ""))
+        if session is None:
+            return {"scenarioId": scenario_id, "currentStep": 0, "decisionsMade": 0,
+                    "completed": False, "decisions": []}
+        return {
+            "scenarioId": scenario_id,
+            "currentStep": session.current_step,
+            "decisionsMade": len(session.decisions),
+            "completed": session.completed,
+            "decisions": session.decisions,
+        }
+
+
+# 全局实例（案例在生命周期启动钩子中加载）
+historical_decision_engine = HistoricalCaseDecisionEngine()
+
+# (文件名, 列表键)
+HISTORICAL_CASE_SOURCES = [
+    ("historical_cases.json", "historical_cases"),
+    ("advanced_historical_cases.json", "historical_cases"),
+]
@@ -0,0 +1,463 @@
+"""
+后台任务
+群体分析、大批量导出、最优策略预计算和蒙特卡洛模拟等重量级任务不在请求处理函数中执行：
+提交后进入有界优先队列，由固定数量的协程工作者按优先级取出；纯计算部分交给进程池，
+依赖进程内数据（如常驻内存的决策表）的部分在线程中执行。任务状态与结果持久化在 SQLite 中，
+相同输入（种类 + 参数的哈希）在缓存有效期内直接复用已完成的结果，相同输入的排队或运行中任务只执行一次。
+取消在任务下一次等待时生效，已交给进程池的计算片段会执行完但结果被丢弃，因此任务应按小片段提交计算
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from utils.error_handlers import CustomException
+
+logger = logging.getLogger(__name__)
+
+_DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(_DATA_DIR, 'jobs.db'))
+JOBS_RESULT_DIR = os.getenv("JOBS_RESULT_DIR", os.path.join(_DATA_DIR, 'jobs'))
+# 排队任务数上限，超出时提交返回 503
+JOBS_QUEUE_SIZE = int(os.getenv("JOBS_QUEUE_SIZE", "100"))
+# 同时运行的任务数
+JOBS_CONCURRENCY = int(os.getenv("JOBS_CONCURRENCY", "2"))
+JOBS_PROCESS_WORKERS = int(os.getenv("JOBS_PROCESS_WORKERS", str(min(2, os.cpu_count() or 1))))
+JOBS_TIMEOUT = float(os.getenv("JOBS_TIMEOUT", "600"))
+# 默认结果缓存有效期（秒），各任务种类可单独指定
+JOBS_CACHE_TTL = float(os.getenv("JOBS_CACHE_TTL", "3600"))
+# 已结束任务及结果文件的保留时间
+JOBS_RETENTION = float(os.getenv("JOBS_RETENTION", str(7 * 24 * 3600)))
+JOBS_CLEANUP_INTERVAL = float(os.getenv("JOBS_CLEANUP_INTERVAL", "3600"))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+# 优先级 0-9，数值越小越先执行
+MIN_PRIORITY, MAX_PRIORITY, DEFAULT_PRIORITY = 0, 9, 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    result_file TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_hash ON jobs(input_hash, status, finished_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+"""
+
+_COLUMNS = ("id", "kind", "params", "input_hash", "priority", "status", "progress", "message",
+            "result", "result_file", "error", "created_at", "started_at", "finished_at")
+
+
+@dataclass(slots=True)
+class Job:
+    id: str
+    kind: str
+    params: Dict[str, Any]
+    input_hash: str
+    priority: int = DEFAULT_PRIORITY
+    status: str = QUEUED
+    # 0-1
+    progress: float = 0.0
+    message: Optional[str] = None
+    result: Any = None
+    # 结果为文件（如导出）时的路径
+    result_file: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # 本次提交是否直接复用了已完成的结果（不持久化）
+    cached: bool = False
+
+    def view(self) -> Dict[str, Any]:
+        """状态视图（不含结果本身）"""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "priority": self.priority,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "message": self.message,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "cached": self.cached,
+            "has_result": self.status == SUCCEEDED,
+        }
+
+
+def input_hash(kind: str, params: Dict[str, Any]) -> str:
+    """任务输入的哈希：参数按键排序后序列化"""
+    payload = json.dumps([kind, params], sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """SQLite 任务表（单连接 + 锁，调用方应通过 asyncio.to_thread 调用）"""
+
+    def __init__(self, db_path: str = JOBS_DB_PATH):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> Job:
+        values = dict(row)
+        values["params"] = json.loads(values["params"])
+        values["result"] = json.loads(values["result"]) if values["result"] is not None else None
+        return Job(**values)
+
+    def save(self, job: Job) -> None:
+        params = (
+            job.id, job.kind, json.dumps(job.params, ensure_ascii=False), job.input_hash, job.priority,
+            job.status, job.progress, job.message,
+            json.dumps(job.result, ensure_ascii=False) if job.result is not None else None,
+            job.result_file, job.error, job.created_at, job.started_at, job.finished_at,
+        )
+        sql = f"INSERT OR REPLACE INTO jobs ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+        with self._lock:
+            with self._conn:
+                self._conn.execute(sql, params)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def find_cached(self, digest: str, since: float) -> Optional[Job]:
+        """since 之后成功结束的同输入任务（取最新一个）"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE input_hash = ? AND status = ? AND finished_at >= ? "
+                "ORDER BY finished_at DESC LIMIT 1", (digest, SUCCEEDED, since)).fetchone()
+        return self._to_job(row) if row else None
+
+    def unfinished(self) -> List[Job]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY priority, created_at", (QUEUED, RUNNING)).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def purge(self, before: float) -> List[str]:
+        """删除 before 之前结束的任务，返回需要删除的结果文件"""
+        with self._lock:
+            with self._conn:
+                files = [row[0] for row in self._conn.execute(
+                    "SELECT result_file FROM jobs WHERE finished_at < ? AND result_file IS NOT NULL", (before,))]
+                self._conn.execute("DELETE FROM jobs WHERE finished_at < ?", (before,))
+        return files
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+JobHandler = Callable[["JobContext", Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass(frozen=True)
+class JobKind:
+    name: str
+    handler: JobHandler
+    # 校验并规范化参数（补全默认值，使相同含义的输入哈希相同）；参数无效时抛出 ValueError
+    validate: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+    cache_ttl: float = JOBS_CACHE_TTL
+    description: str = ""
+
+
+class JobContext:
+    """交给任务处理函数的上下文：报告进度、在进程池或线程中执行计算、分配结果文件"""
+
+    def __init__(self, manager: "JobManager", job: Job):
+        self._manager = manager
+        self.job = job
+
+    def progress(self, done: float, total: float = 1.0, message: Optional[str] = None) -> None:
+        """更新进度（可在线程中调用）"""
+        self.job.progress = min(1.0, max(0.0, done / total)) if total else 0.0
+        if message is not None:
+            self.job.message = message
+
+    async def run_in_process(self, func: Callable, *args) -> Any:
+        """在进程池中执行（func 及参数需可被 pickle）"""
+        return await asyncio.get_running_loop().run_in_executor(self._manager.get_pool(), func, *args)
+
+    async def run_in_thread(self, func: Callable, *args, **kwargs) -> Any:
+        """在线程中执行（用于依赖进程内数据的任务）"""
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    def result_path(self, extension: str) -> str:
+        """结果文件路径；任务结束后可通过结果接口下载"""
+        self.job.result_file = os.path.join(self._manager.result_dir, f"{self.job.id}.{extension}")
+        return self.job.result_file
+
+
+class JobManager:
+    """任务注册、提交、调度与取消"""
+
+    def __init__(self, db_path: str = JOBS_DB_PATH, result_dir: str = JOBS_RESULT_DIR,
+                 queue_size: int = JOBS_QUEUE_SIZE, concurrency: int = JOBS_CONCURRENCY,
+                 process_workers: int = JOBS_PROCESS_WORKERS, timeout: float = JOBS_TIMEOUT):
+        self.db_path = db_path
+        self.result_dir = result_dir
+        self.queue_size = queue_size
+        self.concurrency = concurrency
+        self.process_workers = process_workers
+        self.timeout = timeout
+        self.kinds: Dict[str, JobKind] = {}
+        self._store: Optional[JobStore] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._seq = itertools.count()
+        # 排队或运行中的任务（状态以内存为准，结束后只在任务表中）
+        self._active: Dict[str, Job] = {}
+        self._running: Dict[str, Optional[asyncio.Task]] = {}
+        # 运行中任务的结束事件（状态已写入任务表后触发）
+        self._finished: Dict[str, asyncio.Event] = {}
+        self._cancel_requested: set = set()
+
+    # ----- 注册 -----
+
+    def register(self, name: str, handler: Optional[JobHandler] = None, *,
+                 validate: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+                 cache_ttl: float = JOBS_CACHE_TTL, description: str = ""):
+        """注册任务种类，可作为装饰器使用"""
+        def decorator(func: JobHandler) -> JobHandler:
+            self.kinds[name] = JobKind(name, func, validate, cache_ttl, description)
+            return func
+        return decorator(handler) if handler is not None else decorator
+
+    def describe_kinds(self) -> List[Dict[str, Any]]:
+        return [{"kind": kind.name, "description": kind.description, "cache_ttl": kind.cache_ttl}
+                for kind in self.kinds.values()]
+
+    # ----- 生命周期 -----
+
+    @property
+    def started(self) -> bool:
+        return self._queue is not None
+
+    async def start(self) -> None:
+        """打开任务表，恢复排队中的任务并启动工作者；上次运行中被中断（进程异常退出）的任务标记为失败"""
+        self._store = await asyncio.to_thread(JobStore, self.db_path)
+        await asyncio.to_thread(os.makedirs, self.result_dir, exist_ok=True)
+        self._queue = asyncio.PriorityQueue(self.queue_size)
+        restored = 0
+        for job in await asyncio.to_thread(self._store.unfinished):
+            if job.status == RUNNING or job.kind not in self.kinds or self._queue.full():
+                job.error = "服务重启时任务中断" if job.status == RUNNING else "任务无法恢复"
+                job.status, job.finished_at = FAILED, time.time()
+                await asyncio.to_thread(self._store.save, job)
+                continue
+            self._active[job.id] = job
+            self._queue.put_nowait((job.priority, next(self._seq), job.id))
+            restored += 1
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        logger.info("后台任务已启动", extra={"restored": restored, "workers": self.concurrency})
+
+    async def stop(self) -> None:
+        """停止工作者；运行中的任务恢复为排队状态，下次启动时继续执行"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+        self._queue = None
+        self._active.clear()
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.process_workers)
+        return self._pool
+
+    def _recycle_pool(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    # ----- 提交与查询 -----
+
+    def _require_started(self) -> None:
+        if not self.started:
+            raise CustomException("后台任务服务尚未启动", "JOBS_UNAVAILABLE", 503)
+
+    async def submit(self, kind: str, params: Optional[Dict[str, Any]] = None,
+                     priority: int = DEFAULT_PRIORITY, use_cache: bool = True) -> Job:
+        """
+        提交任务；种类、优先级或参数无效时抛出 ValueError，队列已满时抛出 JOB_QUEUE_FULL（503）
+        use_cache 为真时优先返回相同输入的排队/运行中任务或有效期内已完成的任务（cached=True）
+        """
+        self._require_started()
+        spec = self.kinds.get(kind)
+        if spec is None:
+            raise ValueError(f"未知的任务种类: {kind}（可用: {', '.join(self.kinds)}）")
+        if not MIN_PRIORITY <= priority <= MAX_PRIORITY:
+            raise ValueError(f"优先级必须在 {MIN_PRIORITY} 到 {MAX_PRIORITY} 之间")
+        params = dict(params or {})
+        if spec.validate is not None:
+            params = spec.validate(params)
+        digest = input_hash(kind, params)
+
+        if use_cache:
+            pending = next((job for job in self._active.values()
+                            if job.input_hash == digest and job.status in (QUEUED, RUNNING)), None)
+            if pending is not None:
+                return pending
+            cached = await asyncio.to_thread(self._store.find_cached, digest, time.time() - spec.cache_ttl)
+            if cached is not None and (cached.result_file is None or os.path.exists(cached.result_file)):
+                cached.cached = True
+                return cached
+
+        if self._queue.full():
+            raise CustomException("后台任务队列已满，请稍后重试", "JOB_QUEUE_FULL", 503)
+        job = Job(id=uuid.uuid4().hex, kind=kind, params=params, input_hash=digest, priority=priority)
+        await asyncio.to_thread(self._store.save, job)
+        self._active[job.id] = job
+        self._queue.put_nowait((priority, next(self._seq), job.id))
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        self._require_started()
+        job = self._active.get(job_id)
+        if job is not None:
+            return job
+        return await asyncio.to_thread(self._store.get, job_id)
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """取消排队或运行中的任务；已结束的任务原样返回，不存在时返回 None"""
+        job = self._active.get(job_id)
+        if job is None:
+            return await self.get(job_id)
+        if job_id in self._running:
+            # 处理函数尚未开始（正在保存运行状态）时只登记取消请求，由 _run 在保存后处理
+            finished = self._finished[job_id]
+            self._cancel_requested.add(job_id)
+            task = self._running[job_id]
+            if task is not None:
+                task.cancel()
+            await finished.wait()
+            return job
+        job.status, job.finished_at = CANCELLED, time.time()
+        self._active.pop(job_id, None)
+        await asyncio.to_thread(self._store.save, job)
+        return job
+
+    # ----- 执行 -----
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self._active.get(job_id)
+            # 排队期间已取消的任务直接跳过
+            if job is None or job.status != QUEUED:
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Job) -> None:
+        spec = self.kinds[job.kind]
+        job.status, job.started_at = RUNNING, time.time()
+        # 在第一次 await 之前登记为运行中：保存运行状态期间收到的取消请求在保存后生效，不会被执行结果覆盖
+        task: Optional[asyncio.Task] = None
+        self._running[job.id] = None
+        finished = self._finished[job.id] = asyncio.Event()
+        try:
+            await asyncio.to_thread(self._store.save, job)
+            if job.id in self._cancel_requested:
+                raise asyncio.CancelledError()
+            task = asyncio.create_task(asyncio.wait_for(spec.handler(JobContext(self, job), job.params), self.timeout))
+            self._running[job.id] = task
+            result = await task
+            json.dumps(result, ensure_ascii=False)
+            job.result, job.status, job.progress = result, SUCCEEDED, 1.0
+        except asyncio.CancelledError:
+            if job.id not in self._cancel_requested:
+                # 服务关闭：任务回到排队状态，下次启动时重新执行
+                if task is not None:
+                    task.cancel()
+                job.status, job.started_at, job.progress = QUEUED, None, 0.0
+                await asyncio.shield(asyncio.to_thread(self._store.save, job))
+                self._finished.pop(job.id, None)
+                finished.set()
+                raise
+            job.status = CANCELLED
+        except asyncio.TimeoutError:
+            job.status, job.error = FAILED, f"任务超过 {self.timeout:g} 秒时间预算"
+        except BrokenProcessPool:
+            self._recycle_pool()
+            job.status, job.error = FAILED, "计算进程异常退出"
+        except Exception as e:
+            logger.error(f"后台任务失败: {e}", extra={"job_id": job.id, "kind": job.kind})
+            job.status, job.error = FAILED, str(e) or type(e).__name__
+        finally:
+            self._running.pop(job.id, None)
+            self._cancel_requested.discard(job.id)
+
+        if job.status != SUCCEEDED and job.result_file and os.path.exists(job.result_file):
+            os.remove(job.result_file)
+            job.result_file = None
+        job.finished_at = time.time()
+        await asyncio.to_thread(self._store.save, job)
+        self._active.pop(job.id, None)
+        self._finished.pop(job.id, None)
+        finished.set()
+
+    async def cleanup(self) -> int:
+        """删除保留期之前结束的任务及其结果文件"""
+        self._require_started()
+        files = await asyncio.to_thread(self._store.purge, time.time() - JOBS_RETENTION)
+        for path in files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return len(files)
+
+
+async def run_job_cleanup(interval: float = JOBS_CLEANUP_INTERVAL):
+    """后台任务：定期清理过期的任务记录与结果文件"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await job_manager.cleanup()
+        except Exception as e:
+            logger.error(f"清理后台任务失败: {e}")
+
+
+# 全局实例
+job_manager = JobManager()
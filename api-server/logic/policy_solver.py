@@ -0,0 +1,263 @@
+"""
+最优策略求解
+对每个场景、难度和回合数（horizon），通过回合逻辑（execute_real_logic）遍历决策空间，
+在离散化后哈希的状态上做带记忆的动态规划，求出可达的最高与最低综合得分及对应的决策序列。
+随机结果按期望处理（uniform 取区间中点），延迟效果随状态一起推演。
+结果在启动后由后台任务（policy_precompute）在进程池中预计算并载入表中，回合接口按 (场景, 难度, 已进行回合数) 查表给出遗憾值
+"""
+import logging
+import os
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from .game_session_service import SessionState, TurnTransition
+    from .delayed_effects import DelayedEffectQueue
+except ImportError:
+    from game_session_service import SessionState, TurnTransition
+    from delayed_effects import DelayedEffectQueue
+
+logger = logging.getLogger(__name__)
+
+POLICY_MAX_HORIZON = int(os.getenv("POLICY_MAX_HORIZON", "6"))
+# 每个 (场景, 难度) 最多展开的状态数，超出后只保留已完成的 horizon
+POLICY_NODE_BUDGET = int(os.getenv("POLICY_NODE_BUDGET", "200000"))
+
+INITIAL_RESOURCES = SessionState().resources
+SCORE_MAX, SCORE_MIN = 100.0, 0.0
+# 离散化粒度：0-100 字段保留一位小数，资源按初始资源的 0.5% 分桶
+_BOUNDED_PRECISION = 1
+_RESOURCE_STEP = max(1.0, INITIAL_RESOURCES * 0.005)
+
+
+def outcome_score(state: Dict[str, Any]) -> float:
+    """
+    综合得分（0-100）：满意度、声誉、知识与资源四项的平均；
+    资源以初始资源为 50 分、翻倍为 100 分换算
+    """
+    resources = min(100.0, max(0.0, 50.0 * state["resources"] / INITIAL_RESOURCES))
+    bounded = [min(100.0, max(0.0, state[name])) for name in ("satisfaction", "reputation", "knowledge")]
+    return round((sum(bounded) + resources) / 4, 2)
+
+
+class _ExpectedRandom:
+    """按期望取值的"随机数"：让带随机选项的回合逻辑在求解时确定"""
+
+    def random(self) -> float:
+        return 0.5
+
+    def uniform(self, a: float, b: float) -> float:
+        return (a + b) / 2
+
+    def randint(self, a: int, b: int) -> int:
+        return (a + b) // 2
+
+    def choice(self, seq: Sequence[Any]) -> Any:
+        return seq[len(seq) // 2]
+
+
+_EXPECTED_RANDOM = _ExpectedRandom()
+
+
+@dataclass(slots=True)
+class PolicyResult:
+    """某个 horizon 下的最优与最差结果"""
+    horizon: int
+    best_score: float
+    worst_score: float
+    best_path: List[Dict[str, Any]]
+    worst_path: List[Dict[str, Any]]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "horizon": self.horizon,
+            "best_score": self.best_score,
+            "worst_score": self.worst_score,
+            "best_path": self.best_path,
+            "worst_path": self.worst_path,
+        }
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+class PolicySolver:
+    """单个 (场景, 难度) 的动态规划求解；记忆表只在一次 solve 中有效"""
+
+    def __init__(self, transition: TurnTransition, scenario_id: str, difficulty: str,
+                 decisions: List[Dict[str, Any]], node_budget: int = POLICY_NODE_BUDGET):
+        self.transition = transition
+        self.scenario_id = scenario_id
+        self.difficulty = difficulty
+        self.decisions = decisions
+        self.node_budget = node_budget
+        self.expanded = 0
+        # (状态键, 剩余回合) -> (最高得分, 最优决策下标, 最低得分, 最差决策下标)
+        self._memo: Dict[Tuple, Tuple[float, int, float, int]] = {}
+
+    @staticmethod
+    def _key(state: Dict[str, Any], effects: tuple) -> Tuple:
+        turn = state["turn_number"]
+        values = []
+        for name, value in sorted(state.items()):
+            if name == "resources":
+                value = round(value / _RESOURCE_STEP)
+            elif isinstance(value, float):
+                value = round(value, _BOUNDED_PRECISION)
+            values.append((name, value if isinstance(value, (int, float, str, type(None))) else repr(value)))
+        pending = tuple((row[0] - turn, row[2], round(row[3], _BOUNDED_PRECISION)) + tuple(row[4:8])
+                        for row in sorted(effects))
+        return tuple(values), pending
+
+    def _step(self, state: Dict[str, Any], effects: tuple,
+              decisions: Dict[str, Any]) -> Tuple[Dict[str, Any], tuple]:
+        queue = DelayedEffectQueue(effects)
+        new_state = self.transition(self.scenario_id, dict(state), decisions, difficulty=self.difficulty,
+                                    rng=_EXPECTED_RANDOM, effects=queue)
+        new_state["turn_number"] = state["turn_number"] + 1
+        queue.apply_due(new_state, new_state["turn_number"])
+        return new_state, queue.snapshot()
+
+    def _value(self, state: Dict[str, Any], effects: tuple, remaining: int) -> Tuple[float, int, float, int]:
+        if remaining == 0:
+            score = outcome_score(state)
+            return score, -1, score, -1
+        memo_key = (self._key(state, effects), remaining)
+        cached = self._memo.get(memo_key)
+        if cached is not None:
+            return cached
+
+        self.expanded += 1
+        if self.expanded > self.node_budget:
+            raise _BudgetExceeded()
+        best, best_index, worst, worst_index = -1.0, -1, 101.0, -1
+        seen = set()
+        for index, decisions in enumerate(self.decisions):
+            next_state, next_effects = self._step(state, effects, decisions)
+            # 剪枝：后继状态相同的决策只展开一次
+            successor = self._key(next_state, next_effects)
+            if successor in seen:
+                continue
+            seen.add(successor)
+            high, _, low, _ = self._value(next_state, next_effects, remaining - 1)
+            if high > best:
+                best, best_index = high, index
+            if low < worst:
+                worst, worst_index = low, index
+            # 剪枝：最高与最低都已到达得分边界，其余决策不可能更优或更差
+            if best >= SCORE_MAX and worst <= SCORE_MIN:
+                break
+        self._memo[memo_key] = result = (best, best_index, worst, worst_index)
+        return result
+
+    def _path(self, state: Dict[str, Any], effects: tuple, remaining: int, slot: int) -> List[Dict[str, Any]]:
+        """沿记忆表中的最优（slot=1）或最差（slot=3）决策重建决策序列"""
+        path = []
+        while remaining > 0:
+            index = self._value(state, effects, remaining)[slot]
+            decisions = self.decisions[index]
+            turn = state["turn_number"]
+            state, effects = self._step(state, effects, decisions)
+            remaining -= 1
+            path.append({"turn": turn, "decisions": decisions, "score": outcome_score(state)})
+        return path
+
+    def solve(self, max_horizon: int) -> List[PolicyResult]:
+        """依次求解 horizon = 1..max_horizon；超出展开预算时返回已完成的部分"""
+        initial = SessionState().as_dict()
+        results = []
+        try:
+            for horizon in range(1, max_horizon + 1):
+                best, _, worst, _ = self._value(initial, (), horizon)
+                results.append(PolicyResult(
+                    horizon=horizon,
+                    best_score=best,
+                    worst_score=worst,
+                    best_path=self._path(initial, (), horizon, 1),
+                    worst_path=self._path(initial, (), horizon, 3),
+                ))
+        except _BudgetExceeded:
+            logger.warning("最优策略求解超出展开预算", extra={
+                "scenario_id": self.scenario_id, "difficulty": self.difficulty, "horizon": len(results) + 1
+            })
+        finally:
+            self._memo.clear()
+        return results
+
+
+class PolicyTable:
+    """预计算的最优/最差结果表：(场景ID, 难度) -> 各 horizon 的 PolicyResult"""
+
+    def __init__(self):
+        self.results: Dict[Tuple[str, str], List[PolicyResult]] = {}
+        self.last_report: Dict[str, Any] = {}
+
+    def get(self, scenario_id: str, difficulty: str, horizon: int) -> Optional[PolicyResult]:
+        results = self.results.get((scenario_id, difficulty))
+        if not results or not 1 <= horizon <= len(results):
+            return None
+        return results[horizon - 1]
+
+    def regret(self, scenario_id: str, difficulty: str, turns_played: int,
+               state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """当前状态与同样回合数下最优结果的差距；表中没有该场景或回合数超出已求解范围时返回 None"""
+        result = self.get(scenario_id, difficulty, turns_played)
+        if result is None:
+            return None
+        score = outcome_score(state)
+        spread = result.best_score - result.worst_score
+        return {
+            "horizon": result.horizon,
+            "score": score,
+            "best_score": result.best_score,
+            "worst_score": result.worst_score,
+            "regret": round(max(0.0, result.best_score - score), 2),
+            "position_percent": round(100 * (score - result.worst_score) / spread, 1) if spread > 0 else 100.0,
+        }
+
+    def solve(self, transition: TurnTransition, scenario_id: str, difficulty: str,
+              decisions: List[Dict[str, Any]], max_horizon: int = POLICY_MAX_HORIZON) -> List[PolicyResult]:
+        solver = PolicySolver(transition, scenario_id, difficulty, decisions)
+        results = solver.solve(max_horizon)
+        if results:
+            self.results[(scenario_id, difficulty)] = results
+        return results
+
+    def load(self, scenario_id: str, difficulty: str, rows: List[Dict[str, Any]]) -> bool:
+        """载入 solve_policy 的结果；只在不短于已有结果时替换"""
+        results = [PolicyResult(**row) for row in rows]
+        existing = self.results.get((scenario_id, difficulty), [])
+        if not results or len(results) < len(existing):
+            return False
+        self.results[(scenario_id, difficulty)] = results
+        return True
+
+
+def solve_policy(transition: TurnTransition, scenario_id: str, difficulty: str,
+                 decisions: List[Dict[str, Any]], max_horizon: int = POLICY_MAX_HORIZON) -> List[Dict[str, Any]]:
+    """求解并返回可序列化的结果（进程池中执行的入口）"""
+    solver = PolicySolver(transition, scenario_id, difficulty, decisions)
+    return [result.as_dict() for result in solver.solve(max_horizon)]
+
+
+def simulate_outcomes(transition: TurnTransition, scenario_id: str, difficulty: str,
+                      decisions: List[Dict[str, Any]], turns: int, runs: int, seed: int) -> List[float]:
+    """蒙特卡洛模拟：每局每回合随机选择决策，回合逻辑使用真实随机数，返回各局的最终综合得分"""
+    rng = random.Random(seed)
+    scores = []
+    for _ in range(runs):
+        state, queue = SessionState().as_dict(), DelayedEffectQueue()
+        for _ in range(turns):
+            turn = state["turn_number"]
+            state = transition(scenario_id, dict(state), rng.choice(decisions), difficulty=difficulty,
+                               rng=rng, effects=queue)
+            state["turn_number"] = turn + 1
+            queue.apply_due(state, state["turn_number"])
+        scores.append(outcome_score(state))
+    return scores
+
+
+# 全局实例
+policy_table = PolicyTable()
@@ -0,0 +1,177 @@
+"""
+全局结果聚合模块
+计数、分数和、各偏差出现次数以及各测试类型的进步情况保存在规范化的聚合表中，
+与结果写入/删除在同一个事务内增量更新，进程崩溃也不会丢失或重复计数；
+全局统计接口只读取总计、偏差和测试类型这几张小表，与用户数无关
+"""
+import sqlite3
+import threading
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+AGGREGATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS agg_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total_tests INTEGER NOT NULL,
+    score_sum REAL NOT NULL,
+    total_users INTEGER NOT NULL,
+    last_result_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS agg_user_tests (
+    user_id TEXT PRIMARY KEY,
+    tests INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS agg_bias_counts (
+    bias_type TEXT PRIMARY KEY,
+    n INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS agg_area_progress (
+    user_id TEXT NOT NULL,
+    test_type TEXT NOT NULL,
+    first_score REAL NOT NULL,
+    last_score REAL NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (user_id, test_type)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS agg_area_totals (
+    test_type TEXT PRIMARY KEY,
+    multi INTEGER NOT NULL,
+    improved INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+# 首次建表时从结果表重建聚合值的分块大小
+REBUILD_CHUNK = 10000
+
+
+class GlobalAggregates:
+    """
+    聚合表的读写；apply/remove/replace_progress 由结果存储在持有锁、处于写事务中时调用，
+    snapshot 自行加锁读取
+    """
+
+    def __init__(self, conn: sqlite3.Connection, lock: threading.Lock):
+        self._conn = conn
+        self._lock = lock
+
+    # ----- 初始化 -----
+
+    def ensure_schema(self):
+        """建表；总计行不存在时（新库或旧版本检查点库）由结果表重建（调用方持有锁）"""
+        self._conn.executescript(AGGREGATE_SCHEMA)
+        if self._conn.execute("SELECT 1 FROM agg_totals WHERE id = 1").fetchone():
+            return
+        with self._conn:
+            for table in ("agg_user_tests", "agg_bias_counts", "agg_area_progress", "agg_area_totals"):
+                self._conn.execute(f"DELETE FROM {table}")
+            self._conn.execute("INSERT INTO agg_totals VALUES (1, 0, 0, 0, 0)")
+            last_id = 0
+            while True:
+                rows = self._conn.execute(
+                    "SELECT id, user_id, test_type, score, bias_type FROM results WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, REBUILD_CHUNK)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1]["id"]
+                self.apply([dict(row) for row in rows], last_id)
+            self._conn.execute("DROP TABLE IF EXISTS aggregate_checkpoint")
+
+    # ----- 增量更新 -----
+
+    def _progress(self, user_id: str, test_type: str) -> Optional[Tuple[float, float, int]]:
+        row = self._conn.execute(
+            "SELECT first_score, last_score, n FROM agg_area_progress WHERE user_id = ? AND test_type = ?",
+            (user_id, test_type)).fetchone()
+        return tuple(row) if row else None
+
+    def _area_add(self, test_type: str, multi: int, improved: int):
+        self._conn.execute(
+            "INSERT INTO agg_area_totals (test_type, multi, improved) VALUES (?, ?, ?) "
+            "ON CONFLICT(test_type) DO UPDATE SET multi = multi + excluded.multi, improved = improved + excluded.improved",
+            (test_type, multi, improved))
+        self._conn.execute("DELETE FROM agg_area_totals WHERE test_type = ? AND multi <= 0", (test_type,))
+
+    def _set_progress(self, user_id: str, test_type: str, progress: Optional[Tuple[float, float, int]]):
+        """替换某用户在某测试类型上的进步记录，并同步更新该类型的汇总"""
+        old = self._progress(user_id, test_type)
+        if old is not None and old[2] >= 2:
+            self._area_add(test_type, -1, -int(old[1] > old[0]))
+        if progress is None:
+            self._conn.execute("DELETE FROM agg_area_progress WHERE user_id = ? AND test_type = ?", (user_id, test_type))
+            return
+        self._conn.execute("INSERT OR REPLACE INTO agg_area_progress VALUES (?, ?, ?, ?, ?)",
+                           (user_id, test_type, *progress))
+        if progress[2] >= 2:
+            self._area_add(test_type, 1, int(progress[1] > progress[0]))
+
+    def apply(self, rows: Iterable[Dict[str, Any]], last_result_id: int):
+        """应用新写入的结果（按时间顺序）"""
+        tests, score_sum, new_users = 0, 0.0, 0
+        for row in rows:
+            tests += 1
+            score_sum += row["score"]
+            user_id, test_type = row["user_id"], row["test_type"]
+            cursor = self._conn.execute(
+                "UPDATE agg_user_tests SET tests = tests + 1 WHERE user_id = ?", (user_id,))
+            if cursor.rowcount == 0:
+                self._conn.execute("INSERT INTO agg_user_tests VALUES (?, 1)", (user_id,))
+                new_users += 1
+            if row.get("bias_type"):
+                self._conn.execute(
+                    "INSERT INTO agg_bias_counts VALUES (?, 1) ON CONFLICT(bias_type) DO UPDATE SET n = n + 1",
+                    (row["bias_type"],))
+
+            old = self._progress(user_id, test_type)
+            progress = (row["score"], row["score"], 1) if old is None else (old[0], row["score"], old[2] + 1)
+            self._set_progress(user_id, test_type, progress)
+        self._conn.execute(
+            "UPDATE agg_totals SET total_tests = total_tests + ?, score_sum = score_sum + ?, "
+            "total_users = total_users + ?, last_result_id = MAX(last_result_id, ?) WHERE id = 1",
+            (tests, score_sum, new_users, last_result_id))
+
+    def remove(self, rows: Iterable[Dict[str, Any]]):
+        """撤销已删除结果的计数；进步记录需调用方用 replace_progress 按剩余数据重算"""
+        tests, score_sum, removed_users = 0, 0.0, 0
+        for row in rows:
+            tests += 1
+            score_sum += row["score"]
+            user_id = row["user_id"]
+            self._conn.execute("UPDATE agg_user_tests SET tests = tests - 1 WHERE user_id = ?", (user_id,))
+            removed_users += self._conn.execute(
+                "DELETE FROM agg_user_tests WHERE user_id = ? AND tests <= 0", (user_id,)).rowcount
+            if row.get("bias_type"):
+                self._conn.execute("UPDATE agg_bias_counts SET n = n - 1 WHERE bias_type = ?", (row["bias_type"],))
+                self._conn.execute("DELETE FROM agg_bias_counts WHERE bias_type = ? AND n <= 0", (row["bias_type"],))
+        self._conn.execute(
+            "UPDATE agg_totals SET total_tests = total_tests - ?, score_sum = score_sum - ?, "
+            "total_users = total_users - ? WHERE id = 1", (tests, score_sum, removed_users))
+
+    def replace_progress(self, user_id: str, test_type: str,
+                         first_score: Optional[float], last_score: Optional[float], count: int):
+        progress = None if count == 0 else (first_score, last_score, count)
+        self._set_progress(user_id, test_type, progress)
+
+    # ----- 查询 -----
+
+    def snapshot(self, top_n: int = 3, top_areas: int = 2) -> Dict[str, Any]:
+        """全局统计（只读小表）"""
+        with self._lock:
+            totals = self._conn.execute(
+                "SELECT total_tests, score_sum, total_users, last_result_id FROM agg_totals WHERE id = 1").fetchone()
+            biases = self._conn.execute(
+                "SELECT bias_type, n FROM agg_bias_counts ORDER BY n DESC LIMIT ?", (top_n,)).fetchall()
+            areas = self._conn.execute(
+                "SELECT test_type, CAST(improved AS REAL) / multi AS rate FROM agg_area_totals "
+                "WHERE multi > 0 ORDER BY rate DESC LIMIT ?", (top_areas,)).fetchall()
+        total, score_sum, total_users, last_result_id = tuple(totals)
+        return {
+            "total_users": total_users,
+            "total_tests_taken": total,
+            "average_score": round(score_sum / total, 2) if total else 0.0,
+            "most_common_biases": [
+                {"bias": bias, "frequency": round(count / total, 4)} for bias, count in biases
+            ] if total else [],
+            "top_improved_areas": [
+                {"test_type": test_type, "improvement_rate": round(rate, 4)} for test_type, rate in areas
+            ],
+            "as_of_result_id": last_result_id,
+        }
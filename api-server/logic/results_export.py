@@ -0,0 +1,169 @@
+"""
+测试结果流式导出模块
+把结果行迭代器编码为 CSV / NDJSON / JSON / Parquet 字节块，配合 StreamingResponse 使用，
+导出过程中只保留一页数据，内存占用与导出总量无关
+"""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterable, Iterator, List
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet 为可选格式
+    pa = None
+    pq = None
+
+EXPORT_COLUMNS = [
+    "userId", "sessionId", "testType", "questionId", "score", "biasType",
+    "userEstimation", "actualValue", "estimationError", "improvementAreas", "completedAt",
+]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# 每个输出块包含的行数
+CHUNK_ROWS = 500
+
+
+def supported_formats() -> List[str]:
+    formats = ["json", "csv", "ndjson"]
+    if pq is not None:
+        formats.append("parquet")
+    return formats
+
+
+def export_record(row: Dict[str, Any]) -> Dict[str, Any]:
+    """存储行 -> 导出记录"""
+    return {
+        "userId": row["user_id"],
+        "sessionId": row["session_id"],
+        "testType": row["test_type"],
+        "questionId": row["question_id"],
+        "score": row["score"],
+        "biasType": row["bias_type"],
+        "userEstimation": row["user_estimation"],
+        "actualValue": row["actual_value"],
+        "estimationError": row["estimation_error"],
+        "improvementAreas": row["improvement_areas"],
+        "completedAt": datetime.fromtimestamp(row["timestamp"], tz=timezone.utc).isoformat(),
+    }
+
+
+def _chunks(rows: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    size = CHUNK_ROWS
+    chunk = []
+    for row in rows:
+        chunk.append(export_record(row))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_csv(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    # 带 BOM，Excel 可以直接识别中文
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    buffer.write("\ufeff")
+    writer.writeheader()
+    for chunk in _chunks(rows):
+        for record in chunk:
+            record["improvementAreas"] = ";".join(record["improvementAreas"])
+            writer.writerow(record)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_ndjson(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    for chunk in _chunks(rows):
+        yield "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in chunk).encode("utf-8")
+
+
+def iter_json(rows: Iterable[Dict[str, Any]], header: Dict[str, Any],
+              trailer: Dict[str, Any]) -> Iterator[bytes]:
+    """
+    流式输出 {...header, "data": {"test_history": [...], ...trailer}}，
+    与原 JSON 导出的结构相同
+    """
+    head = json.dumps(header, ensure_ascii=False)[:-1]
+    separator = ", " if header else ""
+    yield f'{head}{separator}"data": {{"test_history": ['.encode("utf-8")
+    first = True
+    for chunk in _chunks(rows):
+        body = ",".join(json.dumps(record, ensure_ascii=False) for record in chunk)
+        yield (body if first else "," + body).encode("utf-8")
+        first = False
+    tail = json.dumps(trailer, ensure_ascii=False)[1:]
+    yield f'], {tail}}}'.encode("utf-8") if trailer else b']}}'
+
+
+class _ChunkSink(io.RawIOBase):
+    """ParquetWriter 的输出目标：写入内容暂存，由生成器取走"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def iter_parquet(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """每 CHUNK_ROWS 行写一个 row group 并立即输出"""
+    if pq is None:
+        raise RuntimeError("未安装 pyarrow，无法导出 Parquet")
+
+    schema = pa.schema([
+        ("userId", pa.string()), ("sessionId", pa.string()), ("testType", pa.string()),
+        ("questionId", pa.string()), ("score", pa.float64()), ("biasType", pa.string()),
+        ("userEstimation", pa.float64()), ("actualValue", pa.float64()),
+        ("estimationError", pa.float64()), ("improvementAreas", pa.list_(pa.string())),
+        ("completedAt", pa.string()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for chunk in _chunks(rows):
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def iter_export(fmt: str, rows: Iterable[Dict[str, Any]], header: Dict[str, Any],
+                trailer: Dict[str, Any]) -> Iterator[bytes]:
+    """按格式选择编码器（header/trailer 只用于 JSON）"""
+    if fmt == "csv":
+        return iter_csv(rows)
+    if fmt == "ndjson":
+        return iter_ndjson(rows)
+    if fmt == "parquet":
+        return iter_parquet(rows)
+    return iter_json(rows, header, trailer)
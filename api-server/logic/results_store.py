@@ -0,0 +1,395 @@
+"""
+测试结果存储模块
+默认使用 SQLite 持久化用户提交结果，按 user_id/session_id/test_type/timestamp 建索引，
+所有按用户或会话的查询都走索引并限制返回行数，百万级数据下延迟保持稳定
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional, Iterable, Iterator
+
+try:
+    from .write_behind import WriteBehindQueue
+    from .result_aggregates import GlobalAggregates
+except ImportError:
+    from write_behind import WriteBehindQueue
+    from result_aggregates import GlobalAggregates
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.getenv(
+    "RESULTS_DB_PATH",
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'results.db')
+)
+
+# 单次查询返回的最大行数
+MAX_HISTORY_ROWS = 1000
+
+SECONDS_PER_DAY = 86400
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    test_type TEXT NOT NULL,
+    question_id TEXT,
+    score REAL NOT NULL DEFAULT 0,
+    bias_type TEXT,
+    user_estimation REAL,
+    actual_value REAL,
+    estimation_error REAL,
+    improvement_areas TEXT,
+    explanation TEXT,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_user_ts ON results(user_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_results_user_type_ts ON results(user_id, test_type, timestamp);
+CREATE INDEX IF NOT EXISTS idx_results_session ON results(session_id);
+CREATE INDEX IF NOT EXISTS idx_results_type_ts ON results(test_type, timestamp);
+CREATE INDEX IF NOT EXISTS idx_results_ts ON results(timestamp);
+CREATE INDEX IF NOT EXISTS idx_results_bias ON results(bias_type);
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    scenario_id TEXT NOT NULL,
+    difficulty TEXT,
+    turn INTEGER NOT NULL,
+    choice TEXT,
+    amount REAL,
+    resources REAL,
+    satisfaction REAL,
+    reputation REAL,
+    timestamp REAL NOT NULL
+);
+"""
+
+# 决策记录增量读取的分块大小
+REPLAY_CHUNK = 10000
+
+_COLUMNS = (
+    "user_id", "session_id", "test_type", "question_id", "score", "bias_type",
+    "user_estimation", "actual_value", "estimation_error", "improvement_areas",
+    "explanation", "timestamp",
+)
+
+_DECISION_COLUMNS = (
+    "session_id", "scenario_id", "difficulty", "turn", "choice", "amount",
+    "resources", "satisfaction", "reputation", "timestamp",
+)
+
+
+def make_result_row(user_id: str, session_id: str, test_type: str,
+                    question_id: Optional[str] = None,
+                    score: float = 0.0,
+                    bias_type: Optional[str] = None,
+                    user_estimation: Optional[float] = None,
+                    actual_value: Optional[float] = None,
+                    estimation_error: Optional[float] = None,
+                    improvement_areas: Optional[List[str]] = None,
+                    explanation: str = "",
+                    timestamp: Optional[float] = None) -> Dict[str, Any]:
+    """构造一行结果记录（timestamp 为 Unix 秒）"""
+    return {
+        "user_id": user_id,
+        "session_id": session_id,
+        "test_type": test_type,
+        "question_id": question_id,
+        "score": max(0.0, min(100.0, float(score))),
+        "bias_type": bias_type,
+        "user_estimation": user_estimation,
+        "actual_value": actual_value,
+        "estimation_error": estimation_error,
+        "improvement_areas": list(improvement_areas or []),
+        "explanation": explanation,
+        "timestamp": time.time() if timestamp is None else timestamp,
+    }
+
+
+def make_decision_row(session_id: str, scenario_id: str, difficulty: str, turn: int,
+                      decisions: Dict[str, Any], state: Dict[str, Any],
+                      timestamp: Optional[float] = None) -> Dict[str, Any]:
+    """构造一行游戏决策记录：choice 取 option，没有时取 action；state 为该回合结束后的状态"""
+    choice = decisions.get("option") or decisions.get("action") or ""
+    amount = decisions.get("amount")
+    return {
+        "session_id": session_id,
+        "scenario_id": scenario_id,
+        "difficulty": difficulty,
+        "turn": int(turn),
+        "choice": str(choice),
+        "amount": float(amount) if isinstance(amount, (int, float)) else None,
+        "resources": state.get("resources"),
+        "satisfaction": state.get("satisfaction"),
+        "reputation": state.get("reputation"),
+        "timestamp": time.time() if timestamp is None else timestamp,
+    }
+
+
+def score_from_error_ratio(error_ratio: Optional[float]) -> float:
+    """由误差率换算 0-100 分：误差为 0 得 100 分，误差率 >= 100% 得 0 分"""
+    if error_ratio is None:
+        return 0.0
+    return round(100.0 * (1.0 - min(abs(error_ratio), 1.0)), 2)
+
+
+def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    data = dict(row)
+    data["improvement_areas"] = json.loads(data["improvement_areas"] or "[]")
+    return data
+
+
+class ResultsStore:
+    """SQLite 结果存储（单连接 + 锁，调用方应通过 asyncio.to_thread 调用）"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self.aggregates = GlobalAggregates(self._conn, self._lock)
+            self.aggregates.ensure_schema()
+
+    # ----- 写入 -----
+
+    def add_results(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """在一个事务中批量写入结果并更新聚合表，返回写入行数"""
+        rows = list(rows)
+        params = [
+            tuple(json.dumps(row[c], ensure_ascii=False) if c == "improvement_areas" else row[c] for c in _COLUMNS)
+            for row in rows
+        ]
+        if not params:
+            return 0
+        sql = f"INSERT INTO results ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(sql, params)
+                last_id = self._conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                self.aggregates.apply(rows, last_id)
+        return len(params)
+
+    def add_result(self, row: Dict[str, Any]) -> int:
+        return self.add_results([row])
+
+    def add_decisions(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """批量写入游戏决策记录"""
+        params = [tuple(row[c] for c in _DECISION_COLUMNS) for row in rows]
+        if not params:
+            return 0
+        sql = (f"INSERT INTO decisions ({', '.join(_DECISION_COLUMNS)}) "
+               f"VALUES ({', '.join('?' * len(_DECISION_COLUMNS))})")
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(sql, params)
+        return len(params)
+
+    def delete_session(self, session_id: str) -> List[Dict[str, Any]]:
+        """删除会话的全部结果并在同一事务中撤销聚合计数，返回被删除的行"""
+        with self._lock:
+            with self._conn:
+                rows = [_row_to_dict(r) for r in self._conn.execute(
+                    "SELECT * FROM results WHERE session_id = ?", (session_id,))]
+                self._conn.execute("DELETE FROM results WHERE session_id = ?", (session_id,))
+                self.aggregates.remove(rows)
+                for user_id, test_type in {(r["user_id"], r["test_type"]) for r in rows}:
+                    self._refresh_progress(user_id, test_type)
+        return rows
+
+    # ----- 聚合 -----
+
+    def _refresh_progress(self, user_id: str, test_type: str):
+        """按剩余数据重算某用户在某测试类型上的首次/最近得分（调用方持有锁并处于写事务中）"""
+        where = "FROM results WHERE user_id = ? AND test_type = ?"
+        params = (user_id, test_type)
+        count = self._conn.execute(f"SELECT COUNT(*) {where}", params).fetchone()[0]
+        first = last = None
+        if count:
+            first = self._conn.execute(f"SELECT score {where} ORDER BY timestamp, id LIMIT 1", params).fetchone()[0]
+            last = self._conn.execute(f"SELECT score {where} ORDER BY timestamp DESC, id DESC LIMIT 1", params).fetchone()[0]
+        self.aggregates.replace_progress(user_id, test_type, first, last, count)
+
+    # ----- 查询 -----
+
+    def _query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def user_history(self, user_id: str, limit: int = MAX_HISTORY_ROWS,
+                     test_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """用户最近的结果（按时间倒序）"""
+        limit = max(1, min(limit, MAX_HISTORY_ROWS))
+        if test_type:
+            rows = self._query(
+                "SELECT * FROM results WHERE user_id = ? AND test_type = ? ORDER BY timestamp DESC LIMIT ?",
+                (user_id, test_type, limit))
+        else:
+            rows = self._query(
+                "SELECT * FROM results WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?",
+                (user_id, limit))
+        return [_row_to_dict(r) for r in rows]
+
+    def iter_user_results(self, user_id: str, page_size: int = 1000,
+                          test_type: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        按时间顺序逐页遍历用户的全部结果（键集分页，每页单独加锁查询），
+        导出大用户历史时内存占用只与 page_size 有关
+        """
+        type_clause = " AND test_type = ?" if test_type else ""
+        type_params = (test_type,) if test_type else ()
+        last_ts, last_id = float("-inf"), 0
+        while True:
+            rows = self._query(
+                "SELECT * FROM results WHERE user_id = ?" + type_clause +
+                " AND (timestamp > ? OR (timestamp = ? AND id > ?)) ORDER BY timestamp, id LIMIT ?",
+                (user_id, *type_params, last_ts, last_ts, last_id, page_size))
+            for row in rows:
+                yield _row_to_dict(row)
+            if len(rows) < page_size:
+                return
+            last_ts, last_id = rows[-1]["timestamp"], rows[-1]["id"]
+
+    def decisions_after(self, after_id: int, limit: int = REPLAY_CHUNK) -> List[tuple]:
+        """按 id 顺序读取 after_id 之后的决策记录（元组：id + _DECISION_COLUMNS），供队列分析增量刷新"""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT id, {', '.join(_DECISION_COLUMNS)} FROM decisions WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit))
+            return [tuple(row) for row in cursor]
+
+    def session_results(self, user_id: str, session_id: str) -> List[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT * FROM results WHERE session_id = ? AND user_id = ? ORDER BY timestamp LIMIT ?",
+            (session_id, user_id, MAX_HISTORY_ROWS))
+        return [_row_to_dict(r) for r in rows]
+
+    def user_summary(self, user_id: str) -> Dict[str, Any]:
+        """用户总测试数、平均分与各偏差出现次数"""
+        totals = self._query(
+            "SELECT COUNT(*) AS n, AVG(score) AS avg_score FROM results WHERE user_id = ?", (user_id,))[0]
+        biases = self._query(
+            "SELECT bias_type, COUNT(*) AS n FROM results WHERE user_id = ? AND bias_type IS NOT NULL "
+            "GROUP BY bias_type ORDER BY n DESC", (user_id,))
+        return {
+            "total_tests": totals["n"],
+            "average_score": round(totals["avg_score"] or 0.0, 2),
+            "bias_counts": {r["bias_type"]: r["n"] for r in biases},
+        }
+
+    def type_progress(self, user_id: str, window: int = 5) -> List[Dict[str, Any]]:
+        """按测试类型比较最早与最近 window 次的平均分"""
+        progress = []
+        types = self._query("SELECT DISTINCT test_type FROM results WHERE user_id = ?", (user_id,))
+        for row in types:
+            test_type = row["test_type"]
+            first = self._query(
+                "SELECT AVG(score) AS s FROM (SELECT score FROM results WHERE user_id = ? AND test_type = ? "
+                "ORDER BY timestamp ASC LIMIT ?)", (user_id, test_type, window))[0]["s"] or 0.0
+            last = self._query(
+                "SELECT AVG(score) AS s FROM (SELECT score FROM results WHERE user_id = ? AND test_type = ? "
+                "ORDER BY timestamp DESC LIMIT ?)", (user_id, test_type, window))[0]["s"] or 0.0
+            progress.append({"test_type": test_type, "first_average": round(first, 2),
+                             "recent_average": round(last, 2), "improvement": round(last - first, 2)})
+        progress.sort(key=lambda p: p["improvement"], reverse=True)
+        return progress
+
+    def average_score_between(self, user_id: str, start: float, end: float) -> Optional[float]:
+        row = self._query(
+            "SELECT AVG(score) AS s FROM results WHERE user_id = ? AND timestamp >= ? AND timestamp < ?",
+            (user_id, start, end))[0]
+        return None if row["s"] is None else round(row["s"], 2)
+
+    def active_days(self, user_id: str, limit: int = 366) -> List[int]:
+        """用户有提交记录的日期（UTC 天序号，倒序）"""
+        rows = self._query(
+            "SELECT DISTINCT CAST(timestamp / ? AS INTEGER) AS day FROM results WHERE user_id = ? "
+            "ORDER BY day DESC LIMIT ?", (SECONDS_PER_DAY, user_id, limit))
+        return [r["day"] for r in rows]
+
+    def global_statistics(self, top_n: int = 3) -> Dict[str, Any]:
+        """全局统计（全表扫描，用于校验增量聚合；接口使用 aggregates.snapshot）"""
+        totals = self._query(
+            "SELECT COUNT(*) AS n, COUNT(DISTINCT user_id) AS users, AVG(score) AS avg_score FROM results")[0]
+        biases = self._query(
+            "SELECT bias_type, COUNT(*) AS n FROM results WHERE bias_type IS NOT NULL "
+            "GROUP BY bias_type ORDER BY n DESC LIMIT ?", (top_n,))
+        total = totals["n"] or 0
+        return {
+            "total_users": totals["users"] or 0,
+            "total_tests_taken": total,
+            "average_score": round(totals["avg_score"] or 0.0, 2),
+            "most_common_biases": [
+                {"bias": r["bias_type"], "frequency": round(r["n"] / total, 4)} for r in biases
+            ] if total else [],
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[ResultsStore] = None
+_store_lock = threading.Lock()
+
+
+def get_results_store() -> ResultsStore:
+    """全局结果存储（首次使用时创建）"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ResultsStore()
+        return _store
+
+
+def close_results_store():
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
+
+
+async def delete_session_after_flush(store: ResultsStore, writer: WriteBehindQueue,
+                                    session_id: str) -> List[Dict[str, Any]]:
+    """先等写后队列写完此前提交的结果再删除会话，否则缓冲中的结果会在删除后写入、被重新计入聚合"""
+    await writer.flush()
+    return await asyncio.to_thread(store.delete_session, session_id)
+
+
+def _write_rows(rows: List[Dict[str, Any]]) -> int:
+    return get_results_store().add_results(rows)
+
+
+# 提交接口使用的写后缓冲队列（生命周期钩子中启动与刷新）
+results_writer = WriteBehindQueue(
+    _write_rows,
+    name="results",
+    max_batch=int(os.getenv("RESULTS_FLUSH_BATCH", "500")),
+    flush_interval_ms=int(os.getenv("RESULTS_FLUSH_INTERVAL_MS", "200")),
+    max_queue=int(os.getenv("RESULTS_QUEUE_SIZE", "10000")),
+)
+
+
+def _write_decisions(rows: List[Dict[str, Any]]) -> int:
+    return get_results_store().add_decisions(rows)
+
+
+# 游戏回合决策的写后缓冲队列
+decisions_writer = WriteBehindQueue(
+    _write_decisions,
+    name="decisions",
+    max_batch=int(os.getenv("RESULTS_FLUSH_BATCH", "500")),
+    flush_interval_ms=int(os.getenv("RESULTS_FLUSH_INTERVAL_MS", "200")),
+    max_queue=int(os.getenv("RESULTS_QUEUE_SIZE", "10000")),
+)
+
@@ -0,0 +1,275 @@
+"""
+游戏会话检查点
+活跃会话写入一个追加式二进制文件：每次检查点只追加上次之后有变更的会话（一帧），
+过期移除的会话写入只含 game_id 的删除标记；恢复时按顺序回放、同一会话以最后一帧为准，
+超过空闲时间的会话在恢复和压缩时丢弃；文件增长到一定程度后在线程中压缩为一份完整快照。
+帧内容是只含基础类型的 pickle，读取时禁止解析任何类，文件损坏或截断的尾帧直接丢弃
+"""
+import asyncio
+import gc
+import io
+import logging
+import os
+import pickle
+import secrets
+import struct
+import threading
+import time
+from typing import Dict, Any, Iterator, List, Tuple
+
+try:
+    from .game_session_service import (
+        game_session_service, GameSessionService, GameSessionRecord, SessionState, DecisionRecord,
+        DecisionPatternTracker
+    )
+    from .delayed_effects import DelayedEffectQueue
+except ImportError:
+    from game_session_service import (
+        game_session_service, GameSessionService, GameSessionRecord, SessionState, DecisionRecord,
+        DecisionPatternTracker
+    )
+    from delayed_effects import DelayedEffectQueue
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_PATH = os.getenv(
+    "SESSION_CHECKPOINT_PATH",
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'sessions.ckpt')
+)
+SESSION_CHECKPOINT_INTERVAL = float(os.getenv("SESSION_CHECKPOINT_INTERVAL", "15"))
+
+MAGIC = b"GSCK\x01"
+# 帧头：负载长度
+_FRAME = struct.Struct("<I")
+PICKLE_PROTOCOL = 5
+# 追加内容超过上次完整快照的倍数（且不小于下限）时压缩
+COMPACT_RATIO = 2
+COMPACT_MIN_BYTES = 4 * 1024 * 1024
+
+
+class _PrimitiveUnpickler(pickle.Unpickler):
+    """只允许基础类型，拒绝任何类或函数引用"""
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"检查点中不允许的对象: {module}.{name}")
+
+
+# ----- 会话 <-> 基础类型 -----
+
+def encode_session(session: GameSessionRecord) -> Tuple:
+    tracker = session.pattern_tracker
+    return (
+        session.game_id,
+        session.scenario_id,
+        session.difficulty,
+        session.challenge_type,
+        session.created_at,
+        [(r.satisfaction, r.resources, r.reputation, r.knowledge, r.turn_number, r.extra, r.decisions, r.elapsed,
+          r.effects)
+         for r in session.history],
+        list(session.detected_patterns) if session.detected_patterns else None,
+        bytes(tracker.choices) if tracker is not None else None,
+        bytes(tracker.consistency) if tracker is not None else None,
+        session.effects.to_rows() if session.effects else None,
+        session.seed,
+    )
+
+
+def decode_session(row: Tuple, scenario: Dict[str, Any]) -> GameSessionRecord:
+    game_id, scenario_id, difficulty, challenge_type, created_at, history, patterns, choices, consistency = row[:9]
+    # 第 10、11 列（延迟效果、随机数种子）在旧检查点中不存在，旧会话改用新种子
+    effects = row[9] if len(row) > 9 else None
+    seed = row[10] if len(row) > 10 else secrets.randbits(48)
+    records = [DecisionRecord(*values) for values in history]
+    tracker = None
+    if choices is not None:
+        tracker = DecisionPatternTracker()
+        tracker.choices.extend(choices)
+        tracker.consistency.extend(consistency)
+    return GameSessionRecord(
+        game_id=game_id,
+        scenario_id=scenario_id,
+        difficulty=difficulty,
+        challenge_type=challenge_type,
+        scenario=scenario,
+        state=records[-1] if records else SessionState(),
+        history=records,
+        pattern_tracker=tracker,
+        detected_patterns=patterns,
+        created_at=created_at,
+        effects=DelayedEffectQueue(effects) if effects else None,
+        seed=seed,
+    )
+
+
+# ----- 文件读写 -----
+
+def _read_frames(path: str) -> Iterator[List[Tuple]]:
+    """依次读取帧；遇到损坏或截断的帧即停止"""
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                logger.warning("会话检查点格式不符，忽略", extra={"path": path})
+                return
+            while True:
+                header = f.read(_FRAME.size)
+                if len(header) < _FRAME.size:
+                    return
+                (length,) = _FRAME.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length:
+                    logger.warning("会话检查点尾帧不完整，已丢弃", extra={"path": path})
+                    return
+                try:
+                    yield _PrimitiveUnpickler(io.BytesIO(payload)).load()
+                except Exception as e:
+                    logger.warning(f"会话检查点帧损坏，停止读取: {e}", extra={"path": path})
+                    return
+    except FileNotFoundError:
+        return
+
+
+def read_checkpoint(path: str) -> Dict[str, Tuple]:
+    """回放所有帧，返回 game_id -> 最新的会话行（遇到删除标记时移除）"""
+    rows: Dict[str, Tuple] = {}
+    for frame in _read_frames(path):
+        for row in frame:
+            if len(row) == 1:
+                rows.pop(row[0], None)
+            else:
+                rows[row[0]] = row
+    return rows
+
+
+def row_last_active(row: Tuple) -> int:
+    """会话行的最后活动时间：创建时间加最后一条决策记录的相对秒数"""
+    history = row[5]
+    return row[4] + (history[-1][7] if history else 0)
+
+
+def _frame_bytes(rows: List[Tuple]) -> bytes:
+    payload = pickle.dumps(rows, protocol=PICKLE_PROTOCOL)
+    return _FRAME.pack(len(payload)) + payload
+
+
+class SessionCheckpointer:
+    """增量写入与恢复会话检查点"""
+
+    def __init__(self, service: GameSessionService = game_session_service,
+                 path: str = DEFAULT_CHECKPOINT_PATH):
+        self.service = service
+        self.path = os.path.abspath(path)
+        # 追加与压缩都在线程池中执行，用锁串行化对文件的修改
+        self._file_lock = threading.Lock()
+        self._snapshot_bytes = 0
+        self._appended_bytes = 0
+        self.last_report: Dict[str, Any] = {}
+
+    # ----- 写入 -----
+
+    def _write_snapshot(self, rows: List[Tuple]) -> None:
+        data = MAGIC + (_frame_bytes(rows) if rows else b"")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._snapshot_bytes = len(data)
+        self._appended_bytes = 0
+
+    def _append(self, rows: List[Tuple]) -> int:
+        frame = _frame_bytes(rows)
+        with self._file_lock:
+            if not os.path.exists(self.path):
+                self._write_snapshot(rows)
+                return len(frame)
+            with open(self.path, "ab") as f:
+                f.write(frame)
+                f.flush()
+                os.fsync(f.fileno())
+            self._appended_bytes += len(frame)
+            if self._appended_bytes > max(COMPACT_MIN_BYTES, COMPACT_RATIO * self._snapshot_bytes):
+                self._compact_locked()
+        return len(frame)
+
+    def _live_rows(self, rows: Dict[str, Tuple]) -> List[Tuple]:
+        cutoff = time.time() - self.service.idle_ttl
+        return [row for row in rows.values() if row_last_active(row) >= cutoff]
+
+    def _compact_locked(self) -> None:
+        rows = self._live_rows(read_checkpoint(self.path))
+        self._write_snapshot(rows)
+        logger.info("会话检查点已压缩", extra={"sessions": len(rows), "bytes": self._snapshot_bytes})
+
+    def compact(self) -> None:
+        with self._file_lock:
+            self._compact_locked()
+
+    async def checkpoint(self) -> Dict[str, Any]:
+        """移除空闲过期的会话，追加自上次检查点以来有变更的会话和过期会话的删除标记"""
+        self.service.expire_idle()
+        dirty, expired = self.service.dirty, self.service.expired
+        if not dirty and not expired:
+            return {"sessions": 0, "expired": 0, "bytes": 0}
+        ids, self.service.dirty = dirty, set()
+        self.service.expired = set()
+        sessions = self.service.sessions
+        # 编码在事件循环中完成，保证拿到的是一致的会话状态；序列化和写文件放到线程中
+        rows = [encode_session(sessions[game_id]) for game_id in ids if game_id in sessions]
+        rows.extend((game_id,) for game_id in expired)
+        started = time.perf_counter()
+        try:
+            written = await asyncio.to_thread(self._append, rows)
+        except Exception:
+            # 写入失败时保留脏标记和删除标记，下次重试
+            self.service.dirty |= ids
+            self.service.expired |= expired
+            raise
+        self.last_report = {
+            "sessions": len(rows) - len(expired),
+            "expired": len(expired),
+            "bytes": written,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        return self.last_report
+
+    # ----- 恢复 -----
+
+    async def restore(self, scenarios: Dict[str, Dict[str, Any]]) -> int:
+        """读取检查点并放回会话服务，随后重写为一份完整快照；场景已不存在或空闲过期的会话被丢弃"""
+        def load():
+            with self._file_lock:
+                live = [row for row in self._live_rows(read_checkpoint(self.path)) if row[1] in scenarios]
+                if os.path.exists(self.path):
+                    self._write_snapshot(live)
+                return live
+
+        rows = await asyncio.to_thread(load)
+        # 批量创建大量小对象时暂停分代回收，避免反复扫描刚恢复的会话
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for row in rows:
+                scenario = self.service.scenario_variant(scenarios[row[1]], row[2])
+                self.service.restore(decode_session(row, scenario))
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        logger.info("已从检查点恢复游戏会话", extra={"sessions": len(rows), "path": self.path})
+        return len(rows)
+
+
+# 全局实例
+session_checkpointer = SessionCheckpointer()
+
+
+async def run_session_checkpoints(interval: float = SESSION_CHECKPOINT_INTERVAL):
+    """后台任务：定期追加会话检查点"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await session_checkpointer.checkpoint()
+        except Exception as e:
+            logger.error(f"写入会话检查点失败: {e}")
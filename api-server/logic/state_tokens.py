@@ -0,0 +1,218 @@
+"""
+无状态会话令牌
+匿名游戏的完整状态（资源、满意度、声誉、知识、回合数、最近几次决策和决策计数）压缩后用 HMAC 签名，
+由客户端在每回合携带，服务端不保存会话。令牌带上会话的随机种子，同一令牌的回合结果确定，
+换用不同决策重放旧令牌则由 ReplayGuard 拒绝：每个令牌只能推进一个回合。
+默认的防重放登记只在本进程内有效，多工作进程部署需配置 SESSION_TOKEN_REPLAY_DB。
+令牌超过大小上限时会话转为服务端存储
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict
+
+from fastapi import HTTPException
+
+from utils.lru_cache import LRUCache
+
+try:
+    from .game_session_service import GameSessionRecord, SessionState, DecisionRecord, DecisionPatternTracker
+    from .delayed_effects import DelayedEffectQueue
+    from .thinking_traps import TrapCounters
+except ImportError:
+    from game_session_service import GameSessionRecord, SessionState, DecisionRecord, DecisionPatternTracker
+    from delayed_effects import DelayedEffectQueue
+    from thinking_traps import TrapCounters
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION = 1
+# 令牌字符数上限，超过后转为服务端会话
+SESSION_TOKEN_MAX_BYTES = int(os.getenv("SESSION_TOKEN_MAX_BYTES", "4096"))
+SESSION_TOKEN_TTL = int(os.getenv("SESSION_TOKEN_TTL", str(24 * 3600)))
+# 令牌中保留的最近决策数与追踪器下标数
+TOKEN_HISTORY = 8
+TOKEN_TRACKER_CODES = 16
+_SIGNATURE_BYTES = 16
+_MAX_PAYLOAD_BYTES = 64 * 1024
+
+_secret_env = os.getenv("SESSION_TOKEN_SECRET")
+if not _secret_env:
+    logger.warning("未设置 SESSION_TOKEN_SECRET，使用进程内随机密钥：令牌在重启后或其他实例上无效")
+_SECRET = (_secret_env or secrets.token_hex(32)).encode()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(data: bytes) -> bytes:
+    return hmac.new(_SECRET, data, hashlib.sha256).digest()[:_SIGNATURE_BYTES]
+
+
+def _invalid(message: str) -> HTTPException:
+    return HTTPException(status_code=401, detail=message)
+
+
+def encode_token(session: GameSessionRecord) -> str:
+    state = session.state
+    tracker = session.pattern_tracker
+    payload = {
+        "v": TOKEN_VERSION,
+        "g": session.game_id,
+        "s": session.scenario_id,
+        "d": session.difficulty,
+        "c": session.challenge_type,
+        "n": session.created_at,
+        "r": session.seed,
+        "i": int(time.time()),
+        "st": [state.satisfaction, state.resources, state.reputation, state.knowledge, state.turn_number],
+        "x": state.extra,
+        "h": [[r.turn_number, r.decisions, r.elapsed] for r in session.history[-TOKEN_HISTORY:]],
+        "p": session.detected_patterns,
+        "k": bytes(tracker.choices[-TOKEN_TRACKER_CODES:]).hex() if tracker is not None else "",
+        "q": bytes(tracker.consistency[-TOKEN_TRACKER_CODES:]).hex() if tracker is not None else "",
+        "e": session.effects.to_rows() if session.effects else [],
+        "a": session.trap_counters.to_row() if session.trap_counters is not None else None,
+    }
+    data = zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    return f"{_b64encode(data)}.{_b64encode(_sign(data))}"
+
+
+def decode_token(token: str, game_id: str,
+                 scenario_variant: Callable[[str, str], Dict[str, Any]]) -> GameSessionRecord:
+    """校验签名、会话ID和有效期并还原会话；scenario_variant(场景ID, 难度) 返回共享的场景变体"""
+    try:
+        body, signature = token.split(".", 1)
+        data, signature = _b64decode(body), _b64decode(signature)
+    except ValueError:
+        raise _invalid("会话令牌格式无效")
+    if not hmac.compare_digest(_sign(data), signature):
+        raise _invalid("会话令牌签名无效")
+    try:
+        payload = json.loads(zlib.decompressobj().decompress(data, _MAX_PAYLOAD_BYTES))
+    except (zlib.error, ValueError):
+        raise _invalid("会话令牌内容无效")
+    if payload.get("v") != TOKEN_VERSION or payload.get("g") != game_id:
+        raise _invalid("会话令牌与游戏会话不匹配")
+    if time.time() - payload["i"] > SESSION_TOKEN_TTL:
+        raise _invalid("会话令牌已过期")
+
+    # 令牌只带最近几次决策，不带当时的结果状态
+    history = [DecisionRecord(None, None, None, None, turn, decisions=decisions, elapsed=elapsed)
+               for turn, decisions, elapsed in payload["h"]]
+    tracker = DecisionPatternTracker()
+    tracker.choices.extend(bytes.fromhex(payload["k"]))
+    tracker.consistency.extend(bytes.fromhex(payload["q"]))
+    satisfaction, resources, reputation, knowledge, turn_number = payload["st"]
+    return GameSessionRecord(
+        game_id=game_id,
+        scenario_id=payload["s"],
+        difficulty=payload["d"],
+        challenge_type=payload["c"],
+        scenario=scenario_variant(payload["s"], payload["d"]),
+        state=SessionState(satisfaction, resources, reputation, knowledge, turn_number, payload["x"]),
+        history=history,
+        pattern_tracker=tracker,
+        detected_patterns=payload["p"],
+        created_at=payload["n"],
+        effects=DelayedEffectQueue(payload["e"]) if payload.get("e") else None,
+        seed=payload["r"],
+        trap_counters=TrapCounters.from_row(payload["a"]) if payload.get("a") else None,
+    )
+
+
+class ReplayGuard:
+    """
+    令牌防重放：每个令牌只能用来推进一个回合。claim 原子地登记"会话从第 turn 回合继续"，
+    已有相同或更新回合的登记时返回 409；同一令牌换用不同决策重放（在任何实例上）因此都会被拒绝。
+    本类把登记保存在进程内（条目有上限并随令牌有效期过期），保证只在单个工作进程内成立；
+    多进程或多实例部署需配置共享后端（SESSION_TOKEN_REPLAY_DB，见 SqliteReplayGuard）
+    """
+
+    def __init__(self, max_entries: int = 100_000, ttl: float = SESSION_TOKEN_TTL):
+        self._claimed = LRUCache(max_entries=max_entries, ttl=ttl)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stale(turn_number: int, claimed: int) -> HTTPException:
+        return HTTPException(status_code=409, detail=f"会话令牌已被使用（回合 {turn_number}，已推进到回合 {claimed + 1}）")
+
+    def claim(self, game_id: str, turn_number: int) -> None:
+        with self._lock:
+            claimed = self._claimed.get(game_id)
+            if claimed is not None and turn_number <= claimed:
+                raise self._stale(turn_number, claimed)
+            self._claimed.set(game_id, turn_number, size=0)
+
+    def release(self, game_id: str, turn_number: int) -> None:
+        """回合执行失败时撤销登记，客户端可用同一令牌重试"""
+        with self._lock:
+            if self._claimed.get(game_id) == turn_number:
+                self._claimed.delete(game_id)
+
+
+class SqliteReplayGuard(ReplayGuard):
+    """
+    以 SQLite 文件保存登记，同一主机（或共享卷）上的所有工作进程共用；
+    单连接 + 锁，调用方应通过 asyncio.to_thread 调用
+    """
+
+    _CLEANUP_EVERY = 1000
+
+    def __init__(self, db_path: str, ttl: float = SESSION_TOKEN_TTL):
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.ttl = ttl
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+        self._lock = threading.Lock()
+        self._claims = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS token_claims ("
+                "game_id TEXT PRIMARY KEY, turn INTEGER NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID")
+
+    def claim(self, game_id: str, turn_number: int) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            # 只有没有登记、登记已过期或登记回合更小时写入成功，判断与写入在同一条语句中完成
+            cursor = self._conn.execute(
+                "INSERT INTO token_claims VALUES (?, ?, ?) ON CONFLICT(game_id) DO UPDATE "
+                "SET turn = excluded.turn, expires_at = excluded.expires_at "
+                "WHERE token_claims.turn < excluded.turn OR token_claims.expires_at < ?",
+                (game_id, turn_number, now + self.ttl, now))
+            if cursor.rowcount == 0:
+                claimed = self._conn.execute(
+                    "SELECT turn FROM token_claims WHERE game_id = ?", (game_id,)).fetchone()[0]
+                raise self._stale(turn_number, claimed)
+            self._claims += 1
+            if self._claims % self._CLEANUP_EVERY == 0:
+                self._conn.execute("DELETE FROM token_claims WHERE expires_at < ?", (now,))
+
+    def release(self, game_id: str, turn_number: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM token_claims WHERE game_id = ? AND turn = ?", (game_id, turn_number))
+
+
+def create_replay_guard() -> ReplayGuard:
+    """配置了 SESSION_TOKEN_REPLAY_DB 时使用共享的 SQLite 登记，否则只在本进程内防重放"""
+    db_path = os.getenv("SESSION_TOKEN_REPLAY_DB")
+    if db_path:
+        return SqliteReplayGuard(db_path)
+    return ReplayGuard()
+
+
+replay_guard = create_replay_guard()
@@ -0,0 +1,63 @@
+"""
+单元测试：批量认知偏差检测
+批量结果应与逐条检测的 analyze_cognitive_bias_patterns 一致
+"""
+import sys
+import os
+import random
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from batch_bias_detection import analyze_bias_batch
+from enhanced_cognitive_bias_detection import analyze_cognitive_bias_patterns
+
+
+class TestBatchBiasDetection:
+    """测试批量认知偏差检测"""
+
+    def test_profile_matches_per_response_analysis(self):
+        """测试汇总结果与逐条分析一致"""
+        # Given
+        rng = random.Random(7)
+        rows = 500
+        estimations = [rng.uniform(0, 200) for _ in range(rows)]
+        actuals = [rng.choice([0, 50, 100, 150]) for _ in range(rows)]
+        confidence = [rng.uniform(0, 100) for _ in range(rows)]
+        accuracy = [rng.uniform(0, 100) for _ in range(rows)]
+        responses = [
+            {'user_estimation': e, 'actual_value': a, 'confidence_percentage': c, 'accuracy_percentage': x}
+            for e, a, c, x in zip(estimations, actuals, confidence, accuracy)
+        ]
+
+        # When
+        batch = analyze_bias_batch(estimations, actuals, confidence, accuracy)['profile_summary']
+        single = analyze_cognitive_bias_patterns(responses)['profile_summary']
+
+        # Then
+        assert batch['total_biases_detected'] == single['total_biases_detected']
+        assert batch['total_biases_analyzed'] == single['total_biases_analyzed']
+        assert batch['bias_strength_distribution'] == single['bias_strength_distribution']
+        assert batch['strongest_bias'] == single['strongest_bias']
+        assert abs(batch['average_confidence_score'] - single['average_confidence_score']) < 1e-9
+
+    def test_only_returned_rows_are_rendered(self):
+        """测试只为返回的行生成解释，并按置信度排序"""
+        # When
+        result = analyze_bias_batch([1, 100, 0, 1000], [100, 100, 5, 100], limit=2)
+
+        # Then
+        rows = result['individual_results']
+        assert len(rows) == 2
+        assert rows[0]['row'] == 3
+        assert rows[0]['strength_level'] == "severe"
+        assert rows[0]['confidence_score'] >= rows[1]['confidence_score']
+        assert all('explanation' in r for r in rows)
+
+    def test_mismatched_columns(self):
+        """测试列长度不一致"""
+        try:
+            analyze_bias_batch([1, 2], [1])
+            assert False, "应当抛出ValueError"
+        except ValueError:
+            pass
@@ -0,0 +1,62 @@
+"""
+单元测试：大数数值核心
+"""
+import sys
+import os
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from big_number import (
+    power_log10,
+    format_scientific,
+    relative_error,
+    magnitude_gap,
+    approximate_value
+)
+from cognitive_bias_analysis import analyze_exponential_misconception
+
+
+class TestBigNumber:
+    """测试 log10 空间的大数运算"""
+
+    def test_format_scientific_matches_float_format(self):
+        """测试科学计数法与 '%.2e' 输出一致"""
+        for base, power in [(2, 200), (2, 20), (10, 2), (9.99, 1), (5, 11)]:
+            assert format_scientific(power_log10(base, power)) == '%.2e' % (base ** power)
+
+    def test_format_scientific_beyond_float_range(self):
+        """测试超出 float 范围的数量级"""
+        assert format_scientific(power_log10(1000, 1000)) == "1.00e+3000"
+        assert approximate_value(power_log10(1000, 1000)) is None
+
+    def test_relative_error(self):
+        """测试相对误差与直接计算一致"""
+        actual = 2 ** 20
+        expected = abs(1e6 - actual) / actual
+        assert abs(relative_error(1e6, power_log10(2, 20)) - expected) < 1e-9
+        assert relative_error(0, power_log10(2, 200)) == 1.0
+        assert relative_error(10 ** 400, 2.0) == float("inf")
+
+    def test_magnitude_gap(self):
+        """测试数量级差"""
+        assert abs(magnitude_gap(1e15, power_log10(2, 200)) - (15 - 200 * 0.30103)) < 1e-3
+        assert magnitude_gap(-1, 10.0) == float("-inf")
+
+    def test_exponential_misconception_without_exact_value(self):
+        """测试 1000^1000 默认不构造精确整数"""
+        # When
+        result = analyze_exponential_misconception(1e15, 1000, 1000)
+
+        # Then
+        assert result['actual_value'] is None
+        assert result['actual_value_scientific'] == "1.00e+3000"
+        assert result['exact'] is False
+        assert result['bias_direction'] == "极度低估"
+        assert result['error_ratio'] == 1.0
+
+    def test_exponential_misconception_exact_on_request(self):
+        """测试显式请求时返回精确值"""
+        result = analyze_exponential_misconception(1e15, 2, 200, exact=True)
+        assert result['actual_value'] == 2 ** 200
+        assert result['exact'] is True
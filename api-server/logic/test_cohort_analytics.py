@@ -0,0 +1,82 @@
+"""
+单元测试：群体决策分析
+"""
+import sys
+import os
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cohort_analytics import CohortAnalytics, PATTERN_AGGRESSIVE, PATTERN_CONSERVATIVE, PATTERN_HIGH_INVESTMENT
+from results_store import ResultsStore, make_decision_row
+
+
+def _store_with_decisions():
+    store = ResultsStore(":memory:")
+    plays = {
+        ("g1", "game-001"): ["1", "1", "3"],
+        ("g2", "game-001"): ["2", "4"],
+        ("g3", "coffee-shop-linear-thinking"): ["hire_staff", "marketing"],
+        ("g4", "game-001"): ["3"],
+    }
+    rows = []
+    for (session_id, scenario_id), choices in plays.items():
+        for turn, choice in enumerate(choices, start=1):
+            decision = {"action": choice, "amount": 8} if "coffee" in scenario_id else {"option": choice}
+            rows.append(make_decision_row(session_id, scenario_id, "beginner", turn, decision,
+                                          {"resources": 100 * turn, "satisfaction": 50, "reputation": 50}))
+    store.add_decisions(rows)
+    return store
+
+
+class TestCohortAnalytics:
+    """测试列式群体分析"""
+
+    def test_incremental_refresh(self):
+        """测试增量刷新只追加新决策"""
+        # Given
+        store = _store_with_decisions()
+        engine = CohortAnalytics()
+
+        # When
+        first = engine.refresh(store.decisions_after, chunk=3)
+        store.add_decisions([make_decision_row("g5", "game-002", "advanced", 1, {"option": "1"}, {})])
+        second = engine.refresh(store.decisions_after)
+
+        # Then
+        assert (first, second) == (8, 1)
+        summary = engine.summary()
+        assert summary["total_decisions"] == 9
+        assert summary["total_sessions"] == 5
+        assert summary["as_of_decision_id"] == 9
+
+    def test_choice_distribution_by_turn(self):
+        """测试按回合统计选项分布"""
+        engine = CohortAnalytics()
+        engine.refresh(_store_with_decisions().decisions_after)
+
+        result = engine.choice_distribution(scenario_id="game-001")
+
+        turn_one = result["groups"][0]
+        assert turn_one["turn"] == 1
+        assert turn_one["total"] == 3
+        assert {c["choice"]: c["count"] for c in turn_one["choices"]} == {"1": 1, "2": 1, "3": 1}
+        assert engine.choice_distribution(scenario_id="unknown")["groups"] == []
+
+    def test_pattern_prevalence_and_outcomes(self):
+        """测试模式流行度（与 detect_decision_pattern 一致）与最终状态分布"""
+        # Given
+        engine = CohortAnalytics()
+        engine.refresh(_store_with_decisions().decisions_after)
+
+        # When
+        patterns = {p["pattern_type"]: p["sessions"] for p in engine.pattern_prevalence()["patterns"]}
+        outcomes = engine.outcome_distribution("resources", scenario_id="game-001")
+
+        # Then
+        assert patterns[PATTERN_AGGRESSIVE] == 1
+        assert patterns[PATTERN_CONSERVATIVE] == 1
+        assert patterns[PATTERN_HIGH_INVESTMENT] == 1
+        assert outcomes["sessions"] == 3
+        assert outcomes["percentiles"]["p50"] == 200.0
+        assert outcomes["mean"] == 200.0
@@ -0,0 +1,66 @@
+"""
+单元测试：计算任务执行器
+"""
+import sys
+import os
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+import time
+
+from utils.compute_executor import ComputeExecutor
+from utils.error_handlers import CustomException
+
+
+def slow_echo(value, delay):
+    time.sleep(delay)
+    return value
+
+
+async def run_pooled(executor, value, delay, timeout):
+    try:
+        return await executor.run(slow_echo, value, delay, cost=10, timeout=timeout)
+    except CustomException as e:
+        return e.error_code
+
+
+class TestComputeExecutor:
+    """测试计算任务执行器"""
+
+    def test_timeout_does_not_fail_other_requests(self):
+        """测试一个池任务超时不影响同时运行的其他任务"""
+        # Given
+        executor = ComputeExecutor(max_workers=2, inline_cost_limit=0)
+
+        async def scenario():
+            return await asyncio.gather(run_pooled(executor, "slow", 1.0, 0.2),
+                                        run_pooled(executor, "ok", 0.4, 5))
+
+        # When
+        try:
+            results = asyncio.run(scenario())
+        finally:
+            executor.shutdown()
+
+        # Then
+        assert results == ["COMPUTE_TIMEOUT", "ok"]
+
+    def test_waiting_for_worker_not_counted_in_timeout(self):
+        """测试排队等待工作进程的时间不计入超时"""
+        # Given: 只有一个工作进程，第二个请求需要等第一个完成
+        executor = ComputeExecutor(max_workers=1, inline_cost_limit=0)
+
+        async def scenario():
+            return await asyncio.gather(run_pooled(executor, "first", 0.4, 5),
+                                        run_pooled(executor, "second", 0.05, 0.3))
+
+        # When
+        try:
+            results = asyncio.run(scenario())
+        finally:
+            executor.shutdown()
+
+        # Then
+        assert results == ["first", "second"]
@@ -0,0 +1,98 @@
+"""
+单元测试：反事实推演
+"""
+import sys
+import os
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from counterfactual import what_if, fork_session
+from game_session_service import GameSessionService, turn_rng
+
+SCENARIO = {"id": "game-003", "name": "投资", "description": "基础", "difficulty": "beginner"}
+
+
+def invest(scenario_id, state, decisions, difficulty="beginner", rng=None, effects=None):
+    """选项 3 为随机收益，选项 4 两回合后带来一次延迟收益"""
+    new_state = dict(state)
+    option = decisions.get("option")
+    if option == "3":
+        new_state["resources"] = int(new_state["resources"] * (1 + rng.uniform(-0.3, 0.5)))
+    elif option == "4":
+        effects.schedule("resources", 100, due_turn=state["turn_number"] + 2)
+    else:
+        new_state["resources"] += 10
+    return new_state
+
+
+def play(service, options):
+    session = service.create(SCENARIO)
+    for option in options:
+        service.advance(session, {"option": option}, invest,
+                        rng=turn_rng(session.seed, session.state.turn_number),
+                        effects=service.effects_for(session))
+    return session
+
+
+class TestCounterfactual:
+    """测试反事实推演"""
+
+    def test_same_decisions_reproduce_trajectory(self):
+        """测试换用原决策时，含随机选项和延迟效果的轨迹完全相同"""
+        # Given
+        service = GameSessionService()
+        session = play(service, ["3", "4", "3", "1", "3"])
+
+        # When
+        result = what_if(service, session, 3, [{"option": "3"}], invest)
+
+        # Then
+        assert [entry["state"] for entry in result["counterfactual"]] == \
+               [entry["state"] for entry in result["original"]]
+        assert all(not any(row["delta"].values()) for row in result["divergence"])
+
+    def test_alternative_diverges_without_touching_session(self):
+        """测试替代决策产生分叉轨迹，原会话不受影响"""
+        # Given
+        service = GameSessionService()
+        session = play(service, ["1", "4", "1", "1"])
+        before = session.state.as_dict()
+        service.dirty.clear()
+
+        # When
+        result = what_if(service, session, 2, [{"option": "1"}], invest)
+
+        # Then
+        assert result["fork_turn"] == 2
+        assert [entry["turn"] for entry in result["counterfactual"]] == [2, 3, 4]
+        # 原对局第 2 回合的延迟收益（第 4 回合兑现）在反事实中不存在
+        assert result["final"]["delta"]["resources"] == 10 - 100
+        assert session.state.as_dict() == before
+        assert len(session.history) == 4
+        # 推演不会让原会话重新写入检查点
+        assert session.game_id not in service.dirty
+
+    def test_fork_restores_pending_effects(self):
+        """测试分叉点恢复当时尚未兑现的延迟效果"""
+        # Given
+        service = GameSessionService()
+        session = play(service, ["4", "1", "1"])
+
+        # When
+        fork = fork_session(session, 2)
+
+        # Then
+        assert fork.state.turn_number == 2
+        assert [effect["due_turn"] for effect in fork.effects.pending()] == [3]
+        assert fork.game_id != session.game_id and service.get(fork.game_id) is None
+
+    def test_invalid_turn_rejected(self):
+        """测试回合超出范围时抛出 ValueError"""
+        service = GameSessionService()
+        session = play(service, ["1"])
+
+        with pytest.raises(ValueError):
+            what_if(service, session, 5, [{"option": "1"}], invest)
@@ -0,0 +1,106 @@
+"""
+单元测试：延迟效果调度
+"""
+import sys
+import os
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from delayed_effects import DelayedEffectQueue, DECAY, COMPOUND
+from game_session_service import GameSessionService
+from session_checkpoint import encode_session, decode_session
+
+SCENARIO = {"id": "relationship-time-delay", "name": "关系", "description": "基础", "difficulty": "beginner"}
+
+
+def invest(scenario_id, state, decisions, difficulty="beginner", effects=None):
+    new_state = dict(state)
+    if decisions.get("invest"):
+        effects.schedule("satisfaction", 10, due_turn=state["turn_number"] + 2, source="沟通投入")
+    return new_state
+
+
+class TestDelayedEffects:
+    """测试延迟效果调度"""
+
+    def test_effects_apply_in_due_order(self):
+        """测试只应用已到期的效果，并按到期回合和登记顺序出堆"""
+        # Given
+        queue = DelayedEffectQueue()
+        queue.schedule("resources", 30, due_turn=5, source="c")
+        queue.schedule("resources", 10, due_turn=3, source="a")
+        queue.schedule("resources", 20, due_turn=3, source="b")
+        state = {"resources": 100}
+
+        # When
+        early = queue.apply_due(state, 2)
+        applied = queue.apply_due(state, 4)
+
+        # Then
+        assert early == []
+        assert [effect["source"] for effect in applied] == ["a", "b"]
+        assert state["resources"] == 130
+        assert len(queue) == 1
+
+    def test_decay_and_compound_kernels(self):
+        """测试衰减与复利核函数按回合更新数值"""
+        # Given
+        queue = DelayedEffectQueue()
+        queue.schedule("knowledge", 8, due_turn=1, kernel=DECAY, rate=0.5, repeats=3)
+        queue.schedule("resources", 100, due_turn=1, kernel=COMPOUND, rate=0.1, repeats=3, period=2)
+        state = {"knowledge": 0, "resources": 0}
+
+        # When
+        per_turn = [[(e["target"], e["amount"]) for e in queue.apply_due(state, turn)] for turn in range(1, 7)]
+
+        # Then
+        assert per_turn == [
+            [("knowledge", 8), ("resources", 100)],
+            [("knowledge", 4.0)],
+            [("resources", 110.0), ("knowledge", 2.0)],
+            [],
+            [("resources", 121.0)],
+            [],
+        ]
+        assert state == {"knowledge": 14.0, "resources": pytest.approx(331)}
+        assert len(queue) == 0
+
+    def test_bounded_fields_clamped_and_catch_up(self):
+        """测试 0-100 字段被截断，跳过的回合一次补齐"""
+        # Given
+        queue = DelayedEffectQueue()
+        queue.schedule("satisfaction", 30, due_turn=2, repeats=3)
+        state = {"satisfaction": 50}
+
+        # When
+        applied = queue.apply_due(state, 10)
+
+        # Then
+        assert [effect["turn"] for effect in applied] == [2, 3, 4]
+        assert state["satisfaction"] == 100
+
+    def test_invalid_kernel_rejected(self):
+        """测试未知核函数抛出 ValueError"""
+        with pytest.raises(ValueError):
+            DelayedEffectQueue().schedule("satisfaction", 1, due_turn=2, kernel="linear")
+
+    def test_session_advance_applies_and_checkpoints_effects(self):
+        """测试会话推进时兑现到期效果，未到期效果随检查点保存"""
+        # Given
+        service = GameSessionService()
+        session = service.create(SCENARIO)
+        effects = service.effects_for(session)
+
+        # When
+        service.advance(session, {"invest": True}, invest, effects=effects)
+        service.advance(session, {"invest": True}, invest, effects=effects)
+        restored = decode_session(encode_session(session), SCENARIO)
+
+        # Then
+        assert session.state.satisfaction == 60
+        assert effects.last_applied[0]["source"] == "沟通投入"
+        assert [e["due_turn"] for e in service.state_view(session)["pending_effects"]] == [4]
+        assert restored.effects.pending() == effects.pending()
@@ -0,0 +1,87 @@
+"""
+单元测试：回合反馈模板
+"""
+import sys
+import os
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from feedback_templates import FeedbackCatalog, feedback_catalog, feedback_slots
+
+COFFEE = "coffee-shop-nonlinear-effects"
+OLD_STATE = {"satisfaction": 50, "resources": 1000, "reputation": 50, "knowledge": 0}
+
+
+def render(scenario_id, difficulty, decisions, phase="result", **changes):
+    new_state = dict(OLD_STATE, **changes)
+    slots = feedback_slots(decisions, OLD_STATE, new_state)
+    return feedback_catalog.render(scenario_id, difficulty, decisions, phase, slots)
+
+
+def minimal_catalog(templates):
+    return {
+        "default_bucket": {"field": "satisfaction_change", "rules": [["up", ">", 0], ["flat"]]},
+        "scenarios": {"s": {"buckets": {"hire": {"field": "amount", "rules": [["high", ">", 3], ["low"]]}}}},
+        "templates": templates,
+        "sections": {name: "" for name in ("pattern_analysis", "next_steps", "regret",
+                                           "delayed_effects", "delayed_effect_item")},
+    }
+
+
+class TestFeedbackTemplates:
+    """测试反馈模板目录"""
+
+    def test_amount_bucket_and_difficulty(self):
+        """测试按投入档位和难度选择文案"""
+        # When
+        low = render(COFFEE, "beginner", {"action": "hire_staff", "amount": 2})
+        high = render(COFFEE, "advanced", {"action": "hire_staff", "amount": 7})
+
+        # Then
+        assert low == "合理的员工配置提升了客户满意度。"
+        assert high.startswith("您雇佣了过多员工") and "连锁故障" in high
+
+    def test_specific_template_overrides_wildcard(self):
+        """测试指定字段更多的模板覆盖通配模板"""
+        # When
+        advanced = render(COFFEE, "advanced", {"action": "supply_chain", "amount": 150})
+        intermediate = render(COFFEE, "intermediate", {"action": "supply_chain", "amount": 150})
+
+        # Then
+        assert advanced.startswith("庞大的供应链投资")
+        assert intermediate.startswith("供应链管理体现了复杂系统思维")
+
+    def test_fallback_uses_change_bucket_and_fragment(self):
+        """测试未登记的场景或决策退回通用模板，按满意度变化分档并替换难度片段"""
+        # When
+        unknown_scenario = render("unknown", "intermediate", {}, satisfaction=70)
+        unknown_action = render(COFFEE, "beginner", {"action": "supply_chain"}, satisfaction=45)
+
+        # Then
+        assert unknown_scenario == "您的决策取得了显著成效！ 在中级挑战中，您开始接触时间价值和复利思维的概念。"
+        assert unknown_action == "决策已执行，正在观察效果。"
+
+    def test_slots_filled_with_format_spec(self):
+        """测试困惑反馈填入槽位并按格式输出"""
+        # When
+        coffee = render(COFFEE, "beginner", {"action": "hire_staff", "amount": 2}, phase="turn-1", satisfaction=60)
+        default = render("game-002", "beginner", {"option": "2"}, phase="turn-2", resources=900)
+
+        # Then
+        assert "投入2人 → +10点满意度" in coffee
+        assert "每人带来5点提升" in coffee
+        assert "资源: 1000 → 900 (-100)" in default
+
+    def test_invalid_catalog_rejected(self):
+        """测试未知槽位、未知档位和同特异度冲突在加载时报错"""
+        bad_catalogs = [
+            [{"text": "{missing}"}],
+            [{"scenario": "s", "action": "hire", "bucket": "huge", "text": "x"}],
+            [{"scenario": "s", "action": "hire", "text": "a"}, {"scenario": "s", "action": "hire", "text": "b"}],
+        ]
+        for templates in bad_catalogs:
+            with pytest.raises(ValueError):
+                FeedbackCatalog(minimal_catalog(templates))
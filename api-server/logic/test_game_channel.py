@@ -0,0 +1,141 @@
+"""
+单元测试：游戏回合 WebSocket 通道
+"""
+import sys
+import os
+import time
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+
+from game_channel import serve_game_channel, ChannelRegistry
+from game_session_service import GameSessionService
+
+SCENARIO = {"id": "coffee-shop-nonlinear-effects", "name": "咖啡店", "description": "基础", "difficulty": "beginner"}
+
+
+def hire_staff(scenario_id, state, decisions, difficulty="beginner"):
+    new_state = dict(state)
+    new_state["satisfaction"] += decisions.get("amount", 0)
+    return new_state
+
+
+def make_app(service, registry, lookups, heartbeat_interval=20.0, idle_timeout=60.0):
+    app = FastAPI()
+
+    def get_session(game_id):
+        lookups.append(game_id)
+        return service.get(game_id)
+
+    async def play_turn(session, decisions):
+        _, new_state = service.advance(session, decisions, hire_staff)
+        if decisions.get("fail"):
+            raise RuntimeError("boom")
+        return {"success": True, "turnNumber": new_state["turn_number"], "feedback": "ok"}
+
+    @app.websocket("/ws/games/{game_id}")
+    async def channel(websocket: WebSocket, game_id: str, resume_from: int = None):
+        await serve_game_channel(websocket, game_id, get_session, play_turn, service.state_view,
+                                 resume_from=resume_from, heartbeat_interval=heartbeat_interval,
+                                 idle_timeout=idle_timeout, registry=registry)
+
+    return app
+
+
+class TestGameChannel:
+    """测试游戏回合 WebSocket 通道"""
+
+    def test_turns_stream_over_one_connection(self):
+        """测试会话只在连接时解析一次，多个回合在同一连接上往返"""
+        # Given
+        service, lookups = GameSessionService(), []
+        session = service.create(SCENARIO)
+        client = TestClient(make_app(service, ChannelRegistry(), lookups))
+
+        # When
+        with client.websocket_connect(f"/ws/games/{session.game_id}") as ws:
+            hello = ws.receive_json()
+            replies = []
+            for seq in range(3):
+                ws.send_json({"type": "turn", "seq": seq, "decisions": {"amount": 5}})
+                replies.append(ws.receive_json())
+
+        # Then
+        assert hello["type"] == "session" and hello["turnNumber"] == 1
+        assert [r["turnNumber"] for r in replies] == [2, 3, 4]
+        assert [r["seq"] for r in replies] == [0, 1, 2]
+        assert session.state.satisfaction == 65
+        assert lookups == [session.game_id]
+
+    def test_errors_keep_connection_open(self):
+        """测试无效消息、失败的回合返回错误消息，连接继续可用"""
+        # Given
+        service = GameSessionService()
+        session = service.create(SCENARIO)
+        client = TestClient(make_app(service, ChannelRegistry(), []))
+
+        # When
+        with client.websocket_connect(f"/ws/games/{session.game_id}") as ws:
+            ws.receive_json()
+            ws.send_json({"type": "turn", "decisions": "oops"})
+            bad = ws.receive_json()
+            ws.send_json({"type": "turn", "seq": 9, "decisions": {"fail": True}})
+            failed = ws.receive_json()
+            ws.send_json({"type": "ping", "seq": 10})
+            pong = ws.receive_json()
+
+        # Then
+        assert bad["error"]["error_code"] == "BAD_MESSAGE"
+        assert failed["error"]["error_code"] == "TURN_FAILED" and failed["seq"] == 9
+        assert pong["type"] == "pong" and pong["seq"] == 10
+
+    def test_unknown_session_closed(self):
+        """测试会话不存在时返回错误并关闭连接"""
+        client = TestClient(make_app(GameSessionService(), ChannelRegistry(), []))
+
+        with client.websocket_connect("/ws/games/missing") as ws:
+            message = ws.receive_json()
+
+        assert message["error"]["error_code"] == "SESSION_NOT_FOUND"
+
+    def test_reconnect_resumes_missed_result(self):
+        """测试重连时补发断线前最后一个未确认的回合结果"""
+        # Given
+        service, registry = GameSessionService(), ChannelRegistry()
+        session = service.create(SCENARIO)
+        client = TestClient(make_app(service, registry, []))
+        with client.websocket_connect(f"/ws/games/{session.game_id}") as ws:
+            ws.receive_json()
+            ws.send_json({"type": "turn", "decisions": {"amount": 1}})
+            ws.receive_json()
+
+        # When
+        with client.websocket_connect(f"/ws/games/{session.game_id}?resume_from=1") as ws:
+            hello = ws.receive_json()
+            resumed = ws.receive_json()
+
+        # Then
+        assert hello["turnNumber"] == 2
+        assert resumed["type"] == "turn_result" and resumed["resumed"] is True
+        assert resumed["turnNumber"] == 2
+        assert registry.missed(session.game_id, 2) is None
+        assert session.game_id not in registry.connections
+
+    def test_heartbeat_sent_when_idle(self):
+        """测试空闲时服务端发送心跳"""
+        # Given
+        service = GameSessionService()
+        session = service.create(SCENARIO)
+        client = TestClient(make_app(service, ChannelRegistry(), [], heartbeat_interval=0.05))
+
+        # When
+        with client.websocket_connect(f"/ws/games/{session.game_id}") as ws:
+            ws.receive_json()
+            time.sleep(0.1)
+            message = ws.receive_json()
+
+        # Then
+        assert message["type"] == "heartbeat"
@@ -0,0 +1,168 @@
+"""
+单元测试：游戏会话服务
+"""
+import sys
+import os
+import tracemalloc
+from datetime import datetime
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from game_session_service import GameSessionService, SessionState, select_scenario_variant
+
+SCENARIO = {
+    "id": "coffee-shop-nonlinear-effects",
+    "name": "咖啡店",
+    "description": "基础",
+    "difficulty": "beginner",
+    "advancedChallenges": [
+        {"title": "扩张", "description": "进阶", "difficulty": "intermediate", "decisionPatterns": ["线性外推"]},
+    ],
+}
+
+
+def add_staff(scenario_id, state, decisions, difficulty="beginner"):
+    new_state = dict(state)
+    new_state["satisfaction"] += decisions.get("amount", 0)
+    new_state["relationship_investment"] = 1.5
+    return new_state
+
+
+
+def hire_staff(scenario_id, state, decisions, difficulty="beginner"):
+    new_state = dict(state)
+    new_state["satisfaction"] = min(100, new_state["satisfaction"] + decisions["amount"])
+    new_state["resources"] -= 300
+    return new_state
+
+
+def legacy_sessions(count, turns):
+    """改造前的会话结构：场景副本、状态字典、每回合复制状态与历史列表、字符串标签"""
+    sessions = {}
+    for i in range(count):
+        state = {"resources": 1000, "satisfaction": 50, "reputation": 50, "knowledge": 0, "turn_number": 1,
+                 "difficulty": "beginner", "challenge_type": "base", "decision_history": [], "detected_biases": [],
+                 "user_patterns": {"risk_preference": None, "pace_preference": None, "decision_style": None}}
+        tracker = {"risk_preference": [], "pace_preference": [], "information_style": [],
+                   "decision_consistency": [], "overconfidence_signals": []}
+        session = sessions[f"session_{i}"] = {
+            "session_id": f"session_{i}", "scenario_id": SCENARIO["id"], "scenario": SCENARIO.copy(), "turn": 1,
+            "game_state": state, "created_at": datetime.now().isoformat(), "history": [],
+            "difficulty": "beginner", "pattern_tracker": tracker, "decision_count": 0,
+        }
+        for turn in range(turns):
+            decisions = {"option": str(turn % 4 + 1), "amount": 1}
+            tracker["risk_preference"].append("激进")
+            tracker["pace_preference"].append("立即")
+            current = session["game_state"].copy()
+            new_state = hire_staff(SCENARIO["id"], current, decisions)
+            new_state["turn_number"] = current["turn_number"] + 1
+            record = {"turn": current["turn_number"], "decisions": decisions, "result_state": new_state.copy(),
+                      "difficulty": "beginner", "timestamp": datetime.now().isoformat()}
+            new_state["decision_history"] = current["decision_history"] + [record]
+            session["game_state"] = new_state
+            session["turn"] += 1
+            session["decision_count"] += 1
+            session["history"].append(record)
+    return sessions
+
+
+def service_sessions(count, turns):
+    service = GameSessionService()
+    for _ in range(count):
+        session = service.create(SCENARIO, pattern_tracker=bytearray())
+        for turn in range(turns):
+            service.advance(session, {"option": str(turn % 4 + 1), "amount": 1}, hire_staff)
+            session.pattern_tracker.append(0)
+    return service
+
+
+def traced_bytes(build, *args):
+    tracemalloc.start()
+    try:
+        keep = build(*args)
+        return tracemalloc.get_traced_memory()[0], keep
+    finally:
+        tracemalloc.stop()
+
+
+class TestGameSessionService:
+    """测试游戏会话服务"""
+
+    def test_create_uses_typed_state(self):
+        """测试创建会话时使用 slots 状态、共享场景并解析 auto 难度"""
+        # Given
+        service = GameSessionService()
+
+        # When
+        session = service.create(SCENARIO, "auto")
+
+        # Then
+        assert service.get(session.game_id) is session
+        assert isinstance(session.state, SessionState)
+        assert session.scenario is SCENARIO
+        assert session.difficulty == "beginner"
+        assert service.state_view(session)["challenge_type"] == "base"
+
+    def test_advanced_challenge_variant(self):
+        """测试指定难度时套用匹配的高级挑战"""
+        # When
+        selected, difficulty, challenge_type = select_scenario_variant(SCENARIO, "intermediate")
+
+        # Then
+        assert difficulty == "intermediate"
+        assert challenge_type == "advanced"
+        assert selected["name"] == "咖啡店 - 扩张"
+        assert SCENARIO["name"] == "咖啡店"
+
+    def test_invalid_difficulty_rejected(self):
+        """测试无效难度抛出 ValueError"""
+        with pytest.raises(ValueError):
+            GameSessionService().create(SCENARIO, "impossible")
+
+    def test_advance_appends_history(self):
+        """测试回合推进状态、追加历史并保留场景专属字段"""
+        # Given
+        service = GameSessionService()
+        session = service.create(SCENARIO)
+
+        # When
+        before, after = service.advance(session, {"amount": 5}, add_staff)
+        service.advance(session, {"amount": 5}, add_staff)
+
+        # Then
+        assert before["turn_number"] == 1 and after["turn_number"] == 2
+        assert session.state.turn_number == 3
+        assert session.state.satisfaction == 60
+        assert session.state is session.history[-1]
+        view = service.state_view(session)
+        assert view["relationship_investment"] == 1.5
+        assert [record["turn"] for record in view["decision_history"]] == [1, 2]
+        assert view["decision_history"][0]["result_state"]["satisfaction"] == 55
+
+    def test_identical_decisions_shared(self):
+        """测试不同会话中相同的决策共享同一个字典"""
+        # Given
+        service = GameSessionService()
+        first, second = service.create(SCENARIO), service.create(SCENARIO)
+
+        # When
+        service.advance(first, {"option": "1"}, add_staff)
+        service.advance(second, {"option": "1"}, add_staff)
+        service.advance(second, {"option": ["1", "2"]}, add_staff)
+
+        # Then
+        assert first.history[0].decisions is second.history[0].decisions
+        assert second.history[1].decisions == {"option": ["1", "2"]}
+
+    def test_memory_per_session_benchmark(self):
+        """内存基准：每个活跃会话（10 回合）占用字节数至少降为改造前的 1/5"""
+        # When
+        legacy_bytes, _ = traced_bytes(legacy_sessions, 300, 10)
+        service_bytes, _ = traced_bytes(service_sessions, 300, 10)
+
+        # Then
+        assert legacy_bytes / service_bytes >= 5, (legacy_bytes / 300, service_bytes / 300)
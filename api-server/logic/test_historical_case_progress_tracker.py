@@ -0,0 +1,74 @@
+"""
+单元测试：历史案例进度追踪
+"""
+import sys
+import os
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from historical_case_progress_tracker import HistoricalCaseProgressTracker
+
+
+class TestHistoricalCaseProgressTracker:
+    """测试进度追踪的缓存、批量写入与案例分析"""
+
+    def test_decisions_are_batched_until_flush(self, tmp_path):
+        """测试决策只更新缓存，flush 后才落库且可重新加载"""
+        # Given
+        db_path = str(tmp_path / "progress.db")
+        tracker = HistoricalCaseProgressTracker(db_path)
+
+        # When
+        tracker.record_user_decision("u1", "hist-001", 0, 1)
+        tracker.record_user_decision("u1", "hist-001", 1, 0)
+        before_flush = tracker._fetch("SELECT COUNT(*) AS n FROM historical_selections")[0]["n"]
+        written = tracker.flush()
+        tracker.close()
+        reopened = HistoricalCaseProgressTracker(db_path)
+
+        # Then
+        assert before_flush == 0
+        assert written == 4  # 1 条进度 + 1 条交互 + 2 条选择
+        interaction = reopened.get_case_interaction("u1", "hist-001")
+        assert interaction.current_step == 2
+        assert [s["option_index"] for s in interaction.selected_options] == [1, 0]
+        assert reopened.get_user_progress("u1").in_progress_cases[0]["current_step"] == 2
+        reopened.close()
+
+    def test_case_analytics_from_selections(self):
+        """测试案例分析按真实选择聚合"""
+        # Given
+        tracker = HistoricalCaseProgressTracker(":memory:")
+        for user, option in (("u1", 0), ("u2", 0), ("u3", 1)):
+            tracker.record_user_decision(user, "hist-001", 0, option)
+        tracker.complete_case_interaction("u1", "hist-001", rating=4)
+
+        # When
+        analytics = tracker.get_case_analytics("hist-001")
+
+        # Then
+        assert analytics.total_attempts == 3
+        assert analytics.completion_rate == round(1 / 3, 4)
+        assert analytics.most_common_selections[0] == {"step": 0, "option_index": 0, "count": 2, "percentage": 66.67}
+        assert analytics.average_rating == 4.0
+        assert analytics.feedback_count == 1
+        assert tracker.get_user_summary("u1").total_cases_completed == 1
+
+    def test_cache_is_bounded_without_losing_unflushed_changes(self, tmp_path):
+        """测试读穿缓存按容量淘汰，未刷新的修改不受淘汰影响"""
+        # Given
+        tracker = HistoricalCaseProgressTracker(str(tmp_path / "progress.db"), max_progress=2, max_interactions=2)
+
+        # When
+        for user in ("u1", "u2", "u3", "u4"):
+            tracker.record_user_decision(user, "hist-001", 0, 1)
+        written = tracker.flush()
+        for user in ("u1", "u2", "u3", "u4"):
+            tracker.get_user_progress(user)
+
+        # Then
+        assert written == 12
+        assert len(tracker.progress_cache) == 2
+        assert tracker.get_case_interaction("u1", "hist-001").current_step == 1
+        tracker.close()
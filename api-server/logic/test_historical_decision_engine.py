@@ -0,0 +1,88 @@
+"""
+单元测试：历史案例决策引擎
+"""
+import sys
+import os
+import time
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from historical_decision_engine import HistoricalCaseDecisionEngine
+
+CASE = {
+    "scenarioId": "hist-test",
+    "title": "航天安全决策",
+    "description": "测试案例",
+    "decisionPoints": [
+        {"step": 1, "situation": "低温预报", "options": ["推迟发射", "按计划发射"]},
+        {"step": 2, "situation": "工程师警告", "options": ["补充测试", "要求书面保证", "忽略担忧"]},
+    ],
+    "actualOutcomes": ["按计划发射", "O型环失效"],
+    "alternativeOptions": ["推迟发射"],
+    "lessons": ["时间压力影响了风险评估", "过度自信导致忽视警告"],
+    "pyramidAnalysis": {"coreConclusion": "c", "supportingArguments": [], "examples": [], "actionableAdvice": []},
+}
+
+
+class TestHistoricalDecisionEngine:
+    """测试编译后的历史案例引擎"""
+
+    def test_compile_precomputes_feedback(self):
+        """测试加载时预先生成反馈、偏差标签与建议"""
+        # Given
+        engine = HistoricalCaseDecisionEngine()
+
+        # When
+        loaded = engine.load_cases([CASE, {"scenarioId": "broken"}])
+
+        # Then
+        assert loaded == 1
+        step = engine.cases["hist-test"].steps[1]
+        assert len(step.feedback) == 3
+        assert step.feedback[2]["selectedOption"] == "忽略担忧"
+        assert step.feedback[0]["cognitiveBiasesIdentified"] == ["overconfidence_bias", "time_pressure_bias"]
+        assert step.feedback[0]["recommendations"][-1] == "将安全考虑置于商业利益之上"
+        assert engine.list_cases()[0]["difficulty"] == "beginner"
+
+    def test_session_walkthrough(self):
+        """测试逐步决策直至完成并生成总结"""
+        # Given
+        engine = HistoricalCaseDecisionEngine()
+        engine.load_case(CASE)
+        session_id = engine.start_session("u1", "hist-test")["sessionId"]
+
+        # When
+        invalid = engine.process_decision(session_id, 5)
+        first = engine.process_decision(session_id, 1)
+        last = engine.process_decision(session_id, 0)
+        after = engine.process_decision(session_id, 0)
+
+        # Then
+        assert invalid["error_code"] == "INVALID_HISTORICAL_OPTION"
+        assert first["nextSituation"] == "工程师警告"
+        assert first["historicalContext"]["actualOutcome"] == "按计划发射"
+        assert last["completed"]
+        assert last["comprehensiveSummary"]["decisionsMade"] == 2
+        assert after["error_code"] == "HISTORICAL_SESSION_COMPLETED"
+        progress = engine.get_user_progress("u1", "hist-test")
+        assert progress["completed"] and progress["decisionsMade"] == 2
+
+    def test_sessions_bounded_and_expire(self):
+        """测试内存中的会话数量有上限，闲置超时的会话过期"""
+        # Given
+        engine = HistoricalCaseDecisionEngine(max_sessions=2, ttl=0.2)
+        engine.load_case(CASE)
+        ids = [engine.start_session(f"u{i}", "hist-test")["sessionId"] for i in range(3)]
+
+        # When
+        evicted = engine.get_session_state(ids[0])
+        time.sleep(0.1)
+        engine.process_decision(ids[2], 0)
+        time.sleep(0.15)
+
+        # Then: 最早的会话被淘汰；闲置的会话过期，刚做过决策的会话仍在
+        assert evicted["error_code"] == "HISTORICAL_SESSION_NOT_FOUND"
+        assert engine.get_session_state(ids[1])["error_code"] == "HISTORICAL_SESSION_NOT_FOUND"
+        assert engine.get_session_state(ids[2])["currentStep"] == 1
+        assert len(engine.sessions) == 1
@@ -0,0 +1,216 @@
+"""
+单元测试：后台任务队列
+"""
+import sys
+import os
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+import time
+
+import pytest
+
+from job_queue import JobManager, CANCELLED, FAILED, QUEUED, SUCCEEDED
+from utils.error_handlers import CustomException
+
+
+def make_manager(tmp_path, **kwargs):
+    manager = JobManager(db_path=str(tmp_path / "jobs.db"), result_dir=str(tmp_path / "jobs"),
+                         process_workers=1, **kwargs)
+    order = []
+
+    @manager.register("record")
+    async def record(ctx, params):
+        order.append(params["name"])
+        return params["name"]
+
+    @manager.register("block")
+    async def block(ctx, params):
+        ctx.progress(1, 2, "等待中")
+        await asyncio.Event().wait()
+
+    @manager.register("power")
+    async def power(ctx, params):
+        return await ctx.run_in_process(pow, params["base"], params["exponent"])
+
+    return manager, order
+
+
+async def wait_finished(manager, job_id):
+    while (await manager.get(job_id)).status in (QUEUED, "running"):
+        await asyncio.sleep(0.01)
+    return await manager.get(job_id)
+
+
+class TestJobQueue:
+    """测试后台任务队列"""
+
+    def test_priority_order(self, tmp_path):
+        """测试工作者按优先级取出任务，同优先级按提交顺序"""
+        async def scenario():
+            manager, order = make_manager(tmp_path, concurrency=1)
+            await manager.start()
+            # Given: 工作者被占用时依次提交
+            blocker = await manager.submit("block")
+            jobs = [await manager.submit("record", {"name": name}, priority=priority)
+                    for name, priority in (("low", 9), ("high", 0), ("normal", 5), ("high2", 0))]
+            # When
+            await manager.cancel(blocker.id)
+            for job in jobs:
+                await wait_finished(manager, job.id)
+            await manager.stop()
+            return order
+
+        # Then
+        assert asyncio.run(scenario()) == ["high", "high2", "normal", "low"]
+
+    def test_cache_and_deduplication(self, tmp_path):
+        """测试相同输入的排队任务只执行一次，完成后在有效期内直接复用结果"""
+        async def scenario():
+            manager, order = make_manager(tmp_path)
+            await manager.start()
+            first = await manager.submit("record", {"name": "a"})
+            duplicate = await manager.submit("record", {"name": "a"})
+            await wait_finished(manager, first.id)
+            cached = await manager.submit("record", {"name": "a"})
+            forced = await manager.submit("record", {"name": "a"}, use_cache=False)
+            await wait_finished(manager, forced.id)
+            await manager.stop()
+            return first, duplicate, cached, forced, order
+
+        # When
+        first, duplicate, cached, forced, order = asyncio.run(scenario())
+
+        # Then
+        assert duplicate.id == first.id
+        assert (cached.id, cached.cached, cached.result) == (first.id, True, "a")
+        assert forced.id != first.id
+        assert order == ["a", "a"]
+
+    def test_cancel_running_and_queued(self, tmp_path):
+        """测试取消运行中和排队中的任务"""
+        async def scenario():
+            manager, order = make_manager(tmp_path, concurrency=1)
+            await manager.start()
+            running = await manager.submit("block")
+            queued = await manager.submit("record", {"name": "never"})
+            while (await manager.get(running.id)).progress < 0.5:
+                await asyncio.sleep(0.01)
+            cancelled_queued = await manager.cancel(queued.id)
+            cancelled_running = await manager.cancel(running.id)
+            await asyncio.sleep(0.05)
+            stored = await manager.get(running.id)
+            await manager.stop()
+            return cancelled_queued, cancelled_running, stored, order
+
+        # When
+        cancelled_queued, cancelled_running, stored, order = asyncio.run(scenario())
+
+        # Then
+        assert cancelled_queued.status == cancelled_running.status == stored.status == CANCELLED
+        assert order == []
+
+    def test_restart_restores_queue(self, tmp_path):
+        """测试关闭时运行中的任务回到队列，重启后继续执行"""
+        async def first_run():
+            manager, _ = make_manager(tmp_path, concurrency=1)
+            await manager.start()
+            running = await manager.submit("block")
+            queued = await manager.submit("record", {"name": "later"})
+            await asyncio.sleep(0.05)
+            await manager.stop()
+            return running.id, queued.id
+
+        async def second_run(running_id, queued_id):
+            manager, order = make_manager(tmp_path, concurrency=1)
+            manager.kinds.pop("block")
+            await manager.start()
+            queued = await wait_finished(manager, queued_id)
+            running = await manager.get(running_id)
+            await manager.stop()
+            return running, queued, order
+
+        # When
+        running, queued, order = asyncio.run(second_run(*asyncio.run(first_run())))
+
+        # Then: 恢复时种类已不存在的任务标记为失败
+        assert running.status == FAILED
+        assert (queued.status, order) == (SUCCEEDED, ["later"])
+
+    def test_queue_full_and_invalid_submission(self, tmp_path):
+        """测试队列已满返回 JOB_QUEUE_FULL，未知种类和无效优先级抛出 ValueError"""
+        async def scenario():
+            manager, _ = make_manager(tmp_path, concurrency=1, queue_size=1)
+            await manager.start()
+            await manager.submit("block")
+            await asyncio.sleep(0.01)
+            await manager.submit("record", {"name": "a"})
+            errors = []
+            for kind, priority in (("record", 5), ("unknown", 5), ("record", 10)):
+                try:
+                    await manager.submit(kind, {"name": "b"}, priority=priority)
+                except (CustomException, ValueError) as e:
+                    errors.append(getattr(e, "error_code", type(e).__name__))
+            await manager.stop()
+            return errors
+
+        # Then
+        assert asyncio.run(scenario()) == ["JOB_QUEUE_FULL", "ValueError", "ValueError"]
+
+    def test_process_job_result_persisted(self, tmp_path):
+        """测试进程池计算的结果写入任务表，不在内存中时从任务表读取"""
+        async def scenario():
+            manager, _ = make_manager(tmp_path)
+            await manager.start()
+            job = await manager.submit("power", {"base": 3, "exponent": 40})
+            await wait_finished(manager, job.id)
+            await manager.stop()
+            await manager.start()
+            stored = await manager.get(job.id)
+            await manager.stop()
+            return stored
+
+        # When
+        stored = asyncio.run(scenario())
+
+        # Then
+        assert (stored.status, stored.result, stored.progress) == (SUCCEEDED, 3 ** 40, 1.0)
+
+    def test_submit_before_start_rejected(self, tmp_path):
+        """测试服务未启动时提交返回 JOBS_UNAVAILABLE"""
+        manager, _ = make_manager(tmp_path)
+        with pytest.raises(CustomException) as excinfo:
+            asyncio.run(manager.submit("record", {"name": "a"}))
+        assert excinfo.value.error_code == "JOBS_UNAVAILABLE"
+
+    def test_cancel_while_saving_running_status(self, tmp_path):
+        """测试保存运行状态期间取消的任务保持已取消，不被执行结果覆盖"""
+        async def scenario():
+            manager, order = make_manager(tmp_path, concurrency=1)
+            await manager.start()
+            # Given: 保存运行状态较慢
+            save = manager._store.save
+
+            def slow_save(job):
+                if job.status == "running":
+                    time.sleep(0.1)
+                save(job)
+
+            manager._store.save = slow_save
+            job = await manager.submit("record", {"name": "late"})
+            while job.status == QUEUED:
+                await asyncio.sleep(0.001)
+            # When
+            cancelled = await manager.cancel(job.id)
+            await asyncio.sleep(0.15)
+            stored = await manager.get(job.id)
+            await manager.stop()
+            return cancelled, stored, order
+
+        cancelled, stored, order = asyncio.run(scenario())
+
+        # Then
+        assert cancelled.status == stored.status == CANCELLED
+        assert order == []
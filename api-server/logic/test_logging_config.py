@@ -0,0 +1,47 @@
+"""
+单元测试：结构化日志配置
+"""
+import sys
+import os
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import io
+import json
+import logging
+import logging.handlers
+import queue
+
+from utils.logging_config import JsonFormatter, DroppingQueueHandler
+
+
+class TestLoggingConfig:
+    """测试经队列输出的 JSON 日志"""
+
+    def test_exception_keeps_separate_exc_info_through_queue(self):
+        """测试经过队列的异常日志保留独立的 exc_info 字段，堆栈不混入 msg"""
+        # Given
+        log_queue = queue.Queue()
+        stream = io.StringIO()
+        stream_handler = logging.StreamHandler(stream)
+        stream_handler.setFormatter(JsonFormatter())
+        listener = logging.handlers.QueueListener(log_queue, stream_handler)
+        logger = logging.getLogger("test_logging_config.queue")
+        logger.propagate = False
+        logger.addHandler(DroppingQueueHandler(log_queue))
+
+        # When
+        listener.start()
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.exception("计算失败: %s", "x", extra={"job_id": "j1"})
+        listener.stop()
+
+        # Then
+        payload = json.loads(stream.getvalue())
+        assert payload["msg"] == "计算失败: x"
+        assert payload["job_id"] == "j1"
+        assert "ZeroDivisionError" in payload["exc_info"]
+        assert "Traceback" not in payload["msg"]
@@ -0,0 +1,113 @@
+"""
+单元测试：LRU 缓存
+"""
+import sys
+import os
+import asyncio
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.lru_cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache:
+    """测试 LRU 缓存"""
+
+    def test_evicts_least_recently_used_by_entries(self):
+        """测试超过条目上限时淘汰最久未使用的条目"""
+        # Given
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        # When
+        cache.get("a")
+        cache.set("c", 3)
+
+        # Then
+        assert cache.keys() == ["a", "c"]
+        assert cache.stats()["evictions"] == 1
+
+    def test_evicts_by_bytes_and_rejects_oversized(self):
+        """测试按字节上限淘汰，单个超限条目不写入"""
+        # Given
+        cache = LRUCache(max_entries=None, max_bytes=100, sizer=lambda value: value)
+
+        # When
+        cache.set("a", 40)
+        cache.set("b", 40)
+        cache.set("c", 40)
+        stored = cache.set("huge", 500)
+
+        # Then
+        assert stored is False
+        assert "a" not in cache
+        assert cache.stats()["cache_size_bytes"] == 80
+
+    def test_ttl_expiry(self):
+        """测试条目到期后不可见且清理只移除到期条目"""
+        # Given
+        clock = FakeClock()
+        cache = LRUCache(ttl=10, clock=clock)
+        cache.set("short", 1, ttl=5)
+        cache.set("default", 2)
+        cache.set("forever", 3, ttl=None)
+        cache.set("short", 4, ttl=20)  # 覆盖后旧的过期记录应被忽略
+
+        # When
+        clock.now = 15
+        cache.cleanup_expired()
+
+        # Then
+        assert sorted(cache.keys()) == ["forever", "short"]
+        assert cache.stats()["expirations"] == 1
+        clock.now = 25
+        assert cache.get("short") is None
+        assert cache.get("forever") == 3
+
+    def test_get_or_load_single_flight(self):
+        """测试同一键的并发未命中只加载一次"""
+        cache = LRUCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"value": 42}
+
+        async def scenario():
+            return await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(10)))
+
+        # When
+        results = asyncio.run(scenario())
+
+        # Then
+        assert len(calls) == 1
+        assert all(result == {"value": 42} for result in results)
+        assert cache.get("k") == {"value": 42}
+
+    def test_stats_hit_rate(self):
+        """测试命中率统计"""
+        # Given
+        cache = LRUCache()
+        cache.set("a", "x")
+
+        # When
+        cache.get("a")
+        cache.get("missing")
+
+        # Then
+        stats = cache.stats()
+        assert stats["hit_count"] == 1
+        assert stats["miss_count"] == 1
+        assert stats["hit_rate_percent"] == 50.0
+        assert stats["cached_items_count"] == 1
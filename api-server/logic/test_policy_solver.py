@@ -0,0 +1,106 @@
+"""
+单元测试：最优策略求解
+"""
+import sys
+import os
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from policy_solver import PolicySolver, PolicyTable, outcome_score
+
+SCENARIO_ID = "coffee-shop-nonlinear-effects"
+DECISIONS = [{"option": "up"}, {"option": "down"}, {"option": "noop"}, {"option": "gamble"}]
+
+
+def step(scenario_id, state, decisions, difficulty="beginner", rng=None, effects=None):
+    """up/down 每回合满意度 ±10，noop 不变，gamble 按随机数在 -20 到 +20 之间"""
+    new_state = dict(state)
+    option = decisions["option"]
+    if option == "up":
+        new_state["satisfaction"] += 10
+    elif option == "down":
+        new_state["satisfaction"] -= 10
+    elif option == "gamble":
+        new_state["satisfaction"] += rng.uniform(-20, 20)
+    return new_state
+
+
+def delayed(scenario_id, state, decisions, difficulty="beginner", rng=None, effects=None):
+    """invest 立刻降低满意度 5，两回合后带来 +20"""
+    new_state = dict(state)
+    if decisions["option"] == "invest":
+        new_state["satisfaction"] -= 5
+        effects.schedule("satisfaction", 20, due_turn=state["turn_number"] + 2)
+    return new_state
+
+
+class TestPolicySolver:
+    """测试最优策略求解"""
+
+    def test_best_and_worst_paths(self):
+        """测试各 horizon 的最高、最低得分与决策序列"""
+        # Given
+        solver = PolicySolver(step, SCENARIO_ID, "beginner", DECISIONS)
+
+        # When
+        results = solver.solve(3)
+
+        # Then
+        start = outcome_score({"satisfaction": 50, "resources": 1000, "reputation": 50, "knowledge": 0})
+        assert [r.horizon for r in results] == [1, 2, 3]
+        assert results[2].best_score == round(start + 30 / 4, 2)
+        assert results[2].worst_score == round(start - 30 / 4, 2)
+        assert [entry["decisions"]["option"] for entry in results[2].best_path] == ["up"] * 3
+        assert [entry["turn"] for entry in results[2].worst_path] == [1, 2, 3]
+
+    def test_expected_random_and_duplicate_successors(self):
+        """测试随机选项按期望（区间中点）推演，与 noop 后继相同而被剪枝"""
+        # Given
+        solver = PolicySolver(step, SCENARIO_ID, "beginner", DECISIONS)
+
+        # When
+        solver.solve(2)
+
+        # Then: horizon=1 展开根节点；horizon=2 展开根节点及 up/down/noop 三个后继，gamble 与 noop 重复
+        assert solver.expanded == 1 + 1 + 3
+
+    def test_delayed_effects_counted(self):
+        """测试延迟效果随状态推演：短 horizon 不投入，足够长时投入"""
+        # Given
+        decisions = [{"option": "invest"}, {"option": "wait"}]
+        solver = PolicySolver(delayed, SCENARIO_ID, "beginner", decisions)
+
+        # When
+        results = solver.solve(3)
+
+        # Then
+        assert results[0].best_path[0]["decisions"]["option"] == "wait"
+        assert results[2].best_path[0]["decisions"]["option"] == "invest"
+
+    def test_budget_exceeded_keeps_solved_horizons(self):
+        """测试超出展开预算时只保留已完成的 horizon"""
+        # Given
+        solver = PolicySolver(step, SCENARIO_ID, "beginner", DECISIONS, node_budget=5)
+
+        # When
+        results = solver.solve(10)
+
+        # Then
+        assert 0 < len(results) < 10
+
+    def test_regret_lookup(self):
+        """测试遗憾值按已进行回合数查表，未求解时返回 None"""
+        # Given
+        table = PolicyTable()
+        table.solve(step, SCENARIO_ID, "beginner", DECISIONS, max_horizon=2)
+        state = {"satisfaction": 50, "resources": 1000, "reputation": 50, "knowledge": 0}
+
+        # When
+        regret = table.regret(SCENARIO_ID, "beginner", 2, state)
+
+        # Then
+        assert regret["regret"] == 5.0
+        assert regret["position_percent"] == 50.0
+        assert table.regret(SCENARIO_ID, "beginner", 3, state) is None
+        assert table.regret(SCENARIO_ID, "advanced", 1, state) is None
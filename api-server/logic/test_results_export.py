@@ -0,0 +1,63 @@
+"""
+单元测试：测试结果流式导出
+"""
+import sys
+import os
+import csv
+import io
+import json
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from results_store import make_result_row
+import results_export
+from results_export import iter_export, EXPORT_COLUMNS
+
+
+def _rows(count):
+    rows = []
+    for i in range(count):
+        row = make_result_row("u1", "s1", "exponential", score=i, improvement_areas=["a", "b"], timestamp=i)
+        row["id"] = i + 1
+        rows.append(row)
+    return rows
+
+
+class TestResultsExport:
+    """测试导出编码器"""
+
+    def test_csv_and_ndjson_stream_in_chunks(self, monkeypatch):
+        """测试 CSV / NDJSON 分块输出且行数完整"""
+        # Given
+        monkeypatch.setattr(results_export, "CHUNK_ROWS", 3)
+
+        # When
+        csv_chunks = list(iter_export("csv", iter(_rows(7)), {}, {}))
+        ndjson_chunks = list(iter_export("ndjson", iter(_rows(7)), {}, {}))
+
+        # Then
+        assert len(csv_chunks) == 3
+        reader = csv.DictReader(io.StringIO(b"".join(csv_chunks).decode("utf-8-sig")))
+        records = list(reader)
+        assert reader.fieldnames == EXPORT_COLUMNS
+        assert [r["score"] for r in records] == [str(float(i)) for i in range(7)]
+        assert records[0]["improvementAreas"] == "a;b"
+        lines = b"".join(ndjson_chunks).decode("utf-8").splitlines()
+        assert len(ndjson_chunks) == 3
+        assert json.loads(lines[-1])["score"] == 6
+
+    def test_json_keeps_export_shape(self):
+        """测试 JSON 流拼接后与原导出结构一致"""
+        header = {"userId": "u1", "results_format": "json"}
+        trailer = {"aggregate_stats": {"total_tests": 2}}
+
+        body = json.loads(b"".join(iter_export("json", iter(_rows(2)), header, trailer)))
+        empty = json.loads(b"".join(iter_export("json", iter([]), header, {})))
+        no_header = json.loads(b"".join(iter_export("json", iter(_rows(1)), {}, {})))
+
+        assert body["userId"] == "u1"
+        assert len(body["data"]["test_history"]) == 2
+        assert body["data"]["aggregate_stats"] == {"total_tests": 2}
+        assert empty["data"] == {"test_history": []}
+        assert list(no_header) == ["data"] and len(no_header["data"]["test_history"]) == 1
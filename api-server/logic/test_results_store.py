@@ -0,0 +1,176 @@
+"""
+单元测试：测试结果存储
+"""
+import sys
+import os
+import asyncio
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from results_store import ResultsStore, make_result_row, score_from_error_ratio, delete_session_after_flush
+from write_behind import WriteBehindQueue
+
+
+def _store_with_rows():
+    store = ResultsStore(":memory:")
+    store.add_results([
+        make_result_row("u1", "s1", "exponential", score=40, bias_type="exponential_misconception", timestamp=1000),
+        make_result_row("u1", "s1", "exponential", score=60, bias_type="exponential_misconception", timestamp=2000),
+        make_result_row("u1", "s2", "compound", score=80, bias_type="compound_interest_misunderstanding", timestamp=3000),
+        make_result_row("u2", "s3", "compound", score=20, timestamp=4000),
+    ])
+    return store
+
+
+class TestResultsStore:
+    """测试结果存储"""
+
+    def test_user_summary_and_history(self):
+        """测试用户汇总与历史"""
+        # Given
+        store = _store_with_rows()
+
+        # When
+        summary = store.user_summary("u1")
+        history = store.user_history("u1", limit=2)
+
+        # Then
+        assert summary["total_tests"] == 3
+        assert summary["average_score"] == 60.0
+        assert list(summary["bias_counts"]) == ["exponential_misconception", "compound_interest_misunderstanding"]
+        assert [row["score"] for row in history] == [80, 60]
+
+    def test_type_progress(self):
+        """测试按测试类型的进步幅度"""
+        store = _store_with_rows()
+        progress = {p["test_type"]: p for p in store.type_progress("u1", window=1)}
+        assert progress["exponential"]["improvement"] == 20
+        assert progress["compound"]["improvement"] == 0
+
+    def test_global_statistics_and_delete(self):
+        """测试全局统计与删除会话"""
+        # Given
+        store = _store_with_rows()
+
+        # When
+        before = store.global_statistics()
+        deleted = store.delete_session("s1")
+        after = store.global_statistics()
+
+        # Then
+        assert before["total_users"] == 2
+        assert before["total_tests_taken"] == 4
+        assert before["most_common_biases"][0] == {"bias": "exponential_misconception", "frequency": 0.5}
+        assert len(deleted) == 2
+        assert after["total_tests_taken"] == 2
+        assert store.session_results("u1", "s1") == []
+
+    def test_score_from_error_ratio(self):
+        """测试误差率换算得分"""
+        assert score_from_error_ratio(0) == 100.0
+        assert score_from_error_ratio(0.25) == 75.0
+        assert score_from_error_ratio(float("inf")) == 0.0
+        assert score_from_error_ratio(None) == 0.0
+
+    def test_incremental_aggregates_match_full_scan(self):
+        """测试增量聚合与全表统计一致（含删除）"""
+        # Given
+        store = _store_with_rows()
+        store.add_result(make_result_row("u2", "s4", "compound", score=90, bias_type="linear_thinking_bias", timestamp=5000))
+
+        # When
+        snapshot = store.aggregates.snapshot()
+        scan = store.global_statistics()
+
+        # Then
+        for key in ("total_users", "total_tests_taken", "average_score", "most_common_biases"):
+            assert snapshot[key] == scan[key]
+        assert sorted(snapshot["top_improved_areas"], key=lambda a: a["test_type"]) == [
+            {"test_type": "compound", "improvement_rate": 1.0},
+            {"test_type": "exponential", "improvement_rate": 1.0},
+        ]
+
+        store.delete_session("s1")
+        snapshot = store.aggregates.snapshot()
+        scan = store.global_statistics()
+        for key in ("total_users", "total_tests_taken", "average_score", "most_common_biases"):
+            assert snapshot[key] == scan[key]
+        assert [a["test_type"] for a in snapshot["top_improved_areas"]] == ["compound"]
+
+    def test_aggregates_persist_with_writes(self, tmp_path):
+        """测试聚合表与结果在同一事务中更新，未正常关闭也不丢失删除的计数"""
+        # Given
+        db_path = str(tmp_path / "results.db")
+        store = ResultsStore(db_path)
+        store.add_result(make_result_row("u1", "s1", "exponential", score=50, timestamp=1000))
+        store.add_result(make_result_row("u2", "s2", "compound", score=70, bias_type="b", timestamp=2000))
+        store.add_result(make_result_row("u3", "s3", "compound", score=90, bias_type="b", timestamp=3000))
+        store.delete_session("s3")
+
+        # When: 不关闭原连接直接重新打开
+        reopened = ResultsStore(db_path)
+
+        # Then
+        snapshot = reopened.aggregates.snapshot()
+        assert snapshot["total_tests_taken"] == 2
+        assert snapshot["total_users"] == 2
+        assert snapshot["average_score"] == 60.0
+        assert snapshot["most_common_biases"] == [{"bias": "b", "frequency": 0.5}]
+        assert snapshot["as_of_result_id"] == 3
+        reopened.close()
+        store.close()
+
+    def test_aggregates_rebuilt_for_existing_results(self, tmp_path):
+        """测试没有聚合表的旧库在打开时由结果表重建"""
+        # Given
+        db_path = str(tmp_path / "results.db")
+        store = ResultsStore(db_path)
+        store.add_results([make_result_row("u1", "s1", "exponential", score=s, timestamp=1000 + s) for s in (40, 80)])
+        with store._conn:
+            store._conn.execute("DROP TABLE agg_totals")
+        store.close()
+
+        # When
+        reopened = ResultsStore(db_path)
+
+        # Then
+        snapshot = reopened.aggregates.snapshot()
+        assert (snapshot["total_tests_taken"], snapshot["total_users"]) == (2, 1)
+        assert snapshot["top_improved_areas"] == [{"test_type": "exponential", "improvement_rate": 1.0}]
+        reopened.close()
+
+    def test_iter_user_results_pages_in_order(self):
+        """测试按 (timestamp, id) 分页遍历，同一时间戳的行不丢不重"""
+        # Given
+        store = ResultsStore(":memory:")
+        store.add_results([make_result_row("u1", "s1", "exponential", score=i, timestamp=1000 + i // 3) for i in range(10)])
+        store.add_result(make_result_row("u2", "s2", "compound", score=99, timestamp=1000))
+
+        # When
+        rows = list(store.iter_user_results("u1", page_size=4))
+
+        # Then
+        assert [row["score"] for row in rows] == list(range(10))
+        assert list(store.iter_user_results("u1", test_type="compound")) == []
+
+    def test_delete_session_waits_for_buffered_results(self):
+        """测试删除会话前先写完缓冲中的结果，之后刷新不会让会话复活"""
+        # Given
+        store = _store_with_rows()
+
+        async def scenario():
+            writer = WriteBehindQueue(store.add_results, flush_interval_ms=10_000)
+            await writer.submit(make_result_row("u3", "s4", "compound", score=50, timestamp=5000))
+            # When
+            deleted = await delete_session_after_flush(store, writer, "s4")
+            await writer.stop()
+            return deleted
+
+        deleted = asyncio.run(scenario())
+
+        # Then
+        assert len(deleted) == 1
+        assert store.session_results("u3", "s4") == []
+        stats = store.aggregates.snapshot()
+        assert (stats["total_users"], stats["total_tests_taken"]) == (2, 4)
@@ -0,0 +1,138 @@
+"""
+单元测试：游戏会话检查点
+"""
+import sys
+import os
+import asyncio
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from game_session_service import GameSessionService, DecisionPatternTracker
+from session_checkpoint import SessionCheckpointer, read_checkpoint
+
+SCENARIO = {"id": "game-001", "name": "游戏", "difficulty": "beginner"}
+
+
+def spend(scenario_id, state, decisions, difficulty="beginner"):
+    new_state = dict(state)
+    new_state["resources"] -= 100
+    if decisions.get("gift"):
+        new_state["gift_investment"] = new_state.get("gift_investment", 0) + 0.5
+    return new_state
+
+
+def play(service, turns, decisions=None):
+    session = service.create(SCENARIO, pattern_tracker=DecisionPatternTracker())
+    for _ in range(turns):
+        decision = decisions or {"option": "1"}
+        service.advance(session, decision, spend)
+        session.pattern_tracker.track_decision(SCENARIO["id"], decision, {})
+    return session
+
+
+class TestSessionCheckpoint:
+    """测试会话检查点"""
+
+    def test_restore_round_trip(self, tmp_path):
+        """测试检查点恢复后的会话与原会话一致"""
+        # Given
+        path = str(tmp_path / "sessions.ckpt")
+        service = GameSessionService()
+        first = play(service, 3, {"option": "1", "gift": True})
+        service.record_pattern(first, {"pattern_type": "激进/立即决策模式"})
+        second = play(service, 1)
+
+        # When
+        asyncio.run(SessionCheckpointer(service, path).checkpoint())
+        restored = GameSessionService()
+        count = asyncio.run(SessionCheckpointer(restored, path).restore({SCENARIO["id"]: SCENARIO}))
+
+        # Then
+        assert count == 2
+        for original in (first, second):
+            session = restored.get(original.game_id)
+            assert restored.state_view(session) == service.state_view(original)
+            assert session.pattern_tracker.patterns == original.pattern_tracker.patterns
+            assert session.state is session.history[-1]
+
+    def test_incremental_checkpoint_writes_only_dirty(self, tmp_path):
+        """测试增量检查点只写入有变更的会话"""
+        # Given
+        path = str(tmp_path / "sessions.ckpt")
+        service = GameSessionService()
+        checkpointer = SessionCheckpointer(service, path)
+        sessions = [play(service, 2) for _ in range(50)]
+        asyncio.run(checkpointer.checkpoint())
+
+        # When
+        service.advance(sessions[0], {"option": "2"}, spend)
+        report = asyncio.run(checkpointer.checkpoint())
+        idle = asyncio.run(checkpointer.checkpoint())
+
+        # Then
+        assert report["sessions"] == 1
+        assert idle["sessions"] == 0
+        rows = read_checkpoint(path)
+        assert len(rows) == 50
+        assert len(rows[sessions[0].game_id][5]) == 3
+
+    def test_truncated_tail_ignored(self, tmp_path):
+        """测试截断的尾帧被丢弃，之前的帧仍可恢复"""
+        # Given
+        path = str(tmp_path / "sessions.ckpt")
+        service = GameSessionService()
+        checkpointer = SessionCheckpointer(service, path)
+        session = play(service, 1)
+        asyncio.run(checkpointer.checkpoint())
+        service.advance(session, {"option": "2"}, spend)
+        asyncio.run(checkpointer.checkpoint())
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) - 5)
+
+        # When
+        restored = GameSessionService()
+        asyncio.run(SessionCheckpointer(restored, path).restore({SCENARIO["id"]: SCENARIO}))
+
+        # Then
+        assert restored.get(session.game_id).state.turn_number == 2
+
+    def test_compact_keeps_latest(self, tmp_path):
+        """测试压缩后每个会话只保留最新一帧"""
+        # Given
+        path = str(tmp_path / "sessions.ckpt")
+        service = GameSessionService()
+        checkpointer = SessionCheckpointer(service, path)
+        session = play(service, 1)
+        for _ in range(5):
+            service.advance(session, {"option": "3"}, spend)
+            asyncio.run(checkpointer.checkpoint())
+        size_before = os.path.getsize(path)
+
+        # When
+        checkpointer.compact()
+
+        # Then
+        assert os.path.getsize(path) < size_before
+        assert read_checkpoint(path)[session.game_id][5][-1][4] == 7
+
+    def test_idle_sessions_expire_from_memory_and_checkpoint(self, tmp_path):
+        """测试空闲过期的会话从内存移除，检查点写入删除标记，恢复时不再载入"""
+        # Given
+        path = str(tmp_path / "sessions.ckpt")
+        service = GameSessionService(idle_ttl=3600)
+        checkpointer = SessionCheckpointer(service, path)
+        stale, active = play(service, 2), play(service, 1)
+        asyncio.run(checkpointer.checkpoint())
+
+        # When
+        stale.created_at -= 7200
+        report = asyncio.run(checkpointer.checkpoint())
+        restored = GameSessionService(idle_ttl=3600)
+        count = asyncio.run(SessionCheckpointer(restored, path).restore({SCENARIO["id"]: SCENARIO}))
+
+        # Then
+        assert report["expired"] == 1
+        assert service.get(stale.game_id) is None
+        assert set(read_checkpoint(path)) == {active.game_id}
+        assert count == 1 and restored.get(active.game_id) is not None
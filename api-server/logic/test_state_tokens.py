@@ -0,0 +1,116 @@
+"""
+单元测试：无状态会话令牌
+"""
+import sys
+import os
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from fastapi import HTTPException
+from game_session_service import GameSessionService, DecisionPatternTracker, turn_rng
+from state_tokens import encode_token, decode_token, ReplayGuard, SqliteReplayGuard
+
+SCENARIO = {"id": "coffee-shop-nonlinear-effects", "name": "咖啡店", "description": "基础", "difficulty": "beginner"}
+
+
+def add_staff(scenario_id, state, decisions, difficulty="beginner", rng=None):
+    new_state = dict(state)
+    new_state["satisfaction"] += decisions.get("amount", 0)
+    new_state["relationship_investment"] = 1.5
+    return new_state
+
+
+def variant(scenario_id, difficulty):
+    return SCENARIO
+
+
+class TestStateTokens:
+    """测试无状态会话令牌"""
+
+    def test_round_trip_restores_state(self):
+        """测试令牌往返后状态、场景字段和追踪器一致，且服务端不保存会话"""
+        # Given
+        service = GameSessionService()
+        session = service.build(SCENARIO, pattern_tracker=DecisionPatternTracker())
+        service.advance(session, {"option": "1", "amount": 5}, add_staff)
+        session.pattern_tracker.track_decision(SCENARIO["id"], {"option": "1"}, {})
+        session.seed = 7
+
+        # When
+        record = decode_token(encode_token(session), session.game_id, variant)
+
+        # Then
+        assert service.get(session.game_id) is None
+        assert record.seed == 7
+        assert record.state.turn_number == 2
+        assert record.state.satisfaction == 55
+        assert service.state_dict(record, record.state)["relationship_investment"] == 1.5
+        assert [r.decisions for r in record.history] == [{"option": "1", "amount": 5}]
+        assert bytes(record.pattern_tracker.choices) == bytes(session.pattern_tracker.choices)
+        assert "result_state" not in service.history_view(record)[0]
+
+    def test_tampered_or_foreign_token_rejected(self):
+        """测试篡改内容或用于其他会话的令牌被拒绝"""
+        # Given
+        session = GameSessionService().build(SCENARIO)
+        token = encode_token(session)
+        body, signature = token.split(".")
+        tampered = body[:-2] + ("AA" if body[-2:] != "AA" else "BB") + "." + signature
+
+        # Then
+        for bad_token, game_id in [(tampered, session.game_id), (token, "session_other"), ("garbage", session.game_id)]:
+            with pytest.raises(HTTPException) as exc_info:
+                decode_token(bad_token, game_id, variant)
+            assert exc_info.value.status_code == 401
+
+    def test_replay_guard_accepts_each_token_once(self):
+        """测试每个令牌只能推进一个回合，旧令牌和重复使用的令牌被拒绝，失败撤销后可重试"""
+        for guard in (ReplayGuard(), SqliteReplayGuard(":memory:")):
+            # Given
+            guard.claim("g", 0)
+            guard.claim("g", 1)
+
+            # When / Then
+            for turn in (0, 1):
+                with pytest.raises(HTTPException) as exc_info:
+                    guard.claim("g", turn)
+                assert exc_info.value.status_code == 409
+            guard.release("g", 1)
+            guard.claim("g", 1)
+
+    def test_sqlite_replay_guard_shared_between_workers(self, tmp_path):
+        """测试共享登记：一个工作进程接受的令牌在另一个工作进程上被拒绝"""
+        # Given
+        path = str(tmp_path / "claims.db")
+        worker_a, worker_b = SqliteReplayGuard(path), SqliteReplayGuard(path)
+
+        # When
+        worker_a.claim("g", 3)
+
+        # Then
+        with pytest.raises(HTTPException):
+            worker_b.claim("g", 3)
+        worker_b.claim("g", 4)
+
+    def test_turn_rng_deterministic(self):
+        """测试同一令牌的回合随机数相同，下一回合不同"""
+        # Given
+        service = GameSessionService()
+        session = service.build(SCENARIO)
+        token = encode_token(session)
+
+        def rng_of(record):
+            return turn_rng(record.seed, record.state.turn_number).random()
+
+        # When
+        first = rng_of(decode_token(token, session.game_id, variant))
+        again = rng_of(decode_token(token, session.game_id, variant))
+        service.advance(session, {"amount": 1}, add_staff)
+        later = rng_of(decode_token(encode_token(session), session.game_id, variant))
+
+        # Then
+        assert first == again
+        assert later != first
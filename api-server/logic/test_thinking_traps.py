@@ -0,0 +1,84 @@
+"""
+单元测试：思维陷阱分析
+"""
+import sys
+import os
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from game_session_service import GameSessionService
+from state_tokens import TOKEN_HISTORY, encode_token, decode_token
+from thinking_traps import TrapCounters, thinking_trap_analysis
+
+SCENARIO = {"id": "game-001", "name": "商业", "description": "基础", "difficulty": "beginner"}
+
+
+def keep_state(scenario_id, state, decisions, difficulty="beginner", rng=None, effects=None):
+    return dict(state)
+
+
+def play(service, options):
+    session = service.create(SCENARIO)
+    for option in options:
+        service.advance(session, {"option": option}, keep_state)
+    return session
+
+
+class TestThinkingTraps:
+    """测试思维陷阱分析"""
+
+    def test_repeated_aggressive_choices(self):
+        """测试总是选择选项 1 时识别重复模式和激进倾向"""
+        # Given
+        counters = TrapCounters.from_decisions([{"option": "1"}] * 4)
+
+        # When
+        analysis = thinking_trap_analysis("coffee-shop-nonlinear-effects", counters)
+
+        # Then
+        assert analysis["total_decisions"] == 4
+        assert "'1'" in analysis["identified_patterns"][0]["description"]
+        assert [w["trap_type"] for w in analysis["thinking_trap_warnings"]] == ["激进决策倾向"]
+        assert "非线性效应" in analysis["improvement_suggestions"][-1]["suggestion"]
+
+    def test_conservative_ratio_threshold(self):
+        """测试保守选项占比达到 70% 才提示保守倾向"""
+        # Given
+        below = TrapCounters.from_decisions([{"option": "2"}, {"option": "4"}, {"option": "3"}])
+        above = TrapCounters.from_decisions([{"option": "2"}, {"option": "4"}, {"option": "2"}, {"option": "3"}])
+
+        # Then
+        assert thinking_trap_analysis("game-001", below)["thinking_trap_warnings"] == []
+        assert thinking_trap_analysis("game-001", above)["thinking_trap_warnings"][0]["trap_type"] == "保守决策倾向"
+
+    def test_counters_follow_turns_and_rebuild(self):
+        """测试回合推进时计数增量更新，缺失时由决策历史重建出相同结果"""
+        # Given
+        service = GameSessionService()
+        session = play(service, ["1", "2", "1"])
+
+        # When
+        live = service.trap_counters_for(session)
+        session.trap_counters = None
+        rebuilt = service.trap_counters_for(session)
+
+        # Then
+        assert live.to_row() == [3, "1", 2, 2, 1]
+        assert rebuilt.to_row() == live.to_row()
+
+    def test_token_keeps_counters_beyond_history(self):
+        """测试无状态令牌带上计数，不受令牌只保留最近几次决策的限制"""
+        # Given
+        service = GameSessionService()
+        session = service.build(SCENARIO)
+        for option in ["4"] + ["1"] * (TOKEN_HISTORY + 1):
+            service.advance(session, {"option": option}, keep_state)
+
+        # When
+        record = decode_token(encode_token(session), session.game_id, lambda scenario_id, difficulty: SCENARIO)
+        counters = service.trap_counters_for(record)
+
+        # Then
+        assert len(record.history) == TOKEN_HISTORY
+        assert (counters.total, counters.first_option) == (TOKEN_HISTORY + 2, "4")
@@ -0,0 +1,67 @@
+"""
+单元测试：写后缓冲队列
+"""
+import sys
+import os
+import asyncio
+import threading
+
+# 添加api-server到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from write_behind import WriteBehindQueue
+from utils.error_handlers import CustomException
+
+
+class TestWriteBehindQueue:
+    """测试写后缓冲队列"""
+
+    def test_batches_and_flushes_on_stop(self):
+        """测试按批写入并在关闭时写完剩余记录"""
+        batches = []
+
+        async def scenario():
+            queue = WriteBehindQueue(batches.append, max_batch=10, flush_interval_ms=50)
+            for i in range(25):
+                await queue.submit(i)
+            await queue.stop()
+            return queue.report()
+
+        # When
+        report = asyncio.run(scenario())
+
+        # Then
+        assert sorted(item for batch in batches for item in batch) == list(range(25))
+        assert all(len(batch) <= 10 for batch in batches)
+        assert report["flushed"] == 25
+        assert report["pending"] == 0
+
+    def test_backpressure_when_queue_full(self):
+        """测试队列满且写入阻塞时拒绝新记录"""
+        release = threading.Event()
+
+        def slow_flush(batch):
+            release.wait(5)
+
+        async def scenario():
+            queue = WriteBehindQueue(slow_flush, max_batch=1, flush_interval_ms=1, max_queue=2, put_timeout=0.05)
+            await queue.submit("a")
+            await asyncio.sleep(0.05)  # 第一条已被取出并阻塞在写入中
+            await queue.submit("b")
+            await queue.submit("c")
+            try:
+                await queue.submit("d")
+                rejected = False
+            except CustomException as e:
+                rejected = e.error_code == "WRITE_QUEUE_FULL"
+            release.set()
+            await queue.stop()
+            return rejected, queue.report()
+
+        # When
+        rejected, report = asyncio.run(scenario())
+
+        # Then
+        assert rejected
+        assert report["rejected"] == 1
+        assert report["flushed"] == 3
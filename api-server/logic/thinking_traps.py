@@ -0,0 +1,123 @@
+"""
+思维陷阱分析
+分析只依赖决策总数、第一次的选项及其重复次数、激进与保守选项的次数，这些计数随回合在会话上增量更新；
+游戏结束时的分析只读取计数，与回合数无关，客户端不必再上传整段游戏历史
+"""
+from typing import Any, Dict, Iterable, List
+
+# 选择占比达到该比例时提示激进/保守倾向
+TENDENCY_RATIO = 0.7
+
+_SCENARIO_SUGGESTIONS = (
+    ("coffee-shop", {
+        "suggestion": "在资源分配决策中，考虑非线性效应和边际收益递减",
+        "rationale": "增加投入并不总是带来线性回报，有时甚至会产生负面效果"
+    }),
+    ("investment", {
+        "suggestion": "在投资决策中，平衡短期收益与长期影响，考虑复利效应",
+        "rationale": "长期视角有助于识别短期决策的真正影响"
+    }),
+    ("relationship", {
+        "suggestion": "在关系决策中，注意时间延迟效应，考虑决策的长期后果",
+        "rationale": "关系中的决策效果往往需要时间才能显现"
+    }),
+)
+
+
+class TrapCounters:
+    """单个会话的决策计数（固定五个字段，不保存选项序列）"""
+
+    __slots__ = ("total", "first_option", "repeats", "aggressive", "conservative")
+
+    def __init__(self, total: int = 0, first_option: Any = None, repeats: int = 0,
+                 aggressive: int = 0, conservative: int = 0):
+        self.total = total
+        self.first_option = first_option
+        # 与第一次选项相同的次数，等于 total 时说明总是选择同一选项
+        self.repeats = repeats
+        # 选项 1（激进/立即）与选项 2、4（保守/稳健）的次数
+        self.aggressive = aggressive
+        self.conservative = conservative
+
+    def record(self, decisions: Dict[str, Any]) -> None:
+        option = decisions.get("option", "")
+        if self.total == 0:
+            self.first_option = option
+        self.total += 1
+        if option == self.first_option:
+            self.repeats += 1
+        if option == "1":
+            self.aggressive += 1
+        elif option in ("2", "4"):
+            self.conservative += 1
+
+    @classmethod
+    def from_decisions(cls, decisions_list: Iterable[Dict[str, Any]]) -> "TrapCounters":
+        counters = cls()
+        for decisions in decisions_list:
+            counters.record(decisions)
+        return counters
+
+    def to_row(self) -> List[Any]:
+        """只含基础类型的表示，用于无状态令牌"""
+        return [self.total, self.first_option, self.repeats, self.aggressive, self.conservative]
+
+    @classmethod
+    def from_row(cls, row: List[Any]) -> "TrapCounters":
+        return cls(*row)
+
+
+def thinking_trap_analysis(scenario_id: str, counters: TrapCounters) -> Dict[str, Any]:
+    """根据决策计数生成思维陷阱分析"""
+    total = counters.total
+    analysis = {
+        "total_decisions": total,
+        "scenario_id": scenario_id,
+        "identified_patterns": [],
+        "thinking_trap_warnings": [],
+        "improvement_suggestions": []
+    }
+
+    # 检测重复选择相同选项的模式
+    if total >= 3 and counters.repeats == total:
+        analysis["identified_patterns"].append({
+            "type": "重复性决策模式",
+            "description": f"在{total}次决策中，您总是选择相同的选项 '{counters.first_option}'",
+            "potential_issue": "可能反映出缺乏灵活性或对其他选项的探索不足"
+        })
+
+    # 检测极端选项选择
+    if counters.aggressive and counters.aggressive >= total * TENDENCY_RATIO:
+        analysis["thinking_trap_warnings"].append({
+            "trap_type": "激进决策倾向",
+            "description": "倾向于选择最激进或最立即的选项",
+            "impact": "可能导致高风险或短期导向的决策"
+        })
+
+    # 检测保守选项选择
+    if counters.conservative and counters.conservative >= total * TENDENCY_RATIO:
+        analysis["thinking_trap_warnings"].append({
+            "trap_type": "保守决策倾向",
+            "description": "倾向于选择最保守或最安全的选项",
+            "impact": "可能导致错失机会或过度规避风险"
+        })
+
+    # 提供改进建议
+    if analysis["thinking_trap_warnings"]:
+        analysis["improvement_suggestions"].append({
+            "suggestion": "在未来的决策中，尝试考虑更多样化的选项，避免过度依赖单一决策模式",
+            "rationale": "多样化的决策方法可以帮助识别和克服潜在的思维局限"
+        })
+    else:
+        analysis["improvement_suggestions"].append({
+            "suggestion": "您的决策模式显示出一定的灵活性，继续保持开放的思维",
+            "rationale": "灵活的决策方法有助于在复杂情况下找到最优解决方案"
+        })
+
+    # 根据场景类型提供特定分析
+    for keyword, suggestion in _SCENARIO_SUGGESTIONS:
+        if keyword in scenario_id:
+            analysis["improvement_suggestions"].append(dict(suggestion))
+            break
+
+    return analysis
@@ -0,0 +1,160 @@
+"""
+写后缓冲队列模块
+请求只把记录放入内存队列，后台任务每隔 N 毫秒或攒够 M 条时在一个事务中批量写入存储，
+请求延迟不再取决于磁盘 fsync；队列满时短暂等待后拒绝（背压），关闭时刷新剩余记录
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.error_handlers import CustomException
+
+logger = logging.getLogger(__name__)
+
+# 批量写入失败时的重试次数
+FLUSH_RETRIES = 3
+
+
+class _FlushMarker:
+    """flush 放入队列的标记：排在它之前的记录写完后完成，并让当前批次立即写入"""
+    __slots__ = ("done",)
+
+    def __init__(self):
+        self.done = asyncio.get_running_loop().create_future()
+
+
+class WriteBehindQueue:
+    """异步写后缓冲队列，flush_fn(batch) 为同步批量写入函数（在线程中执行）"""
+
+    def __init__(self, flush_fn: Callable[[List[Any]], Any],
+                 name: str = "write_behind",
+                 max_batch: int = 500,
+                 flush_interval_ms: int = 200,
+                 max_queue: int = 10000,
+                 put_timeout: float = 0.5):
+        self.flush_fn = flush_fn
+        self.name = name
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_queue = max_queue
+        self.put_timeout = put_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"submitted": 0, "flushed": 0, "batches": 0, "rejected": 0, "failed": 0}
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        """启动后台刷新任务（需在事件循环中调用，重复调用无副作用）"""
+        if self._task is not None and not self._task.done():
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.get_running_loop().create_task(self._run(), name=f"{self.name}-flusher")
+
+    async def submit(self, item: Any):
+        """放入一条记录；队列满时最多等待 put_timeout 秒，仍无空位则拒绝"""
+        self.start()
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self._queue.put(item), self.put_timeout)
+            except asyncio.TimeoutError:
+                self.stats["rejected"] += 1
+                logger.warning("写入队列已满", extra={"queue": self.name, "pending": self.pending})
+                raise CustomException(
+                    message="服务器繁忙，结果暂时无法保存，请稍后重试",
+                    error_code="WRITE_QUEUE_FULL",
+                    status_code=503
+                )
+        self.stats["submitted"] += 1
+
+    async def flush(self, timeout: float = 10.0):
+        """
+        等待调用前已提交的记录全部写入（或多次失败后丢弃）：在队列中放入标记，
+        标记之前的记录立即成批写入，之后提交的记录不在等待范围内。超时抛出 WRITE_QUEUE_BUSY（503）
+        """
+        if self._task is None or self._task.done():
+            return
+        marker = _FlushMarker()
+        try:
+            await asyncio.wait_for(self._queue.put(marker), timeout)
+            await asyncio.wait_for(asyncio.shield(marker.done), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("等待写入队列刷新超时", extra={"queue": self.name, "pending": self.pending})
+            raise CustomException(
+                message="服务器繁忙，暂时无法完成操作，请稍后重试",
+                error_code="WRITE_QUEUE_BUSY",
+                status_code=503
+            )
+
+    async def _next_batch(self) -> List[Any]:
+        """等待第一条记录，然后在刷新间隔内继续收集，最多 max_batch 条；遇到 flush 标记时立即结束"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.max_batch and not isinstance(batch[-1], _FlushMarker):
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _flush(self, batch: List[Any]):
+        for attempt in range(1, FLUSH_RETRIES + 1):
+            try:
+                await asyncio.to_thread(self.flush_fn, batch)
+                self.stats["flushed"] += len(batch)
+                self.stats["batches"] += 1
+                return
+            except Exception as e:
+                logger.error(f"批量写入失败（第{attempt}次）: {e}",
+                             extra={"queue": self.name, "batch_size": len(batch)})
+                await asyncio.sleep(0.1 * attempt)
+        self.stats["failed"] += len(batch)
+        logger.error("批量写入多次失败，记录已丢弃", extra={"queue": self.name, "batch_size": len(batch)})
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            markers = [item for item in batch if isinstance(item, _FlushMarker)]
+            records = [item for item in batch if not isinstance(item, _FlushMarker)] if markers else batch
+            try:
+                if records:
+                    await self._flush(records)
+            finally:
+                for marker in markers:
+                    if not marker.done.done():
+                        marker.done.set_result(None)
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def stop(self, timeout: float = 10.0):
+        """等待队列中的记录全部写入后停止后台任务"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error("关闭时未能写完队列", extra={"queue": self.name, "pending": self.pending})
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._queue = None
+
+    def report(self) -> Dict[str, Any]:
+        return {"pending": self.pending, **self.stats}
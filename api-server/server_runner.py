@@ -19,14 +19,11 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from dotenv import load_dotenv
 load_dotenv()  # 加载 .env 文件
 
-# Set up detailed logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# 日志级别由环境变量 LOG_LEVEL 控制（默认 INFO），避免冷启动时输出大量调试信息
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+from utils.logging_config import setup_logging
+setup_logging(level=LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 try:
@@ -47,21 +44,17 @@ try:
     from start import app
     logger.info("Successfully imported app")
     
-    # 输出路由信息
+    # 输出路由概况（逐条路由列表仅在 DEBUG 级别输出）
     logger.info(f"Total routes registered: {len(app.routes)}")
-    for i, route in enumerate(app.routes):
-        if hasattr(route, 'methods') and hasattr(route, 'path'):
-            methods = ', '.join(sorted(list(route.methods))) if hasattr(route, 'methods') and isinstance(route.methods, (list, set)) else str(getattr(route, 'methods', 'UNKNOWN'))
-            logger.info(f"  Route {i+1:2d}: {methods:20s} {route.path}")
-        else:
-            logger.info(f"  Route {i+1:2d}: {type(route).__name__:20s} {getattr(route, 'path', 'Unknown')}")
-    
+    if logger.isEnabledFor(logging.DEBUG):
+        for i, route in enumerate(app.routes):
+            logger.debug(f"  Route {i+1:2d}: {getattr(route, 'path', type(route).__name__)}")
+
     # 检查关键路由是否存在
-    critical_routes = ['/scenarios/', '/health', '/docs', '/openapi.json']
-    for route_path in critical_routes:
-        found = any(getattr(r, 'path', '') == route_path for r in app.routes if hasattr(r, 'path'))
-        status = "✅" if found else "❌"
-        logger.info(f"  {status} Critical route {route_path}: {'Found' if found else 'Missing'}")
+    registered_paths = {getattr(r, 'path', '') for r in app.routes}
+    missing_routes = [p for p in ['/scenarios/', '/health', '/docs', '/openapi.json'] if p not in registered_paths]
+    if missing_routes:
+        logger.warning(f"Critical routes missing: {missing_routes}")
     
     logger.info("Importing uvicorn...")
     import uvicorn
@@ -73,7 +66,7 @@ try:
     logger.info(f"Server will listen on http://0.0.0.0:{port}")
     
     # 启动服务器
-    uvicorn.run(app, host="0.0.0.0", port=port, log_level="debug")
+    uvicorn.run(app, host="0.0.0.0", port=port, log_level=LOG_LEVEL.lower())
 
 except Exception as e:
     logger.error(f"Error running server: {e}")
@@ -7,92 +7,55 @@
 
 import os
 import sys
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import importlib
+from contextlib import asynccontextmanager
+
+# 计时起点：尽早导入以覆盖后续所有模块的导入耗时
+from utils.startup_profiler import startup_profiler
+
+with startup_profiler.phase("import:fastapi"):
+    from fastapi import FastAPI, HTTPException, Query, Header, WebSocket
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse, HTMLResponse
+    from fastapi.staticfiles import StaticFiles
 from typing import Optional, Dict, Any, List
-import uvicorn
 import json
+import logging
 import random
 from datetime import datetime
 from pydantic import BaseModel
 from collections import defaultdict
 
 # 导入错误处理模块
-from utils.error_handlers import global_exception_handler, CustomException
-
-# ===== 增强系统：决策模式追踪器 =====
-class DecisionPatternTracker:
-    """追踪用户的决策模式，识别决策倾向"""
-
-    def __init__(self):
-        self.patterns = {
-            "risk_preference": [],      # 风险偏好: 保守/中性/激进
-            "pace_preference": [],      # 节奏偏好: 立即/谨慎/延迟
-            "information_style": [],    # 信息风格: 选择性/全面
-            "decision_consistency": [], # 决策一致性
-            "overconfidence_signals": [] # 自信度过高信号
-        }
-
-    def track_decision(self, scenario_id: str, decision: Dict, context: Dict):
-        """记录单次决策并更新模式"""
-        # 追踪风险偏好
-        option = decision.get("option", "")
-        action = decision.get("action", "")
-        decision_type = decision.get("decision", "")
-
-        # 根据不同场景类型分析风险偏好
-        if option in ["1", "2", "3", "4"]:
-            # game-001, game-002等: 1=激进/立即, 2=稳健/完善, 3=中等/收购, 4=保守/合作
-            if option == "1":
-                self.patterns["risk_preference"].append("激进")
-                self.patterns["pace_preference"].append("立即")
-            elif option == "2":
-                self.patterns["risk_preference"].append("稳健")
-                self.patterns["pace_preference"].append("谨慎")
-            elif option == "3":
-                self.patterns["risk_preference"].append("中等")
-                self.patterns["pace_preference"].append("平衡")
-            else:
-                self.patterns["risk_preference"].append("保守")
-                self.patterns["pace_preference"].append("合作")
-
-        # 追踪决策一致性
-        if len(self.patterns["risk_preference"]) > 0:
-            current_risk = self.patterns["risk_preference"][-1]
-            if len(self.patterns["risk_preference"]) >= 3:
-                last_3 = self.patterns["risk_preference"][-3:]
-                if len(set(last_3)) == 1:  # 连续3次相同
-                    self.patterns["decision_consistency"].append("高度一致")
-                elif len(set(last_3)) == 2:
-                    self.patterns["decision_consistency"].append("中度一致")
-                else:
-                    self.patterns["decision_consistency"].append("多样化")
-
-    def generate_personalized_insight(self) -> str:
-        """生成个性化洞察反馈"""
-        if not self.patterns["risk_preference"]:
-            return ""
-
-        insights = []
-
-        # 分析风险偏好
-        if len(self.patterns["risk_preference"]) >= 3:
-            recent_risks = self.patterns["risk_preference"][-3:]
-            aggressive_count = sum(1 for r in recent_risks if r == "激进")
-            conservative_count = sum(1 for r in recent_risks if r == "保守")
-
-            if aggressive_count >= 2:
-                insights.append("📊 你的决策模式分析：\n你最近倾向于选择高风险选项。这显示了你的风险偏好。")
-            elif conservative_count >= 2:
-                insights.append("📊 你的决策模式分析：\n你最近倾向于选择保守选项。这显示了你的风险偏好。")
-
-        # 分析决策一致性
-        if len(self.patterns["decision_consistency"]) >= 2:
-            recent_consistency = self.patterns["decision_consistency"][-1]
-            if recent_consistency == "高度一致":
-                insights.append("⚠️ 你连续多次选择了相似的策略，可能陷入了思维定势。")
+from utils.error_handlers import global_exception_handler, custom_exception_handler, CustomException
+from utils.logging_config import setup_logging
+from utils.data_repository import data_repository, PRELOAD_FILES
+from utils.compute_executor import compute_executor
+from logic.results_store import (
+    get_results_store, close_results_store, results_writer, decisions_writer,
+    make_decision_row
+)
+from logic.cohort_analytics import run_cohort_refresh
+from logic.historical_decision_engine import historical_decision_engine, HISTORICAL_CASE_SOURCES
+from logic.historical_case_progress_tracker import get_progress_tracker, close_progress_tracker, run_progress_flush
+from logic.game_session_service import game_session_service, DecisionRecord, DecisionPatternTracker, turn_rng
+from logic.session_checkpoint import session_checkpointer, run_session_checkpoints
+from logic.game_channel import serve_game_channel
+from logic.delayed_effects import DelayedEffectQueue, DECAY, COMPOUND
+from logic.counterfactual import what_if
+from logic.policy_solver import (
+    policy_table, solve_policy, simulate_outcomes, POLICY_MAX_HORIZON, SCORE_MAX, SCORE_MIN
+)
+from logic.job_queue import job_manager, run_job_cleanup, MAX_PRIORITY as MAX_JOB_PRIORITY
+from logic.feedback_templates import feedback_catalog, feedback_slots
+from logic.thinking_traps import TrapCounters, thinking_trap_analysis
+from logic.state_tokens import (
+    encode_token, decode_token, replay_guard, SESSION_TOKEN_MAX_BYTES
+)
 
-        return "\n\n".join(insights) if insights else ""
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # ===== 增强系统：跨场景决策模式分析器 =====
 class CrossScenarioAnalyzer:
@@ -144,12 +107,21 @@ pattern_tracker = DecisionPatternTracker()
 cross_scenario_analyzer = CrossScenarioAnalyzer()
 
 
-from fastapi.responses import JSONResponse
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时加载数据与可选路由，关闭时释放资源"""
+    await on_startup()
+    try:
+        yield
+    finally:
+        await on_shutdown()
+
 
 app = FastAPI(
     title="认知陷阱平台API",
     description="提供决策思维训练场景、游戏会话和分析服务，使用真实的逻辑实现（增强版）",
     version="2.0.0",
+    lifespan=lifespan,
 )
 
 # 配置CORS中间件
@@ -165,11 +137,9 @@ app.add_middleware(
 
 # 注册全局异常处理器
 app.add_exception_handler(Exception, global_exception_handler)
+app.add_exception_handler(CustomException, custom_exception_handler)
 
 # 场景数据 - 统一的场景结构，支持多难度级别
-import os
-import json
-
 # 基础场景定义
 BASE_SCENARIOS = [
     {
@@ -296,9 +266,9 @@ def load_additional_scenarios():
                         "thumbnail": "",
                         "advancedChallenges": []
                     })
-            print(f"✅ 加载了 {len(data.get('game_scenarios', []))} 个游戏场景")
+            logger.info("加载游戏场景", extra={"count": len(data.get('game_scenarios', []))})
     except Exception as e:
-        print(f"❌ 加载游戏场景失败: {e}")
+        logger.error(f"加载游戏场景失败: {e}")
 
     # 加载高级游戏场景
     try:
@@ -321,9 +291,9 @@ def load_additional_scenarios():
                         "thumbnail": "",
                         "advancedChallenges": []
                     })
-            print(f"✅ 加载了 {len(data.get('game_scenarios', []))} 个高级游戏场景")
+            logger.info("加载高级游戏场景", extra={"count": len(data.get('game_scenarios', []))})
     except Exception as e:
-        print(f"❌ 加载高级游戏场景失败: {e}")
+        logger.error(f"加载高级游戏场景失败: {e}")
 
     # 加载历史案例
     try:
@@ -346,93 +316,78 @@ def load_additional_scenarios():
                         "thumbnail": "",
                         "advancedChallenges": []
                     })
-            print(f"✅ 加载了 {len(data.get('historical_cases', []))} 个历史案例")
+            logger.info("加载历史案例", extra={"count": len(data.get('historical_cases', []))})
     except Exception as e:
-        print(f"❌ 加载历史案例失败: {e}")
+        logger.error(f"加载历史案例失败: {e}")
 
-    print(f"📊 总共加载了 {len(additional)} 个额外场景")
+    logger.info("额外场景加载完成", extra={"count": len(additional)})
     return additional
 
-# 合并所有场景
-SCENARIOS = BASE_SCENARIOS + load_additional_scenarios()
-print(f"🎯 场景总数: {len(SCENARIOS)}")
-
-# 游戏会话存储
-game_sessions = {}
-
-# 导入并注册认知测试端点
-try:
-    from endpoints.cognitive_tests import router as cognitive_tests_router
-
-    app.include_router(cognitive_tests_router)
-except ImportError:
-    print("认知测试端点不可用")
-
-# 导入并注册场景端点
-try:
-    from endpoints.scenarios import router as scenarios_router
+# 合并所有场景：额外场景在生命周期启动钩子中加载，导入阶段只包含基础场景
+SCENARIOS = list(BASE_SCENARIOS)
 
-    app.include_router(scenarios_router)
-    print("✓ 场景端点已注册")
-except ImportError as e:
-    print(f"场景端点不可用: {e}")
 
-# 导入并注册测试结果端点
-try:
-    from endpoints.test_results import router as test_results_router
-
-    app.include_router(test_results_router)
-except ImportError:
-    print("测试结果端点不可用")
-
-# 导入并注册互动式认知测试端点（新增 LLM 集成）
-# 使用动态导入方法以确保在部署环境中正常工作
-import sys
-import os
-import importlib.util
-
-# 获取当前文件的目录
-current_dir = os.path.dirname(os.path.abspath(__file__))
-
-# 构建endpoints.interactive模块的完整路径
-interactive_path = os.path.join(current_dir, 'endpoints', 'interactive.py')
-
-if os.path.exists(interactive_path):
+def include_router_from(module_name: str, label: str) -> bool:
+    """导入模块并注册其 router，导入耗时计入启动报告"""
     try:
-        # 动态加载模块
-        spec = importlib.util.spec_from_file_location("interactive", interactive_path)
-        interactive_module = importlib.util.module_from_spec(spec)
-        sys.modules["interactive"] = interactive_module  # 注册到sys.modules
-        spec.loader.exec_module(interactive_module)
-        
-        # 获取并注册路由
-        if hasattr(interactive_module, 'router'):
-            interactive_router = interactive_module.router
-            app.include_router(interactive_router)
-            print("✓ LLM互动式端点已注册")
-        else:
-            print("✗ LLM互动式端点不可用: 模块中没有找到router")
+        with startup_profiler.phase(f"import:{module_name}"):
+            module = importlib.import_module(module_name)
     except Exception as e:
-        print(f"✗ LLM互动式端点不可用: {e}")
-        print("⚠️  LLM互动功能将不可用，但核心功能正常")
-else:
-    print("✗ LLM互动式端点不可用: 文件不存在", interactive_path)
-    print("⚠️  LLM互动功能将不可用，但核心功能正常")
-
-# 确保所需导入存在
-try:
-    from pydantic import BaseModel
-    from typing import Optional, List, Dict, Any, Union
-    import json
-    import math
-    import random
-    from datetime import datetime
-    import uvicorn
-    from fastapi import FastAPI, HTTPException, Query
-    from fastapi.middleware.cors import CORSMiddleware
-except ImportError as e:
-    print(f"必要的依赖未找到: {e}")
-    exit(1)
+        logger.warning(f"{label}不可用: {e}")
+        return False
+
+    app.include_router(module.router)
+    return True
+
+
+# 核心路由在导入阶段注册，保证路由顺序先于兜底路由
+include_router_from("endpoints.cognitive_tests", "认知测试端点")
+include_router_from("endpoints.scenarios", "场景端点")
+include_router_from("endpoints.test_results", "测试结果端点")
+include_router_from("endpoints.cohort_analysis", "群体决策分析端点")
+include_router_from("endpoints.historical_cases", "历史案例决策端点")
+include_router_from("endpoints.jobs", "后台任务端点")
+
+# 可选路由（如 LLM 互动式端点）依赖较重，延迟到启动钩子中加载
+# 可通过环境变量 OPTIONAL_ROUTERS 调整，逗号分隔，留空表示全部禁用
+OPTIONAL_ROUTERS = {
+    "interactive": ("endpoints.interactive", "LLM互动式端点"),
+}
+
+
+def _enabled_optional_routers() -> List[str]:
+    """读取启用的可选路由名称"""
+    configured = os.getenv("OPTIONAL_ROUTERS", ",".join(OPTIONAL_ROUTERS))
+    return [name.strip() for name in configured.split(",") if name.strip() in OPTIONAL_ROUTERS]
+
+
+def _include_router_before_fallback(router) -> None:
+    """注册路由并将兜底路由移回末尾，避免被 /{full_path:path} 遮挡"""
+    app.include_router(router)
+    routes = app.router.routes
+    fallback = [r for r in routes if getattr(r, "path", None) == "/{full_path:path}"]
+    for route in fallback:
+        routes.remove(route)
+        routes.append(route)
+    app.openapi_schema = None
+
+
+async def load_optional_routers() -> None:
+    """在线程池中导入可选路由模块，避免阻塞事件循环"""
+    for name in _enabled_optional_routers():
+        module_name, label = OPTIONAL_ROUTERS[name]
+        started = asyncio.get_running_loop().time()
+        try:
+            module = await asyncio.to_thread(importlib.import_module, module_name)
+            _include_router_before_fallback(module.router)
+            startup_profiler.record(f"import:{module_name}",
+                                    (asyncio.get_running_loop().time() - started) * 1000,
+                                    kind="optional_router")
+        except Exception as e:
+            startup_profiler.record(f"import:{module_name}",
+                                    (asyncio.get_running_loop().time() - started) * 1000,
+                                    kind="optional_router", status="failed", detail=str(e))
+            logger.warning(f"{label}不可用，核心功能不受影响: {e}")
 
 
 @app.get("/health")
@@ -446,21 +401,18 @@ async def health():
     }
 
 
+@app.get("/health/startup")
+async def startup_report():
+    """冷启动报告：各阶段导入与加载耗时"""
+    return startup_profiler.report()
+
+
 @app.get("/scenarios/")
 async def get_scenarios():
     """获取所有认知陷阱场景"""
-    # 从文件加载场景数据以确保使用最新内容
-    try:
-        scenarios_file = os.path.join(os.path.dirname(__file__), 'data', 'scenarios.json')
-        if os.path.exists(scenarios_file):
-            with open(scenarios_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                scenarios = data.get('scenarios', SCENARIOS)
-        else:
-            scenarios = SCENARIOS
-    except Exception as e:
-        print(f"加载场景数据文件失败: {e}")
-        scenarios = SCENARIOS
+    # 场景文件在启动时预加载，请求中直接读取内存副本
+    data = await data_repository.load_json('scenarios.json')
+    scenarios = data.get('scenarios', SCENARIOS) if data else SCENARIOS
     
     return {"scenarios": scenarios}
 
@@ -474,140 +426,159 @@ async def get_scenario(scenario_id: str):
     return scenario
 
 
+# 反馈中状态字段的中文名
+STATE_LABELS = {"satisfaction": "满意度", "resources": "资源", "reputation": "声誉", "knowledge": "知识"}
+
+
+def _token_scenario_variant(scenario_id: str, difficulty: str) -> Dict[str, Any]:
+    """令牌会话所用的场景变体"""
+    scenario = next((s for s in SCENARIOS if s["id"] == scenario_id), None)
+    if not scenario:
+        raise HTTPException(status_code=404, detail="场景未找到")
+    return game_session_service.scenario_variant(scenario, difficulty)
+
+
+def _attach_session_token(response: Dict[str, Any], session) -> None:
+    """签发下一回合的令牌；超过大小上限时会话转为服务端存储"""
+    token = encode_token(session)
+    if len(token) > SESSION_TOKEN_MAX_BYTES:
+        logger.info("会话令牌超过大小上限，转为服务端会话", extra={"game_id": session.game_id, "size": len(token)})
+        game_session_service.adopt(session)
+        response["session_mode"] = "server"
+        return
+    response["session_mode"] = "token"
+    response["session_token"] = token
+
+
 @app.post("/scenarios/create_game_session")
 async def create_game_session(
     scenario_id: str = Query(..., alias="scenario_id"),
     difficulty: str = Query(
         "auto", description="难度级别: beginner, intermediate, advanced, 或 auto"
     ),
+    stateless: bool = Query(
+        False, description="无状态模式：返回签名的会话令牌，服务端不保存会话"
+    ),
 ):
     """创建游戏会话，支持不同难度级别"""
     scenario = next((s for s in SCENARIOS if s["id"] == scenario_id), None)
     if not scenario:
         raise HTTPException(status_code=404, detail="场景未找到")
 
-    # 根据难度参数调整场景
-    selected_scenario = scenario.copy()
-
-    if difficulty != "auto":
-        # 如果指定了具体难度，查找对应的高级挑战内容
-        if difficulty != scenario["difficulty"]:
-            # 在高级挑战中查找匹配难度的挑战
-            matching_challenge = None
-            if "advancedChallenges" in scenario:
-                for challenge in scenario["advancedChallenges"]:
-                    if challenge["difficulty"] == difficulty:
-                        matching_challenge = challenge
-                        break
-
-            if matching_challenge:
-                # 用高级挑战的信息更新场景
-                selected_scenario["name"] = (
-                    f"{scenario['name']} - {matching_challenge['title']}"
-                )
-                selected_scenario["description"] = matching_challenge["description"]
-                selected_scenario["targetPatterns"] = matching_challenge[
-                    "decisionPatterns"
-                ]
-                selected_scenario["decisionPattern"] = ", ".join(
-                    matching_challenge["decisionPatterns"]
-                )
-
-    # 生成会话ID
-    session_id = (
-        f"session_{int(datetime.now().timestamp())}_{random.randint(1000, 9999)}"
-    )
-
-    # 根据难度初始化不同的游戏状态（增强版：包含决策历史）
-    initial_state = {
-        "resources": 1000,  # 初始资源
-        "satisfaction": 50,  # 客户满意度
-        "reputation": 50,  # 声誉
-        "knowledge": 0,  # 知识水平
-        "turn_number": 1,  # 回合数
-        "difficulty": difficulty
-        if difficulty != "auto"
-        else selected_scenario["difficulty"],  # 记录难度
-        "challenge_type": "base"
-        if difficulty == "auto" or difficulty == scenario["difficulty"]
-        else "advanced",  # 挑战类型
-        # ===== 增强字段：决策历史和认知偏误追踪 =====
-        "decision_history": [],  # 决策历史: [{"turn": 1, "decision": {...}, "result": {...}}]
-        "detected_biases": [],  # 检测到的认知偏误: [{"turn": 2, "bias": "过度自信", "evidence": "..."}]
-        "user_patterns": {  # 用户决策模式
-            "risk_preference": None,
-            "pace_preference": None,
-            "decision_style": None
-        }
-    }
-
-    # 存储会话（增强版）
-    game_sessions[session_id] = {
-        "session_id": session_id,
-        "scenario_id": scenario_id,
-        "scenario": selected_scenario,  # 使用可能已调整的场景
-        "turn": 1,
-        "game_state": initial_state,
-        "created_at": datetime.now().isoformat(),
-        "history": [],
-        "difficulty": difficulty
-        if difficulty != "auto"
-        else selected_scenario["difficulty"],
-        # ===== 增强字段 =====
-        "pattern_tracker": DecisionPatternTracker(),  # 每个会话独立的追踪器
-        "decision_count": 0,
-    }
+    try:
+        # 每个会话独立的决策模式追踪器
+        build = game_session_service.build if stateless else game_session_service.create
+        session = build(scenario, difficulty, pattern_tracker=DecisionPatternTracker())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return {
+    response = {
         "success": True,
-        "game_id": session_id,
+        "game_id": session.game_id,
         "message": f"游戏会话已创建",
-        "difficulty": initial_state["difficulty"],
-        "challenge_type": initial_state["challenge_type"],
+        "difficulty": session.difficulty,
+        "challenge_type": session.challenge_type,
+        "session_mode": "server",
     }
+    if stateless:
+        _attach_session_token(response, session)
+    return response
 
 
 @app.post("/scenarios/{game_id}/turn")
-async def execute_turn(game_id: str, decisions: Dict[str, Any]):
+async def execute_turn(
+    game_id: str,
+    decisions: Dict[str, Any],
+    session_token: Optional[str] = Header(None, alias="X-Session-Token"),
+):
     """执行游戏回合（增强版：决策追踪+困惑时刻+个性化反馈）"""
-    if game_id not in game_sessions:
-        raise HTTPException(status_code=404, detail="游戏会话未找到")
+    if session_token:
+        # 无状态模式：会话来自客户端携带的令牌
+        session = decode_token(session_token, game_id, _token_scenario_variant)
+        # 每个令牌只能推进一个回合（登记可能是共享存储，放到线程中执行）
+        claimed_turn = session.state.turn_number
+        await asyncio.to_thread(replay_guard.claim, game_id, claimed_turn)
+        try:
+            response = await play_turn(session, decisions)
+        except Exception:
+            await asyncio.to_thread(replay_guard.release, game_id, claimed_turn)
+            raise
+    else:
+        session = game_session_service.get(game_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="游戏会话未找到")
+        response = await play_turn(session, decisions)
 
-    session = game_sessions[game_id]
-    scenario_id = session["scenario_id"]
-    current_state = session["game_state"].copy()
-    difficulty = session.get("difficulty", "beginner")  # 获取难度级别
+    if session_token:
+        _attach_session_token(response, session)
+    return response
 
-    # ===== 增强功能：追踪决策模式 =====
-    pattern_tracker = session.get("pattern_tracker")
-    if pattern_tracker:
-        pattern_tracker.track_decision(scenario_id, decisions, current_state)
 
-    # 根据场景类型和难度执行真实的逻辑处理
-    new_state = execute_real_logic(
-        scenario_id, current_state, decisions, difficulty=difficulty
+@app.get("/scenarios/{scenario_id}/policy")
+async def get_scenario_policy(
+    scenario_id: str,
+    difficulty: Optional[str] = Query(None, description="难度级别，默认为场景自身难度"),
+    horizon: int = Query(5, ge=1, description="回合数"),
+):
+    """场景在给定回合数下的最优与最差决策序列（预计算结果）"""
+    scenario = next((s for s in SCENARIOS if s["id"] == scenario_id), None)
+    if not scenario:
+        raise HTTPException(status_code=404, detail="场景未找到")
+    result = policy_table.get(scenario_id, difficulty or scenario["difficulty"], horizon)
+    if result is None:
+        raise HTTPException(status_code=404, detail="该场景、难度和回合数的最优策略尚未计算")
+    return {"success": True, "scenario_id": scenario_id, **result.as_dict()}
+
+
+class WhatIfRequest(BaseModel):
+    turn: int
+    decisions: List[Dict[str, Any]]
+    follow_original: bool = True
+
+
+@app.post("/scenarios/{game_id}/what-if")
+async def what_if_turn(game_id: str, request: WhatIfRequest):
+    """反事实推演：从第 turn 回合起换用其他决策，返回与原对局分叉后的轨迹（不影响原会话）"""
+    session = game_session_service.get(game_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="游戏会话未找到")
+    try:
+        result = what_if(game_session_service, session, request.turn, request.decisions,
+                         execute_real_logic, follow_original=request.follow_original)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, **result}
+
+
+@app.websocket("/ws/games/{game_id}")
+async def game_channel(websocket: WebSocket, game_id: str, resume_from: Optional[int] = None):
+    """游戏回合 WebSocket 通道：连接时解析一次会话，之后决策与回合结果都在同一连接上收发"""
+    await serve_game_channel(
+        websocket, game_id, game_session_service.get, play_turn,
+        game_session_service.state_view, resume_from=resume_from
     )
 
-    # 更新回合数
-    new_state["turn_number"] = current_state["turn_number"] + 1
 
-    # ===== 增强功能：记录决策历史 =====
-    decision_record = {
-        "turn": current_state["turn_number"],
-        "decisions": decisions,
-        "result_state": new_state.copy(),
-        "difficulty": difficulty,
-        "timestamp": datetime.now().isoformat()
-    }
-    new_state["decision_history"] = current_state.get("decision_history", []) + [decision_record]
+async def play_turn(session, decisions: Dict[str, Any]) -> Dict[str, Any]:
+    """执行一个回合并生成反馈，HTTP 接口与 WebSocket 通道共用；随机结果由会话种子和回合数决定"""
+    game_id = session.game_id
+    scenario_id = session.scenario_id
+    difficulty = session.difficulty
 
-    # 更新会话状态
-    session["game_state"] = new_state
-    session["turn"] += 1
-    session["decision_count"] = session.get("decision_count", 0) + 1
+    # 根据场景类型和难度执行真实的逻辑处理，决策记录追加到会话历史
+    current_state, new_state = game_session_service.advance(
+        session, decisions, execute_real_logic,
+        rng=turn_rng(session.seed, session.state.turn_number),
+        effects=game_session_service.effects_for(session),
+    )
 
-    # 记录历史
-    session["history"].append(decision_record)
+    # ===== 增强功能：追踪决策模式 =====
+    pattern_tracker = session.pattern_tracker
+    if pattern_tracker:
+        pattern_tracker.track_decision(scenario_id, decisions, current_state)
+
+    await decisions_writer.submit(make_decision_row(
+        game_id, scenario_id, difficulty, current_state["turn_number"], decisions, new_state))
 
     # ===== 增强功能：生成个性化反馈 =====
     # 第1-2回合：制造困惑（只给结果，不揭示模式）
@@ -619,44 +590,61 @@ async def execute_turn(game_id: str, decisions: Dict[str, Any]):
         # 早期回合：制造困惑时刻
         feedback = generate_confusion_feedback(
             scenario_id, decisions, current_state, new_state,
-            decision_history=new_state.get("decision_history", []),
+            decision_history=session.history,
             turn_number=turn_number
         )
     elif turn_number == 3:
         # 第3回合：分析决策模式
-        pattern_detected = detect_decision_pattern(
-            scenario_id, new_state.get("decision_history", [])
-        )
+        pattern_detected = detect_decision_pattern(scenario_id, session.history)
         if pattern_detected:
-            new_state["detected_patterns"] = current_state.get("detected_patterns", []) + [pattern_detected]
+            game_session_service.record_pattern(session, pattern_detected)
             cross_scenario_analyzer.record_pattern(scenario_id, pattern_detected["pattern_type"])
 
         feedback = generate_pattern_analysis_feedback(
             scenario_id, decisions, current_state, new_state,
-            decision_history=new_state.get("decision_history", []),
+            decision_history=session.history,
             pattern_detected=pattern_detected
         )
     else:
         # 后续回合：个性化深入反馈
         feedback = generate_advanced_feedback(
             scenario_id, decisions, current_state, new_state,
-            decision_history=new_state.get("decision_history", []),
+            decision_history=session.history,
             pattern_tracker=pattern_tracker,
             turn_number=turn_number
         )
 
+    # 与同样回合数下最优结果的差距（查预计算表）
+    regret = policy_table.regret(scenario_id, difficulty, new_state["turn_number"] - 1, new_state)
+    if regret is not None and turn_number > 3:
+        feedback += feedback_catalog.section(
+            "regret", score=regret["score"], horizon=regret["horizon"], best_score=regret["best_score"],
+            worst_score=regret["worst_score"], regret=regret["regret"])
+
+    # 本回合兑现的延迟效果
+    delayed_effects = session.effects.last_applied if session.effects is not None else []
+    if delayed_effects:
+        feedback += feedback_catalog.section("delayed_effects", items="；".join(
+            feedback_catalog.section(
+                "delayed_effect_item", source=effect["source"] or "早前决策",
+                target=STATE_LABELS.get(effect["target"], effect["target"]), amount=effect["amount"])
+            for effect in delayed_effects
+        ))
+
+    game_state = game_session_service.state_view(session)
+
     # 立即响应机制，增加用户交互反馈
     immediate_response = {
         "status": "processed",
         "turnNumber": new_state["turn_number"],
         "feedback": feedback,
-        "game_state": new_state,
+        "game_state": game_state,
         "immediate_acknowledgment": True,
         "processing_time_ms": 100,
         "user_interaction_response": "您的决策已记录，正在计算结果...",
         "difficulty": difficulty,
         # ===== 增强字段 =====
-        "decision_count": session.get("decision_count", 0),
+        "decision_count": new_state["turn_number"] - 1,
         "has_personalized_insight": turn_number >= 3,
     }
 
@@ -664,17 +652,60 @@ async def execute_turn(game_id: str, decisions: Dict[str, Any]):
         "success": True,
         "turnNumber": new_state["turn_number"],
         "feedback": feedback,
-        "game_state": new_state,
+        "game_state": game_state,
         "immediate_response": immediate_response,
         "difficulty": difficulty,
+        "delayed_effects": delayed_effects,
+        "regret": regret,
     }
 
 
+# 各场景的决策空间（与 execute_real_logic 的分支对应），供最优策略求解
+_OPTION_DECISIONS = [{"option": option} for option in ("1", "2", "3", "4")]
+SCENARIO_DECISION_SPACES: Dict[str, List[Dict[str, Any]]] = {
+    "coffee-shop-linear-thinking": (
+        [{"action": "hire_staff", "amount": n} for n in (1, 3, 6)]
+        + [{"action": "marketing", "amount": n} for n in (100, 300, 600)]
+        + [{"action": "supply_chain", "amount": n} for n in (100, 300, 600)]
+    ),
+    "relationship-time-delay": (
+        [{"action": "communication", "amount": n} for n in (2, 5, 10)]
+        + [{"action": "gift", "amount": n} for n in (50, 100, 200)]
+    ),
+    "investment-confirmation-bias": (
+        [{"action": "research", "amount": n} for n in (1, 3, 5)]
+        + [{"action": "diversify", "amount": n} for n in (100, 200, 500)]
+    ),
+    **{scenario_id: _OPTION_DECISIONS for scenario_id in ("game-001", "game-002", "game-003",
+                                                          "adv-game-001", "adv-game-002", "adv-game-003")},
+    "hist-001": [{"decision": "launch"}, {"decision": "delay"}],
+    "hist-002": [{"decision": "fast_route"}, {"decision": "safe_route"}],
+    "hist-003": [{"decision": "covert"}, {"decision": "full_support"}],
+}
+
+
+def policy_targets() -> List[tuple]:
+    """需要预计算最优策略的 (场景ID, 难度)：已加载场景的默认难度及其高级挑战难度"""
+    targets = []
+    for scenario in SCENARIOS:
+        if scenario["id"] not in SCENARIO_DECISION_SPACES:
+            continue
+        difficulties = [scenario["difficulty"]] + [c["difficulty"] for c in scenario.get("advancedChallenges", [])]
+        targets.extend((scenario["id"], difficulty) for difficulty in dict.fromkeys(difficulties))
+    return targets
+
+
 def execute_real_logic(
-    scenario_id: str, current_state: Dict, decisions: Dict, difficulty: str = "beginner"
+    scenario_id: str, current_state: Dict, decisions: Dict, difficulty: str = "beginner",
+    rng: Optional[random.Random] = None, effects: Optional[DelayedEffectQueue] = None
 ) -> Dict:
-    """执行真实的业务逻辑，支持不同难度级别"""
+    """
+    执行真实的业务逻辑，支持不同难度级别；rng 提供随机结果（按会话种子和回合确定，见 turn_rng），
+    effects 为会话的延迟效果队列，几回合后才显现的效果登记到其中，由会话服务在到期回合应用
+    """
+    rng = rng or random
     new_state = current_state.copy()
+    turn = current_state["turn_number"]
 
     # 根据不同场景和难度执行逻辑
     if scenario_id == "coffee-shop-linear-thinking":
@@ -829,6 +860,8 @@ def execute_real_logic(
                 new_state["satisfaction"] = min(
                     100, new_state["satisfaction"] + immediate_effect
                 )
+                if effects is not None:
+                    effects.schedule("satisfaction", amount / 40, due_turn=turn + 2, source="礼物")
 
         elif difficulty in ["intermediate", "advanced"]:
             if action == "communication":
@@ -846,6 +879,10 @@ def execute_real_logic(
                     if "relationship_investment" not in new_state:
                         new_state["relationship_investment"] = 0
                     new_state["relationship_investment"] += long_term_value
+                    # 长期价值两回合后开始兑现，之后逐回合减半
+                    if effects is not None:
+                        effects.schedule("satisfaction", long_term_value, due_turn=turn + 2,
+                                         kernel=DECAY, rate=0.5, repeats=3, source="沟通投入")
 
                 elif difficulty == "advanced":
                     # 高级难度：复杂关系网络和级联效应
@@ -855,16 +892,13 @@ def execute_real_logic(
                         100, new_state["satisfaction"] + immediate_effect
                     )
 
-                    # 长期关系复利效应
+                    # 长期关系复利效应：本次投入三回合后开始产生收益，之后每回合增长 10%
                     if "relationship_investment" not in new_state:
                         new_state["relationship_investment"] = 0
-                    # 复利效应：之前的投资现在开始产生收益
-                    previous_investments_return = (
-                        new_state["relationship_investment"] * 0.1
-                    )
-                    new_state["satisfaction"] = min(
-                        100, new_state["satisfaction"] + previous_investments_return
-                    )
+                    new_state["relationship_investment"] += amount
+                    if effects is not None:
+                        effects.schedule("satisfaction", amount * 0.1, due_turn=turn + 3,
+                                         kernel=COMPOUND, rate=0.1, repeats=4, source="关系网络复利")
 
             elif action == "gift":
                 new_state["resources"] -= amount
@@ -880,6 +914,9 @@ def execute_real_logic(
                     if "gift_investment" not in new_state:
                         new_state["gift_investment"] = 0
                     new_state["gift_investment"] += amount * 0.05  # 礼物投资的长期价值
+                    if effects is not None:
+                        effects.schedule("satisfaction", amount * 0.05, due_turn=turn + 3,
+                                         kernel=DECAY, rate=0.7, repeats=3, source="礼物")
 
                 elif difficulty == "advanced":
                     # 高级难度：复杂关系网络效应
@@ -1059,8 +1096,7 @@ def execute_real_logic(
             new_state["satisfaction"] = max(0, new_state["satisfaction"] - 10)
 
         elif option == "3":  # 投资股票
-            import random
-            new_state["resources"] = int(new_state["resources"] * (1 + random.uniform(-0.3, 0.5)))
+            new_state["resources"] = int(new_state["resources"] * (1 + rng.uniform(-0.3, 0.5)))
 
         else:  # 指数基金
             new_state["resources"] = int(new_state["resources"] * 1.07)
@@ -1161,16 +1197,109 @@ def execute_real_logic(
     return new_state
 
 
+# ===== 后台任务：最优策略预计算与蒙特卡洛模拟 =====
+
+MONTE_CARLO_MAX_RUNS = 100000
+MONTE_CARLO_MAX_TURNS = 50
+# 每个进程池片段模拟的局数，进度与取消按片段生效
+MONTE_CARLO_CHUNK = 1000
+MONTE_CARLO_PERCENTILES = (5, 25, 50, 75, 95)
+MONTE_CARLO_BINS = 10
+
+
+def _int_param(params: Dict[str, Any], name: str, default: int, low: int, high: int) -> int:
+    value = params.get(name, default)
+    if not isinstance(value, int) or isinstance(value, bool) or not low <= value <= high:
+        raise ValueError(f"{name} 必须是 {low} 到 {high} 之间的整数")
+    return value
+
+
+def _scenario_job_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """校验场景与难度，难度默认为场景自身难度"""
+    scenario_id = params.get("scenario_id")
+    scenario = next((s for s in SCENARIOS if s["id"] == scenario_id), None)
+    if scenario is None or scenario_id not in SCENARIO_DECISION_SPACES:
+        raise ValueError(f"场景不存在或没有决策空间: {scenario_id}")
+    difficulty = params.get("difficulty") or scenario["difficulty"]
+    if difficulty not in ("beginner", "intermediate", "advanced"):
+        raise ValueError(f"未知的难度: {difficulty}")
+    return {"scenario_id": scenario_id, "difficulty": difficulty}
+
+
+def _validate_policy_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {**_scenario_job_params(params),
+            "max_horizon": _int_param(params, "max_horizon", POLICY_MAX_HORIZON, 1, 2 * POLICY_MAX_HORIZON)}
+
+
+def _validate_monte_carlo_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        **_scenario_job_params(params),
+        "turns": _int_param(params, "turns", 5, 1, MONTE_CARLO_MAX_TURNS),
+        "runs": _int_param(params, "runs", 1000, 1, MONTE_CARLO_MAX_RUNS),
+        "seed": _int_param(params, "seed", 0, 0, 2 ** 31 - 1),
+    }
+
+
+@job_manager.register("policy_precompute", validate=_validate_policy_job, cache_ttl=24 * 3600,
+                      description="求解场景的最优与最差决策序列并载入最优策略表（scenario_id, difficulty, max_horizon）")
+async def run_policy_job(ctx, params: Dict[str, Any]):
+    scenario_id, difficulty = params["scenario_id"], params["difficulty"]
+    rows = await ctx.run_in_process(solve_policy, execute_real_logic, scenario_id, difficulty,
+                                    SCENARIO_DECISION_SPACES[scenario_id], params["max_horizon"])
+    policy_table.load(scenario_id, difficulty, rows)
+    return {"scenario_id": scenario_id, "difficulty": difficulty, "horizons": len(rows), "results": rows}
+
+
+def _score_distribution(scores: List[float]) -> Dict[str, Any]:
+    """得分的均值、标准差、分位数与等宽直方图（0-100）"""
+    scores = sorted(scores)
+    count = len(scores)
+    mean = sum(scores) / count
+    width = (SCORE_MAX - SCORE_MIN) / MONTE_CARLO_BINS
+    histogram = [0] * MONTE_CARLO_BINS
+    for score in scores:
+        histogram[min(MONTE_CARLO_BINS - 1, int((score - SCORE_MIN) // width))] += 1
+    return {
+        "runs": count,
+        "mean": round(mean, 2),
+        "std": round((sum((score - mean) ** 2 for score in scores) / count) ** 0.5, 2),
+        "min": scores[0],
+        "max": scores[-1],
+        "percentiles": {f"p{p}": scores[min(count - 1, count * p // 100)] for p in MONTE_CARLO_PERCENTILES},
+        "histogram": [
+            {"from": SCORE_MIN + i * width, "to": SCORE_MIN + (i + 1) * width, "count": histogram[i]}
+            for i in range(MONTE_CARLO_BINS)
+        ],
+    }
+
+
+@job_manager.register("monte_carlo", validate=_validate_monte_carlo_job,
+                      description="随机决策的蒙特卡洛模拟，返回最终综合得分分布（scenario_id, difficulty, turns, runs, seed）")
+async def run_monte_carlo_job(ctx, params: Dict[str, Any]):
+    scenario_id, difficulty, runs = params["scenario_id"], params["difficulty"], params["runs"]
+    decisions = SCENARIO_DECISION_SPACES[scenario_id]
+    scores: List[float] = []
+    # 按片段提交到进程池，每个片段使用独立且确定的种子
+    for index, start in enumerate(range(0, runs, MONTE_CARLO_CHUNK)):
+        chunk = min(MONTE_CARLO_CHUNK, runs - start)
+        scores.extend(await ctx.run_in_process(
+            simulate_outcomes, execute_real_logic, scenario_id, difficulty, decisions,
+            params["turns"], chunk, params["seed"] * 1_000_003 + index
+        ))
+        ctx.progress(len(scores), runs, f"已模拟 {len(scores)}/{runs} 局")
+    return {"scenario_id": scenario_id, "difficulty": difficulty, "turns": params["turns"],
+            "seed": params["seed"], "distribution": _score_distribution(scores)}
+
+
 # ===== 增强反馈生成系统 =====
 
-def detect_decision_pattern(scenario_id: str, decision_history: List[Dict]) -> Optional[Dict]:
+def detect_decision_pattern(scenario_id: str, decision_history: List[DecisionRecord]) -> Optional[Dict]:
     """检测用户在决策历史中的模式"""
     if len(decision_history) < 2:
         return None
 
     # 分析决策模式
-    options_chosen = [d.get("decisions", {}).get("option", "") for d in decision_history if "decisions" in d]
-    actions_chosen = [d.get("decisions", {}).get("action", "") for d in decision_history if "decisions" in d]
+    options_chosen = [d.decisions.get("option", "") for d in decision_history]
 
     # 检测连续选择相同类型的激进选项
     if len(options_chosen) >= 2:
@@ -1194,7 +1323,7 @@ def detect_decision_pattern(scenario_id: str, decision_history: List[Dict]) -> O
 
     # 针对特定场景的模式检测
     if "coffee-shop" in scenario_id:
-        amounts = [d.get("decisions", {}).get("amount", 0) for d in decision_history if "decisions" in d]
+        amounts = [d.decisions.get("amount", 0) for d in decision_history]
         if amounts and max(amounts) > 6:
             return {
                 "pattern_type": "高投入决策模式",
@@ -1210,72 +1339,13 @@ def generate_confusion_feedback(
     decisions: Dict,
     old_state: Dict,
     new_state: Dict,
-    decision_history: List[Dict],
+    decision_history: List[DecisionRecord],
     turn_number: int
 ) -> str:
     """生成困惑时刻反馈（第1-2回合）- 只展示结果，不揭示偏误"""
-
-    # 计算变化
-    satisfaction_change = new_state["satisfaction"] - old_state["satisfaction"]
-    resources_change = new_state["resources"] - old_state["resources"]
-
-    # 咖啡店场景的困惑反馈
-    if scenario_id == "coffee-shop-nonlinear-effects":
-        action = decisions.get("action", "")
-        amount = decisions.get("amount", 0)
-
-        if action == "hire_staff":
-            if turn_number == 1 and amount <= 3:
-                return f"""
-你雇了{amount}人，满意度从{old_state['satisfaction']}提升到{new_state['satisfaction']}。
-
-投入{amount}人 → +{satisfaction_change}点满意度
-效果：每人带来{satisfaction_change // amount}点提升
-
-这个结果符合你的预期吗？
-            """
-            elif turn_number == 2 and amount > 3:
-                expected_gain = amount * 8  # 用户可能预期的增长
-                actual_gain = satisfaction_change
-                return f"""
-你雇了{amount}人，期望满意度大幅提升。
-但实际只提升了{actual_gain}点（从{old_state['satisfaction']}到{new_state['satisfaction']}）。
-
-投入{amount}人 → +{actual_gain}点满意度
-效果：每人只带来{actual_gain // amount}点提升
-
-🤔 你是否感到意外？
-投入翻倍（{amount // 2}→{amount}），但效果没有翻倍。
-
-在复杂系统中，效果往往不是简单的线性关系。
-            """
-
-    # game-001的困惑反馈
-    elif scenario_id == "game-001":
-        option = decisions.get("option", "")
-        if option == "1":  # 立即投放市场
-            return f"""
-你选择了立即投放市场抢占先机。
-
-结果：
-- 销量: 超出预期 ✓
-- 质量: 出现问题 ✗
-- 满意度: {old_state['satisfaction']} → {new_state['satisfaction']} ({satisfaction_change:+d})
-- 声誉: {old_state['reputation']} → {new_state['reputation']} ({new_state['reputation'] - old_state['reputation']:+d})
-
-市场反应混合。这个结果符合你的预期吗？
-            """
-
-    # 默认困惑反馈
-    return f"""
-你的决策已执行。
-
-状态变化：
-- 满意度: {old_state['satisfaction']} → {new_state['satisfaction']} ({satisfaction_change:+d})
-- 资源: {old_state['resources']} → {new_state['resources']} ({resources_change:+d})
-
-继续观察后续效果...
-    """
+    slots = feedback_slots(decisions, old_state, new_state)
+    phase = "turn-1" if turn_number <= 1 else "turn-2"
+    return feedback_catalog.render(scenario_id, "beginner", decisions, phase, slots)
 
 
 def generate_pattern_analysis_feedback(
@@ -1283,7 +1353,7 @@ def generate_pattern_analysis_feedback(
     decisions: Dict,
     old_state: Dict,
     new_state: Dict,
-    decision_history: List[Dict],
+    decision_history: List[DecisionRecord],
     pattern_detected: Optional[Dict]
 ) -> str:
     """生成决策模式分析反馈（第3回合）"""
@@ -1295,25 +1365,15 @@ def generate_pattern_analysis_feedback(
     base_feedback = generate_real_feedback(scenario_id, decisions, old_state, new_state, "beginner")
 
     # 添加模式分析
-    pattern_analysis = f"""
-
-🔍 **决策模式分析**
-
-经过{len(decision_history)}回合的观察，系统识别到：
-
-🎯 **识别的决策模式**: {pattern_detected['pattern_type']}
-
-📊 **证据**: {pattern_detected['evidence']}
-
-⚠️ **重要性**: {pattern_detected['significance']}
-
-这是你在当前场景中的决策特点。这种模式不仅在这个场景中出现，
-在你的其他决策中也可能存在类似情况。
-
-继续下一个回合，系统将提供更深入的个性化分析。
-"""
+    pattern_analysis = feedback_catalog.section(
+        "pattern_analysis",
+        turns=len(decision_history),
+        pattern_type=pattern_detected["pattern_type"],
+        evidence=pattern_detected["evidence"],
+        significance=pattern_detected["significance"],
+    )
 
-    return base_feedback + bias_reveal
+    return base_feedback + pattern_analysis
 
 
 def generate_advanced_feedback(
@@ -1321,7 +1381,7 @@ def generate_advanced_feedback(
     decisions: Dict,
     old_state: Dict,
     new_state: Dict,
-    decision_history: List[Dict],
+    decision_history: List[DecisionRecord],
     pattern_tracker: Optional[DecisionPatternTracker],
     turn_number: int
 ) -> str:
@@ -1348,12 +1408,7 @@ def generate_advanced_feedback(
 
     # 添加持续性建议
     if additional_insight:
-        additional_insight += """
-
-✨ **下一步建议**
-继续尝试不同的决策选项，观察结果如何变化。
-系统将持续追踪你的决策模式，提供更深入的洞察。
-"""
+        additional_insight += feedback_catalog.section("next_steps")
 
     return base_feedback + additional_insight if additional_insight else base_feedback
 
@@ -1366,227 +1421,13 @@ def generate_real_feedback(
     new_state: Dict,
     difficulty: str = "beginner",
 ) -> str:
-    """生成基于真实逻辑的反馈，支持不同难度级别"""
-    action = decisions.get("action", "default")
-    amount = decisions.get("amount", 0)
-
-    # 计算变化值
-    satisfaction_change = new_state["satisfaction"] - old_state["satisfaction"]
-    resources_change = new_state["resources"] - old_state["resources"]
-    knowledge_change = new_state["knowledge"] - old_state["knowledge"]
-
-    if scenario_id == "coffee-shop-nonlinear-effects":
-        if action == "hire_staff":
-            if difficulty == "beginner":
-                if amount > 6:
-                    return "您雇佣了过多员工，导致效率下降。在复杂系统中，增加投入并不总是带来同比例回报。"
-                elif amount > 3:
-                    return "您增加了员工数量，但要注意边际效应递减的规律。"
-                else:
-                    return "合理的员工配置提升了客户满意度。"
-            else:  # intermediate/advanced
-                if amount > 6:
-                    basic_feedback = "您雇佣了过多员工，导致效率下降。"
-                    if difficulty == "intermediate":
-                        additional_feedback = (
-                            "在商业管理中，人员配置需要考虑非线性效应。"
-                        )
-                    else:  # advanced
-                        additional_feedback = "复杂系统中，过多人力资源可能引发协调成本指数增长，这是连锁故障的常见原因。"
-                    return basic_feedback + " " + additional_feedback
-                elif amount > 3:
-                    return "您增加了员工数量，但要注意边际效应递减的规律。在高级管理中，协调成本会随人员增加而快速上升。"
-                else:
-                    return "合理的员工配置提升了客户满意度。在复杂系统中，适度的人力配置能带来最优效果。"
-        elif action == "marketing":
-            if difficulty == "beginner":
-                if amount > 500:
-                    return "大量营销投入带来了饱和效应，收益递减明显。"
-                else:
-                    return "适度的营销投入有效提升了客户满意度。"
-            else:  # intermediate/advanced
-                if amount > 500:
-                    basic_feedback = "大量营销投入带来了饱和效应，收益递减明显。"
-                    if difficulty == "intermediate":
-                        additional_feedback = (
-                            "此外，营销投资需要考虑通胀调整后的实际价值。"
-                        )
-                    else:  # advanced
-                        additional_feedback = "在网络效应下，营销影响力可能呈指数增长，但过度营销可能导致品牌稀释。"
-                    return basic_feedback + " " + additional_feedback
-                else:
-                    return "适度的营销投入有效提升了客户满意度。在高难度下，营销效果可能因网络效应而放大。"
-        elif action == "supply_chain" and difficulty in ["intermediate", "advanced"]:
-            # 供应链管理的反馈
-            supply_investment = amount
-            if supply_investment > 100 and difficulty == "advanced":
-                return "庞大的供应链投资可能触发网络效应，带来指数级收益，但也增加系统性风险。复杂系统中的网络效应体现了指数增长思维。"
-            else:
-                return "供应链管理体现了复杂系统思维。在中级难度下，协调成本随网络规模平方增长；在高级难度下，可能存在网络效应的指数收益。"
-
-    elif scenario_id == "relationship-time-delay":
-        if action == "communication":
-            if difficulty == "beginner":
-                return "沟通是关系维护的基础，但要注意效果的延迟性。"
-            else:  # intermediate/advanced
-                if difficulty == "intermediate":
-                    return "沟通是关系维护的基础，但要注意效果的延迟性。长期关系投资具有复利效应，早期投入会在后期产生更大回报。"
-                else:  # advanced
-                    return "沟通不仅影响直接关系，还会在网络中产生级联效应。复杂关系网络中的投资具有复利和网络双重效应。"
-        elif action == "gift":
-            if difficulty == "beginner":
-                return "礼物能带来即时的好感，但长期关系需要更多投入。"
-            else:  # intermediate/advanced
-                if difficulty == "intermediate":
-                    return "礼物能带来即时的好感，但长期关系需要更多投入。关系投资具有复利效应，今天的投入会影响未来的回报。"
-                else:  # advanced
-                    return "礼物不仅影响直接关系，还会在社交网络中产生涟漪效应。复杂关系网络中，初始投入可能引发指数级的网络效应。"
-
-    elif scenario_id == "investment-confirmation-bias":
-        if action == "research":
-            if difficulty == "beginner":
-                return "研究增加了您的知识储备，但需要注意信息的全面性。"
-            else:  # intermediate/advanced
-                if difficulty == "intermediate":
-                    return "研究增加了您的知识储备，但需要注意信息的全面性。同时，投资的实际价值需要考虑通胀调整。"
-                else:  # advanced
-                    return "研究增加了您的知识储备，但需要注意信息的全面性。金融系统具有复杂性，市场波动和系统性风险需要特别关注。"
-        elif action == "diversify":
-            if difficulty == "beginner":
-                return "分散投资降低了风险，但也限制了潜在收益。"
-            else:  # intermediate/advanced
-                if difficulty == "intermediate":
-                    return "分散投资降低了风险，但也限制了潜在收益。长期投资要考虑复利的时间价值。"
-                else:  # advanced
-                    return "分散投资降低了风险，但需警惕相关性幻觉。在系统性风险下，看似无关的资产可能高度相关。这是投资中的系统性风险。"
-
-    # ===== 新增：为game-001（商业战略推理游戏）添加反馈 =====
-    elif scenario_id == "game-001":
-        option = decisions.get("option", "1")
-        if option == "1":
-            return "你选择了立即投放市场抢占先机。销量超出预期，但出现了少量质量问题报告。\n\n结果：快速上市带来了早期收益，但也暴露了产品质量问题。在商业决策中，'快'与'好'往往需要平衡，过度追求速度可能影响长期声誉。"
-        elif option == "2":
-            return "你选择完善产品后再上市。虽然延迟了上市时间，但产品质量更有保证。\n\n结果：产品质量得到了保障，但错失了早期市场机会。这是一种平衡质量与速度的策略。"
-        elif option == "3":
-            return "你选择收购竞争对手减少竞争。虽然减少了竞争压力，但成本大幅增加。\n\n结果：市场竞争减少，但高额成本可能影响盈利能力。收购整合的复杂性也需要考虑。"
-        else:
-            return "你选择与其他公司合作开发。虽然需要分享利润，但风险共担。\n\n结果：通过合作分散了风险并获得了互补资源，但利润需要分享。这是一种风险分担的策略。"
-
-    # ===== 新增：为game-002（公共政策制定模拟）添加反馈 =====
-    elif scenario_id == "game-002":
-        option = decisions.get("option", "1")
-        if option == "1":
-            return "你选择了建设新地铁线路。虽然成本高，但长期效益显著。\n\n结果：基础设施投资需要平衡短期成本与长期收益。施工期间可能面临公众对扰民的不满，需要做好沟通工作。"
-        elif option == "2":
-            return "你选择扩大公交网络。成本适中，覆盖面广。\n\n结果：渐进式改进可能更适合当前预算和需求，通过多次小步骤优化系统。"
-        elif option == "3":
-            return "你选择征收拥堵费。虽然增加了收入，但引起了公众强烈不满。\n\n结果：政策制定需要平衡经济效益与公众接受度，忽视民众情绪可能影响政策实施效果。"
-        else:
-            return "你选择提供自行车道项目。低成本，环保健康。\n\n结果：低成本方案容易实施，但可能只能解决部分交通问题，需要与其他措施配合。"
-
-    # ===== 新增：为game-003（个人理财决策模拟）添加反馈 =====
-    elif scenario_id == "game-003":
-        option = decisions.get("option", "1")
-        if option == "1":
-            return "你选择立即购买新车提升形象。\n\n结果：即时消费满足了当前需求，但消耗了应急资金，可能让你在意外情况下处于不利地位。"
-        elif option == "2":
-            return "你选择把钱全部存入银行。\n\n结果：资金安全性高，但可能面临通胀侵蚀购买力的风险。保守策略有其优势，但也可能错失增值机会。"
-        elif option == "3":
-            return f"你选择投入股票市场寻求高回报。当前资源：{new_state['resources']}。\n\n结果：高风险高回报，市场波动可能带来较大收益或损失。投资需要考虑风险承受能力。"
-        else:
-            return f"你选择投资低成本指数基金并保留应急资金。当前资源：{new_state['resources']}。\n\n结果：平衡了风险与收益，既保留了应急资金，又参与了市场增值。这是一种稳健的投资策略。"
-
-    # ===== 新增：为hist-001（挑战者号）添加反馈 =====
-    elif scenario_id == "hist-001":
-        decision = decisions.get("decision", "launch")
-        if decision == "delay":
-            return "你选择推迟发射以评估低温风险。\n\n✅ 成功避免灾难！你的决策拯救了7名宇航员的生命。\n\n历史教训：在面对工程警告时，选择谨慎而非进度压力，可以避免悲剧。"
-        else:
-            return "你选择按计划发射。\n\n❌ 灾难发生了！O型环在低温下失效，航天飞机爆炸，7名宇航员遇难。\n\n历史复盘：工程师们警告了O型环在低温下的问题，但管理层选择了忽视警告，坚持发射。"
-
-    # ===== 新增：为hist-002（泰坦尼克号）添加反馈 =====
-    elif scenario_id == "hist-002":
-        decision = decisions.get("decision", "fast_route")
-        if decision == "safe_route":
-            return "你选择传统安全航线，避开冰山区域。\n\n✅ 航行更慢但安全到达，无事故发生。\n\n历史教训：商业考量与安全考量之间的平衡至关重要。"
-        else:
-            return "你选择更快的航线追求速度记录。\n\n❌ 撞上冰山，船只沉没，1500多人丧生。\n\n历史复盘：'永不沉没'的称号让人们对风险估计不足，成功记录可能让人低估失败概率。"
-
-    # ===== 新增：为hist-003（猪湾事件）添加反馈 =====
-    elif scenario_id == "hist-003":
-        decision = decisions.get("decision", "covert")
-        if decision == "full_support":
-            return "你选择提供全面军事支持和空中掩护。\n\n⚠️ 行动成功了，但美国的直接参与暴露无遗，造成外交尴尬。\n\n这是一个两难境地：要么失败（有限支持），要么尴尬（暴露参与）。在复杂决策中，有时候没有完美选项，只有不同类型的代价。"
-        else:
-            return "你选择秘密行动，避免显示美国直接参与。\n\n❌ 行动迅速失败，因为大幅减少了军事支持。\n\n历史复盘：政治考量可能压倒了军事判断，决策过程中可能存在不同意见但未被充分考虑。"
-
-    # ===== 新增：为adv-game-001（全球气候变化政策制定博弈）添加反馈 =====
-    elif scenario_id == "adv-game-001":
-        option = decisions.get("option", "1")
-        if option == "1":
-            return "你制定统一的减排目标对所有国家一视同仁。\n\n结果：发展中国家强烈反对，认为这不公平。在复杂的多方博弈中，看似'公平'的统一标准可能因为各国实际情况不同而变得不公平。"
-        elif option == "2":
-            return "你根据历史累计排放量制定差异化目标。\n\n结果：更符合'共同但有区别的责任'原则。但执行和监督难度大，需要考虑各国实际情况。"
-        elif option == "3":
-            return "你建立碳排放交易市场，允许排放权买卖。\n\n结果：市场化手段提高了效率，但可能成为富国'购买排放权'的工具。需要平衡效率与公平。"
-        else:
-            return "你设定技术转移机制，发达国家支持发展中国家减排。\n\n结果：促进了技术扩散和全球合作，但技术转移的速度和质量需要有效保障。"
-
-    # ===== 新增：为adv-game-002（AI治理与监管决策模拟）添加反馈 =====
-    elif scenario_id == "adv-game-002":
-        option = decisions.get("option", "1")
-        if option == "1":
-            return "你基于任务能力制定AI分级标准。\n\n结果：实用性强，易于理解和执行。但可能忽视安全和可控性维度。需要平衡效率与安全。"
-        elif option == "2":
-            return "你引入安全和可控性作为核心评估维度。\n\n结果：更注重风险防控。但可能抑制创新速度。监管的力度与创新的速度之间存在张力。"
-        elif option == "3":
-            return "你将伦理合规性作为核心评估维度。\n\n结果：符合人类价值观。但'伦理'标准难以统一和量化。不同文化对'伦理'的理解不同，需要考虑多样性。"
-        else:
-            return "你建立AI能力与风险的综合评估框架。\n\n结果：平衡了多个维度。但复杂度高，执行难度大。需要在理论完整性与实践可行性之间找到平衡。"
-
-    # ===== 新增：为adv-game-003（复杂金融市场危机应对模拟）添加反馈 =====
-    elif scenario_id == "adv-game-003":
-        option = decisions.get("option", "1")
-        if option == "1":
-            return "你立即加强金融衍生品监管。\n\n结果：预防性措施，可能在危机前遏制风险。但市场信心可能受影响，需要平衡监管与市场活力。"
-        elif option == "2":
-            return "你提高银行资本充足率要求。\n\n结果：增强银行抗风险能力。但可能限制信贷，影响经济活力。更高的资本要求意味着银行放贷能力下降。"
-        elif option == "3":
-            return "你进行秘密的系统性风险压力测试。\n\n结果：了解真实风险暴露情况。但测试结果可能引发市场恐慌。需要平衡透明度与市场稳定性。"
-        else:
-            return "你加强市场监控，但不采取实质措施。\n\n结果：被动等待，可能错失最佳干预时机。在危机管理中，需要在及时行动与充分信息之间找到平衡。"
-
-    # 默认反馈
-    if satisfaction_change > 10:
-        base_feedback = "您的决策取得了显著成效！"
-    elif satisfaction_change > 0:
-        base_feedback = "您的决策产生了积极影响。"
-    elif satisfaction_change < -10:
-        base_feedback = "这个决策可能需要重新考虑。"
-    else:
-        base_feedback = "决策已执行，正在观察效果。"
-
-    # 根据难度添加深度反馈
-    if difficulty == "intermediate":
-        depth_feedback = " 在中级挑战中，您开始接触时间价值和复利思维的概念。"
-    elif difficulty == "advanced":
-        depth_feedback = (
-            " 在高级挑战中，您面临复杂系统、网络效应和指数增长等高级认知偏差。"
-        )
-    else:
-        depth_feedback = ""
-
-    return base_feedback + depth_feedback
+    """生成基于真实逻辑的反馈，支持不同难度级别；文案见 data/feedback_templates.json"""
+    slots = feedback_slots(decisions, old_state, new_state)
+    return feedback_catalog.render(scenario_id, difficulty, decisions, "result", slots)
 
 
 # 为前端提供静态文件服务（在所有API端点之后定义）
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
-import os
-
-
 # 挂载静态资源目录 - 使用绝对路径
-import os
 _current_dir = os.path.dirname(os.path.abspath(__file__))
 _project_root = os.path.dirname(_current_dir)
 app.mount("/assets", StaticFiles(directory=os.path.join(_project_root, "assets")), name="assets")
@@ -1629,80 +1470,11 @@ async def analyze_thinking_traps(request_data: Dict[str, Any]):
                 "status": "error"
             }
         
-        # 分析决策模式
-        analysis = {
-            "total_decisions": len(game_history),
-            "scenario_id": scenario_id,
-            "identified_patterns": [],
-            "thinking_trap_warnings": [],
-            "improvement_suggestions": []
-        }
-        
-        # 检测决策模式
-        options_chosen = [d.get("decisions", {}).get("option", "") for d in game_history if "decisions" in d]
-        actions_taken = [d.get("decisions", {}).get("action", "") for d in game_history if "decisions" in d]
-        
-        # 检测重复选择相同选项的模式
-        if len(options_chosen) >= 3:
-            unique_options = set(options_chosen)
-            if len(unique_options) == 1:
-                # 用户总是选择相同的选项
-                repeated_option = options_chosen[0]
-                analysis["identified_patterns"].append({
-                    "type": "重复性决策模式",
-                    "description": f"在{len(options_chosen)}次决策中，您总是选择相同的选项 '{repeated_option}'",
-                    "potential_issue": "可能反映出缺乏灵活性或对其他选项的探索不足"
-                })
-        
-        # 检测极端选项选择
-        if "1" in options_chosen:
-            aggressive_choices = options_chosen.count("1")
-            if aggressive_choices >= len(options_chosen) * 0.7:  # 70%以上选择激进选项
-                analysis["thinking_trap_warnings"].append({
-                    "trap_type": "激进决策倾向",
-                    "description": "倾向于选择最激进或最立即的选项",
-                    "impact": "可能导致高风险或短期导向的决策"
-                })
-        
-        # 检测保守选项选择
-        if "2" in options_chosen or "4" in options_chosen:
-            conservative_choices = options_chosen.count("2") + options_chosen.count("4")
-            if conservative_choices >= len(options_chosen) * 0.7:  # 70%以上选择保守选项
-                analysis["thinking_trap_warnings"].append({
-                    "trap_type": "保守决策倾向", 
-                    "description": "倾向于选择最保守或最安全的选项",
-                    "impact": "可能导致错失机会或过度规避风险"
-                })
-        
-        # 提供改进建议
-        if analysis["thinking_trap_warnings"]:
-            analysis["improvement_suggestions"].append({
-                "suggestion": "在未来的决策中，尝试考虑更多样化的选项，避免过度依赖单一决策模式",
-                "rationale": "多样化的决策方法可以帮助识别和克服潜在的思维局限"
-            })
-        else:
-            analysis["improvement_suggestions"].append({
-                "suggestion": "您的决策模式显示出一定的灵活性，继续保持开放的思维",
-                "rationale": "灵活的决策方法有助于在复杂情况下找到最优解决方案"
-            })
-        
-        # 根据场景类型提供特定分析
-        if "coffee-shop" in scenario_id:
-            analysis["improvement_suggestions"].append({
-                "suggestion": "在资源分配决策中，考虑非线性效应和边际收益递减",
-                "rationale": "增加投入并不总是带来线性回报，有时甚至会产生负面效果"
-            })
-        elif "investment" in scenario_id:
-            analysis["improvement_suggestions"].append({
-                "suggestion": "在投资决策中，平衡短期收益与长期影响，考虑复利效应",
-                "rationale": "长期视角有助于识别短期决策的真正影响"
-            })
-        elif "relationship" in scenario_id:
-            analysis["improvement_suggestions"].append({
-                "suggestion": "在关系决策中，注意时间延迟效应，考虑决策的长期后果",
-                "rationale": "关系中的决策效果往往需要时间才能显现"
-            })
-        
+        # 分析决策模式（与按会话分析共用计数逻辑）
+        counters = TrapCounters.from_decisions(d.get("decisions", {}) for d in game_history if "decisions" in d)
+        analysis = thinking_trap_analysis(scenario_id, counters)
+        analysis["total_decisions"] = len(game_history)
+
         return {
             "message": "思维陷阱分析完成",
             "analysis": analysis,
@@ -1717,6 +1489,32 @@ async def analyze_thinking_traps(request_data: Dict[str, Any]):
         }
 
 
+@app.get("/analysis/thinking-traps/{game_id}")
+async def analyze_game_thinking_traps(
+    game_id: str,
+    session_token: Optional[str] = Header(None, alias="X-Session-Token"),
+):
+    """按游戏会话分析思维陷阱：决策计数随回合增量维护，无需上传游戏历史"""
+    if session_token:
+        session = decode_token(session_token, game_id, _token_scenario_variant)
+    else:
+        session = game_session_service.get(game_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="游戏会话未找到")
+
+    counters = game_session_service.trap_counters_for(session)
+    if not counters.total:
+        return {
+            "message": "该游戏会话尚无决策记录",
+            "analysis": {},
+            "status": "error"
+        }
+    return {
+        "message": "思维陷阱分析完成",
+        "analysis": thinking_trap_analysis(session.scenario_id, counters),
+        "status": "success"
+    }
+
 # 临时测试路由
 @app.get("/test-home")
 async def test_home():
@@ -1750,10 +1548,83 @@ async def serve_not_found(full_path: str):
     # 对于其他路径，返回通用404
     raise HTTPException(status_code=404, detail="页面未找到")
 
+# ===== 生命周期钩子 =====
+
+# 生命周期内运行的后台任务，关闭时取消
+background_tasks = []
+
+async def on_startup():
+    """启动钩子：加载数据文件和可选路由，不在模块导入阶段做任何 I/O"""
+    with startup_profiler.phase("load:additional_scenarios", kind="data"):
+        SCENARIOS.extend(await asyncio.to_thread(load_additional_scenarios))
+
+    with startup_profiler.phase("load:data_files", kind="data"):
+        await data_repository.preload(PRELOAD_FILES)
+
+    # 历史案例在加载时编译为步骤/选项表
+    with startup_profiler.phase("compile:historical_cases", kind="data"):
+        for file_name, list_key in HISTORICAL_CASE_SOURCES:
+            historical_decision_engine.load_cases(await data_repository.get_list(file_name, (list_key,)))
+
+    # 恢复上次部署时的活跃游戏会话（场景需已全部加载）
+    with startup_profiler.phase("restore:game_sessions", kind="data"):
+        await session_checkpointer.restore({s["id"]: s for s in SCENARIOS})
+
+    # 打开结果库并从检查点恢复全局聚合值
+    with startup_profiler.phase("load:results_store", kind="data"):
+        await asyncio.to_thread(get_results_store)
+        await asyncio.to_thread(get_progress_tracker)
+    results_writer.start()
+    decisions_writer.start()
+    background_tasks.append(asyncio.create_task(run_cohort_refresh()))
+    background_tasks.append(asyncio.create_task(run_progress_flush()))
+    background_tasks.append(asyncio.create_task(run_session_checkpoints()))
+    # 后台任务：恢复上次未完成的任务；最优策略表以低优先级任务预计算，
+    # 缓存有效期内的结果直接载入，完成前回合响应中的遗憾值为空
+    with startup_profiler.phase("start:job_queue", kind="data"):
+        await job_manager.start()
+        await submit_policy_jobs()
+    background_tasks.append(asyncio.create_task(run_job_cleanup()))
+    await load_optional_routers()
+    startup_profiler.mark_ready()
+
+
+async def submit_policy_jobs():
+    """为每个 (场景, 难度) 提交最优策略预计算任务"""
+    for scenario_id, difficulty in policy_targets():
+        try:
+            job = await job_manager.submit("policy_precompute", {"scenario_id": scenario_id, "difficulty": difficulty},
+                                           priority=MAX_JOB_PRIORITY)
+        except (ValueError, CustomException) as e:
+            logger.warning(f"最优策略预计算任务提交失败: {e}", extra={"scenario_id": scenario_id})
+            continue
+        if job.cached:
+            policy_table.load(scenario_id, difficulty, job.result["results"])
+
+
+async def on_shutdown():
+    """关闭钩子"""
+    data_repository.close()
+    compute_executor.shutdown()
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    await job_manager.stop()
+    try:
+        await session_checkpointer.checkpoint()
+    except Exception as e:
+        logger.error(f"关闭时写入会话检查点失败: {e}")
+    await results_writer.stop()
+    await decisions_writer.stop()
+    close_progress_tracker()
+    close_results_store()
+
+
 if __name__ == "__main__":
     # 优先使用环境变量 PORT（Railway、Render 等云平台）
     # 然后尝试命令行参数，最后使用默认端口 8081
     port = int(os.getenv("PORT", sys.argv[1] if len(sys.argv) > 1 else 8082))
-    print(f"🚀 启动认知陷阱平台API服务器 (端口: {port})")
-    print(f"📊 API文档: http://localhost:{port}/docs")
+    logger.info("启动认知陷阱平台API服务器", extra={"port": port, "docs": f"http://localhost:{port}/docs"})
+    # 只在直接运行时导入，避免应用被导入时加载服务器
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,143 @@
+"""
+计算任务执行器
+按请求估算计算成本：廉价计算直接在事件循环内执行，昂贵计算交给有界进程池并限时，
+超出预算的请求直接拒绝，避免单个大数运算阻塞所有请求
+"""
+import asyncio
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from utils.error_handlers import CustomException
+
+logger = logging.getLogger(__name__)
+
+# 成本单位：结果的近似十进制位数
+INLINE_COST_LIMIT = int(os.getenv("COMPUTE_INLINE_COST", "5000"))
+MAX_COST = int(os.getenv("COMPUTE_MAX_COST", "2000000"))
+DEFAULT_TIMEOUT = float(os.getenv("COMPUTE_TIMEOUT", "5"))
+DEFAULT_WORKERS = int(os.getenv("COMPUTE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+def estimate_power_cost(base: Any, exponent: Any) -> float:
+    """估算 base ** exponent 的成本（结果位数）；非整数运算走浮点，成本视为常数"""
+    try:
+        if not isinstance(base, int) or not isinstance(exponent, int) or exponent <= 0:
+            return 1.0
+        if abs(base) <= 1:
+            return 1.0
+        return exponent * math.log10(abs(base))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class ComputeExecutor:
+    """带成本估算的计算执行器"""
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS,
+                 inline_cost_limit: float = INLINE_COST_LIMIT,
+                 max_cost: float = MAX_COST,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.max_workers = max_workers
+        self.inline_cost_limit = inline_cost_limit
+        self.max_cost = max_cost
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # 每个空位对应一个工作进程，工作进程真正结束任务后才释放；等待空位不计入超时
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        return self._slots
+
+    def _recycle_pool(self):
+        """进程池损坏后终止剩余的工作进程并重建进程池"""
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        for process in list(getattr(pool, "_processes", {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, func: Callable, *args, cost: float = 0.0,
+                  timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        按成本执行计算函数
+        - cost <= inline_cost_limit：直接调用
+        - cost > max_cost：拒绝（COMPUTE_BUDGET_EXCEEDED）
+        - 其余：进程池执行，超时返回 COMPUTE_TIMEOUT
+        超时从取得工作进程空位后开始计算；超时的任务在工作进程中算完后丢弃结果，不影响其他请求的任务
+        func 及参数需可被 pickle（模块级函数）
+        """
+        if cost > self.max_cost:
+            raise CustomException(
+                message=f"计算量过大（约{cost:.0f}位数字），超出单次请求允许的上限{self.max_cost}",
+                error_code="COMPUTE_BUDGET_EXCEEDED",
+                status_code=422
+            )
+        if cost <= self.inline_cost_limit:
+            return func(*args, **kwargs)
+
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+
+        slots = self._get_slots()
+        await slots.acquire()
+        try:
+            future = self._get_pool().submit(_call, func, args, kwargs)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: _release_threadsafe(loop, slots))
+
+        try:
+            # 超时取消包装的 asyncio future：尚未开始的任务被撤销，已在运行的任务算完后结果被丢弃
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("计算超时", extra={"func": getattr(func, "__name__", str(func)),
+                                             "cost": round(cost), "timeout_s": timeout})
+            raise CustomException(
+                message=f"计算超过{timeout}秒时间预算，请减小输入规模",
+                error_code="COMPUTE_TIMEOUT",
+                status_code=503
+            )
+        except BrokenProcessPool:
+            self._recycle_pool()
+            raise CustomException(
+                message="计算进程异常退出，请稍后重试",
+                error_code="COMPUTE_WORKER_FAILED",
+                status_code=503
+            )
+
+    def shutdown(self):
+        """关闭进程池"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def _release_threadsafe(loop: asyncio.AbstractEventLoop, slots: asyncio.Semaphore):
+    """池任务结束（在进程池的管理线程中回调）后归还空位"""
+    try:
+        loop.call_soon_threadsafe(slots.release)
+    except RuntimeError:
+        # 事件循环已关闭
+        pass
+
+
+def _call(func: Callable, args: tuple, kwargs: dict) -> Any:
+    """在工作进程中执行的调用入口"""
+    return func(*args, **kwargs)
+
+
+# 全局实例
+compute_executor = ComputeExecutor()
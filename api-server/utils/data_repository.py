@@ -0,0 +1,128 @@
+"""
+异步数据访问层
+JSON 数据文件只在首次访问（或启动预加载）时通过线程池读取解析，之后直接从内存返回，
+请求处理函数中不再出现阻塞事件循环的 open/json.load
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Iterable
+
+from utils.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# api-server/data
+DEFAULT_DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+
+# 已解析文档的缓存上限（近似字节数）与过期时间（秒，留空表示常驻直到失效）
+DATA_CACHE_MAX_BYTES = int(os.getenv("DATA_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+DATA_CACHE_TTL = float(os.getenv("DATA_CACHE_TTL")) if os.getenv("DATA_CACHE_TTL") else None
+
+
+def _read_json_file(path: str) -> Optional[Dict[str, Any]]:
+    """在工作线程中执行的同步读取；文件缺失或格式错误时返回 None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.warning(f"数据文件不存在: {path}")
+    except json.JSONDecodeError as e:
+        logger.warning(f"数据文件不是有效的JSON: {path}: {e}")
+    except Exception as e:
+        logger.error(f"读取数据文件失败: {path}: {e}")
+    return None
+
+
+class DataRepository:
+    """JSON 数据文件的异步、内存常驻访问层"""
+
+    def __init__(self, data_dir: str = DEFAULT_DATA_DIR, max_workers: int = 2):
+        self.data_dir = data_dir
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="data-io")
+        # 路径 -> 解析后的文档（文件缺失时为 None）
+        self._documents = LRUCache(max_entries=None, max_bytes=DATA_CACHE_MAX_BYTES, ttl=DATA_CACHE_TTL)
+        # (路径, 键, first_match) -> 拼接后的列表，元素与文档共享，按浅层大小计
+        self._lists = LRUCache(max_entries=1024, ttl=DATA_CACHE_TTL)
+
+    def resolve(self, name: str) -> str:
+        """数据文件名相对于数据目录解析，绝对路径原样使用"""
+        if os.path.isabs(name):
+            return os.path.normpath(name)
+        return os.path.normpath(os.path.join(self.data_dir, name))
+
+    async def load_json(self, name: str) -> Optional[Dict[str, Any]]:
+        """读取并缓存整个 JSON 文档；并发的首次访问只会触发一次文件读取"""
+        path = self.resolve(name)
+
+        def read():
+            return asyncio.get_running_loop().run_in_executor(self._executor, _read_json_file, path)
+
+        return await self._documents.get_or_load(path, read)
+
+    async def get_list(self, name: str, keys: Iterable[str], first_match: bool = False) -> List[Dict[str, Any]]:
+        """
+        取出文档中指定键下的列表并拼接
+        first_match=True 时只使用第一个存在的键；返回新列表，调用方可以自由追加
+        """
+        keys = tuple(keys)
+        cache_key = (self.resolve(name), keys, first_match)
+        items = self._lists.get(cache_key)
+        if items is None:
+            document = await self.load_json(name) or {}
+            items = []
+            for key in keys:
+                value = document.get(key)
+                if isinstance(value, list):
+                    items.extend(value)
+                    if first_match:
+                        break
+            self._lists.set(cache_key, items, size=sys.getsizeof(items))
+        return list(items)
+
+    def get_cached(self, name: str) -> Optional[Dict[str, Any]]:
+        """同步读取已缓存的文档（未加载时返回 None，不触发 I/O）"""
+        return self._documents.get(self.resolve(name))
+
+    async def preload(self, names: Iterable[str]) -> int:
+        """启动时并发预加载数据文件，返回成功加载的文件数"""
+        documents = await asyncio.gather(*(self.load_json(name) for name in names))
+        return sum(1 for document in documents if document is not None)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """清除缓存，下次访问重新读取文件"""
+        if name is None:
+            self._documents.clear()
+            self._lists.clear()
+            return
+        path = self.resolve(name)
+        self._documents.delete(path)
+        self._lists.delete_where(lambda cache_key: cache_key[0] == path)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"documents": self._documents.stats(), "lists": self._lists.stats()}
+
+    def close(self) -> None:
+        """关闭读取线程池"""
+        self._executor.shutdown(wait=False)
+
+
+# 全局实例
+data_repository = DataRepository()
+
+# 启动时预加载的数据文件
+PRELOAD_FILES = [
+    'scenarios.json',
+    'game_scenarios.json',
+    'advanced_game_scenarios.json',
+    'historical_cases.json',
+    'advanced_historical_cases.json',
+    'love_relationship_scenarios.json',
+    'exponential_questions.json',
+    'advanced_exponential_questions.json',
+    'compound_questions.json',
+    'advanced_compound_questions.json',
+]
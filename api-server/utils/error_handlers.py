@@ -5,12 +5,12 @@
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 from typing import Dict, Any
+import functools
 import logging
 import traceback
 
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
+# 日志输出由 utils.logging_config.setup_logging 统一配置
 logger = logging.getLogger(__name__)
 
 
@@ -22,6 +22,10 @@ class CustomException(Exception):
         self.error_code = error_code
         self.status_code = status_code
 
+    def __reduce__(self):
+        # 保证异常从计算进程池传回时保留错误码和状态码
+        return (self.__class__, (self.message, self.error_code, self.status_code))
+
 
 async def global_exception_handler(request: Request, exc: Exception):
     """全局异常处理器"""
@@ -74,6 +78,29 @@ async def global_exception_handler(request: Request, exc: Exception):
         )
 
 
+async def custom_exception_handler(request: Request, exc: CustomException):
+    """业务异常处理器：4xx 属于客户端错误，只记警告不记堆栈，不经过全局处理器按服务器错误处理"""
+    error_id = _generate_error_id()
+    if exc.status_code >= 500:
+        logger.error(f"Error ID: {error_id} | Path: {request.url.path} | Method: {request.method} | "
+                     f"{exc.error_code}: {exc.message}", exc_info=exc)
+    else:
+        logger.warning(f"Error ID: {error_id} | Path: {request.url.path} | Method: {request.method} | "
+                       f"{exc.error_code}: {exc.message}")
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={
+            "success": False,
+            "error": {
+                "error_id": error_id,
+                "error_code": exc.error_code,
+                "message": exc.message,
+                "details": str(exc)
+            }
+        }
+    )
+
+
 def _generate_error_id() -> str:
     """生成错误ID"""
     import uuid
@@ -82,6 +109,7 @@ def _generate_error_id() -> str:
 
 def handle_calculation_errors(func):
     """计算函数错误处理装饰器"""
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
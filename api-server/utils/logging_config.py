@@ -0,0 +1,172 @@
+"""
+结构化日志配置模块
+提供 JSON 格式日志、基于队列的非阻塞输出、按 logger 设置级别以及高频事件采样
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+
+# LogRecord 自带的属性，其余属性视为 extra 结构化字段
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# 队列容量：写满时丢弃新日志而不是阻塞请求
+DEFAULT_QUEUE_SIZE = 10000
+
+# 只用于在入队前渲染异常堆栈
+_EXC_FORMATTER = logging.Formatter()
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configured_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """将日志记录格式化为单行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # 经过队列的记录只带已渲染的堆栈文本（见 DroppingQueueHandler.prepare）
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    高频事件采样过滤器
+    记录通过 extra={"sample_every": N} 声明采样率，同一事件（logger + 消息模板）每 N 条保留 1 条
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._counters: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        every = getattr(record, "sample_every", None)
+        if not every or every <= 1:
+            return True
+
+        key = (record.name, record.msg)
+        with self._lock:
+            seen = self._counters.get(key, 0)
+            self._counters[key] = seen + 1
+        return seen % every == 0
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时直接丢弃日志并计数，保证调用方永不阻塞"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        在调用线程中合并消息参数并把异常渲染到 exc_text，但不把堆栈拼进消息：
+        默认实现会格式化整条记录并清空 exc_info，JSON 输出就只剩混在 msg 里的堆栈
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def sampled(every: int, **fields) -> Dict[str, Any]:
+    """构造采样日志的 extra 参数，如 logger.info("...", extra=sampled(100, count=n))"""
+    return {"sample_every": every, **fields}
+
+
+def _parse_logger_levels(spec: str) -> Dict[str, str]:
+    """解析 "endpoints.scenarios=WARNING,httpx=WARNING" 形式的配置"""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level: Optional[str] = None,
+                  json_format: Optional[bool] = None,
+                  logger_levels: Optional[Dict[str, str]] = None,
+                  queue_size: int = DEFAULT_QUEUE_SIZE) -> None:
+    """
+    配置根 logger（幂等）
+    - LOG_LEVEL: 根级别，默认 INFO
+    - LOG_FORMAT: json 或 text，默认 json
+    - LOG_LEVELS: 按 logger 设置级别，如 "endpoints.scenarios=WARNING,httpx=WARNING"
+    """
+    global _listener
+
+    with _configured_lock:
+        if _listener is not None:
+            return
+
+        level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+        if json_format is None:
+            json_format = os.getenv("LOG_FORMAT", "json").lower() != "text"
+        if logger_levels is None:
+            logger_levels = _parse_logger_levels(os.getenv("LOG_LEVELS", "httpx=WARNING"))
+
+        stream_handler = logging.StreamHandler(sys.stdout)
+        if json_format:
+            stream_handler.setFormatter(JsonFormatter())
+        else:
+            stream_handler.setFormatter(
+                logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+            )
+
+        log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        queue_handler = DroppingQueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter())
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+
+        for name, logger_level in logger_levels.items():
+            logging.getLogger(name).setLevel(logger_level)
+
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """停止后台日志线程并刷新队列中剩余的日志"""
+    global _listener
+
+    with _configured_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
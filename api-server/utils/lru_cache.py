@@ -0,0 +1,208 @@
+"""
+通用 LRU 缓存
+OrderedDict 维护最近使用顺序，按条目数和近似字节数双重限制淘汰；TTL 过期时间放在最小堆里，
+清理只弹出已到期的堆顶，不扫描全部条目；条目大小在写入时估算一次，统计信息 O(1)
+"""
+import asyncio
+import heapq
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+_MISSING = object()
+
+# 估算大小时的最大递归深度，更深的部分按浅层大小计
+_SIZE_DEPTH = 6
+
+
+def approximate_size(value: Any, _depth: int = 0) -> int:
+    """近似估算对象占用的字节数（容器递归累加，只在写入时调用一次）"""
+    size = sys.getsizeof(value)
+    if _depth >= _SIZE_DEPTH:
+        return size
+    if isinstance(value, dict):
+        size += sum(approximate_size(k, _depth + 1) + approximate_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(approximate_size(item, _depth + 1) for item in value)
+    elif hasattr(value, "__dict__"):
+        size += approximate_size(vars(value), _depth + 1)
+    return size
+
+
+class LRUCache:
+    """
+    线程安全的 LRU + TTL 缓存
+    max_entries / max_bytes 为 None 表示不限制；ttl 单位为秒，None 表示不过期
+    """
+
+    def __init__(self, max_entries: Optional[int] = 1024, max_bytes: Optional[int] = None,
+                 ttl: Optional[float] = None, sizer: Callable[[Any], int] = approximate_size,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = ttl
+        self._sizer = sizer
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (value, size, expires_at)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, Optional[float]]]" = OrderedDict()
+        # (expires_at, seq, key)；被覆盖或删除的旧记录在弹出时按 expires_at 比对后丢弃
+        self._expiry_heap: List[Tuple[float, int, Hashable]] = []
+        self._seq = 0
+        self._bytes = 0
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # ----- 内部操作（调用方持有锁） -----
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _purge_expired(self, now: float) -> None:
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, _, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] == expires_at:
+                self._remove(key)
+                self.expirations += 1
+        # 过期记录过多时重建堆，避免无效记录堆积
+        if len(heap) > 2 * len(self._entries) + 64:
+            self._expiry_heap = []
+            for key, (_, _, expires_at) in self._entries.items():
+                if expires_at is not None:
+                    self._seq += 1
+                    self._expiry_heap.append((expires_at, self._seq, key))
+            heapq.heapify(self._expiry_heap)
+
+    def _evict(self) -> None:
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    # ----- 公共接口 -----
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            now = self._clock()
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= now:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = _MISSING, size: Optional[int] = None) -> bool:
+        """写入条目；单个条目超过 max_bytes 时不缓存并返回 False"""
+        size = self._sizer(value) if size is None else size
+        if self.max_bytes is not None and size > self.max_bytes:
+            self.delete(key)
+            return False
+        ttl = self.default_ttl if ttl is _MISSING else ttl
+        with self._lock:
+            now = self._clock()
+            expires_at = None if ttl is None else now + ttl
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            if expires_at is not None:
+                self._seq += 1
+                heapq.heappush(self._expiry_heap, (expires_at, self._seq, key))
+            self._purge_expired(now)
+            self._evict()
+        return True
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """删除满足条件的键（需要扫描，只用于少量键的失效操作）"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._expiry_heap.clear()
+            self._bytes = 0
+
+    def cleanup_expired(self) -> None:
+        with self._lock:
+            self._purge_expired(self._clock())
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            self._purge_expired(self._clock())
+            return list(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                          ttl: Optional[float] = _MISSING) -> Any:
+        """未命中时调用异步 loader 并缓存结果；同一键的并发未命中只会触发一次加载"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        pending = self._loading.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            value = await loader()
+            self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待者时取回异常，避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._loading.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hit_count": self.hits,
+                "miss_count": self.misses,
+                "hit_rate_percent": round(self.hits / total * 100, 2) if total else 0,
+                "cached_items_count": len(self._entries),
+                "cache_size_bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
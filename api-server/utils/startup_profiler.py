@@ -0,0 +1,66 @@
+"""
+启动耗时分析模块
+记录模块导入、路由注册和数据加载各阶段的耗时，生成冷启动报告
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+
+class StartupProfiler:
+    """冷启动阶段计时器"""
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._ready_at: Optional[float] = None
+        self.phases: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def phase(self, name: str, kind: str = "import"):
+        """记录一个启动阶段的耗时，阶段内的异常会被标记后继续抛出"""
+        started = time.perf_counter()
+        entry = {"phase": name, "kind": kind, "status": "ok"}
+        try:
+            yield entry
+        except Exception as e:
+            entry["status"] = "failed"
+            entry["detail"] = str(e)
+            raise
+        finally:
+            entry["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            self.phases.append(entry)
+
+    def record(self, name: str, duration_ms: float, kind: str = "import",
+               status: str = "ok", detail: Optional[str] = None):
+        """直接记录一个已完成阶段"""
+        entry = {"phase": name, "kind": kind, "status": status,
+                 "duration_ms": round(duration_ms, 2)}
+        if detail:
+            entry["detail"] = detail
+        self.phases.append(entry)
+
+    def mark_ready(self):
+        """标记应用已可以接收请求"""
+        self._ready_at = time.perf_counter()
+
+    def report(self) -> Dict[str, Any]:
+        """生成启动报告：按阶段类型汇总并列出最慢的阶段"""
+        totals: Dict[str, float] = {}
+        for entry in self.phases:
+            totals[entry["kind"]] = round(totals.get(entry["kind"], 0.0) + entry["duration_ms"], 2)
+
+        ready_ms = None
+        if self._ready_at is not None:
+            ready_ms = round((self._ready_at - self._origin) * 1000, 2)
+
+        return {
+            "ready": self._ready_at is not None,
+            "time_to_ready_ms": ready_ms,
+            "totals_by_kind_ms": totals,
+            "slowest_phases": sorted(self.phases, key=lambda e: e["duration_ms"], reverse=True)[:5],
+            "phases": list(self.phases),
+        }
+
+
+# 全局实例（在 start.py 中最先导入，计时起点即为应用导入起点）
+startup_profiler = StartupProfiler()